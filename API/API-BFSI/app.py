@@ -1,8 +1,11 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, File, Form, HTTPException, Header, Request, UploadFile, WebSocket
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
-from database import Base, engine, SessionLocal
+from sqlalchemy import func, extract, text
+from sqlalchemy.exc import IntegrityError
+from database import Base, engine, read_engine, SessionLocal, ReadSessionLocal, pool_status, storage_status
 from models import User, Prediction
 from schemas import (
     UserCreate,
@@ -14,20 +17,72 @@ from schemas import (
     MetricsResponse,
     BulkPredictRequest,
     BulkPredictResult,
-    BulkPredictResponse
+    BulkPredictResponse,
+    ColumnarBulkPredictRequest,
+    ColumnarBulkPredictResponse,
+    CustomerProfileResponse,
+    JobFromPathRequest,
+    JobResponse,
+    DriftResponse,
+    SimulationRequest,
+    SimulationResponse
 )
 
-from utils.features import derive_features_auto
-from utils.auth import hash_password, verify_password
+from utils.features import derive_features_auto, CHANNEL_NAMES, FEATURE_NAMES
+from utils.bulkheads import bulkhead, bulkhead_metrics, get_bulkhead, shutdown_bulkheads
+from utils.breakers import (
+    Deadline, StageSkipped, breaker_metrics, get_breaker, request_budget_ms, shutdown_breakers
+)
+from utils.encoding import fast_json, negotiated, response_media_type
+from utils.jobs import (
+    REQUIRED_COLUMNS, JobManager, input_columns, input_format, iter_results_csv, progress,
+    progress_events, read_manifest, results_path
+)
+from utils.live_analytics import live_analytics
+from utils.calendar_table import get_calendar
+from utils.customer_store import CustomerStore, epoch_seconds, load_store
+from utils.drift import DriftMonitor, load_reference
+from utils.auth import (
+    TokenUser, create_access_token, decode_access_token, hash_password, revoked_tokens, verify_password
+)
+from utils.attributions import describe_attribution, load_explainer
+from utils.explanations import ExplanationWorker, get_backend, worker_enabled
+from utils.export import (
+    EXPORT_FORMATS, PREDICTION_LABELS, acquire_slot, channel_code, iter_predictions, parquet_available,
+    release_slot, stream_export
+)
 from utils.hf_model import generate_explanation
-from datetime import datetime, timedelta
-from catboost import CatBoostClassifier
+from utils.partitions import (
+    PartitionMaintainer, archived_predictions, day_bounds, ensure_partitions, has_transaction_id_registry,
+    is_partitioned, load_archived
+)
+from utils.profiling import ProfilingMiddleware, install_sql_hooks, profile_endpoint, stage
+from utils.simulation import ColumnCache, load_decision_columns, resolve_weights, simulate
+from utils.streaming import StreamScorer, score_items
+from utils.tracing import TracingMiddleware, Tracer, annotate, keep_trace
+from utils.scoring import (
+    compact_rows, insert_predictions, is_duplicate_transaction, known_transaction_ids, load_model,
+    result_columns, score_frame, validate_columns
+)
+from utils.rules import (
+    evaluate_rules,
+    VELOCITY_RULE_FLAG,
+    VELOCITY_RULE_WEIGHT,
+    VELOCITY_WINDOW_HOURS,
+    VELOCITY_RISK_SCORE,
+    VELOCITY_MIN_COUNT
+)
+from config import settings
+from datetime import date, datetime, timedelta
 import pandas as pd
 import numpy as np
 from typing import List
 from collections import defaultdict
 import time
-from typing import Dict, List, Any
+import shutil
+import jwt
+from pathlib import Path
+from typing import Dict, List, Any, Optional
 # ------------------ FASTAPI APP ------------------
 app = FastAPI(
     title="RiskShield Fraud Detection API",
@@ -50,22 +105,166 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Profile", "traceparent", "X-Trace-Id"],
+)
+
+# On-demand profiling: admin trace switch + sampled profiles (see utils/profiling.py)
+app.add_middleware(
+    ProfilingMiddleware,
+    admin_token=settings.PROFILING_ADMIN_TOKEN,
+    sample_rate=settings.PROFILE_SAMPLE_RATE,
+    output_file=settings.PROFILE_OUTPUT_FILE,
 )
+install_sql_hooks(engine)
+if read_engine is not engine:
+    install_sql_hooks(read_engine)
+
+# Request tracing: head/tail-sampled spans exported off the request path (see utils/tracing.py).
+# Added last so it is outermost and its root span covers profiling too.
+tracer = Tracer()
+app.add_middleware(TracingMiddleware, tracer=tracer)
 
 # Create tables if not existing
 Base.metadata.create_all(bind=engine)
 
+# Monthly partitions for the coming months (no-op unless predictions is partitioned),
+# re-checked every PARTITION_CHECK_HOURS so a long-running API never outruns them
+partition_maintainer = None
+try:
+    created_partitions = ensure_partitions(engine)
+    if created_partitions:
+        print(f"✅ Created partitions: {', '.join(created_partitions)}")
+    if is_partitioned(engine):
+        partition_maintainer = PartitionMaintainer(engine)
+        if not has_transaction_id_registry(engine):
+            print("⚠️ Warning: transaction_id is not unique across partitions - "
+                  "run migrations/003_transaction_id_registry.py")
+except Exception as e:
+    print(f"⚠️ Warning: Could not ensure partitions - {e}")
+
+
+@app.on_event("startup")
+def start_partition_maintainer():
+    if partition_maintainer is not None:
+        partition_maintainer.start()
+
+
+@app.on_event("shutdown")
+def stop_partition_maintainer():
+    if partition_maintainer is not None:
+        partition_maintainer.stop()
+
 # ------------------ LOAD MODEL ------------------
-model_path = "model/catboost_fraud_model_balanced_tuned.cbm"
-cat_model = CatBoostClassifier()
 try:
-    cat_model.load_model(model_path)
-    print("✅ Model loaded successfully")
+    cat_model = load_model()
+    print(f"✅ Model loaded successfully ({settings.MODEL_BACKEND} backend)")
 except Exception as e:
     print(f"⚠️ Warning: Could not load model - {e}")
     cat_model = None
 
 
+# ------------------ SHAP ATTRIBUTIONS ------------------
+shap_explainer = None
+if cat_model is not None:
+    try:
+        shap_explainer = load_explainer(cat_model)
+        if shap_explainer is None:
+            print("⚠️ Warning: catboost not installed - explain=shap and feature importance unavailable")
+        else:
+            shap_explainer.warm_up()
+            print(f"✅ SHAP explainer ready (model {shap_explainer.version})")
+    except Exception as e:
+        print(f"⚠️ Warning: Could not set up SHAP attributions - {e}")
+        shap_explainer = None
+
+
+def check_explain_mode(explain: Optional[str]):
+    if explain is None:
+        return
+    if explain != "shap":
+        raise HTTPException(status_code=400, detail="explain must be 'shap'")
+    if shap_explainer is None:
+        raise HTTPException(status_code=503, detail="SHAP attributions not available")
+
+
+def shap_attributions(features_df: pd.DataFrame) -> list:
+    """Attributions for each row within SHAP_BUDGET_MS_PER_ROW (None past the budget)."""
+    values = shap_explainer.explain(features_df, budget_ms=settings.SHAP_BUDGET_MS_PER_ROW * len(features_df))
+    return [shap_explainer.attribution(row_values) for row_values in values]
+
+
+# ------------------ CALENDAR ------------------
+try:
+    calendar = get_calendar()
+    print(f"✅ Calendar table built ({calendar.first_year}-{calendar.last_year})")
+except Exception as e:
+    print(f"⚠️ Warning: Could not build calendar table - {e}")
+
+
+# ------------------ CUSTOMER AGGREGATES ------------------
+try:
+    customer_store = load_store(SessionLocal)
+    print(f"✅ Customer store loaded ({len(customer_store)} customers)")
+except Exception as e:
+    print(f"⚠️ Warning: Could not load customer store - {e}")
+    customer_store = CustomerStore()
+
+
+@app.on_event("shutdown")
+def save_customer_store():
+    customer_store.snapshot()
+
+
+# ------------------ DRIFT MONITOR ------------------
+drift_monitor = None
+if settings.DRIFT_ENABLED and cat_model is not None:
+    try:
+        drift_monitor = DriftMonitor(load_reference(cat_model))
+        print(f"✅ Drift monitor ready ({drift_monitor.reference.rows} reference rows, "
+              f"{drift_monitor.memory_bytes() // 1024} KB of histograms)")
+    except Exception as e:
+        print(f"⚠️ Warning: Could not build drift reference - {e}")
+
+
+def observe_drift(features: dict, model_probability: float):
+    if drift_monitor is not None:
+        drift_monitor.observe(features, model_probability)
+
+
+def observe_drift_rows(rows: list):
+    if drift_monitor is not None:
+        drift_monitor.observe_rows(rows)
+
+
+@app.on_event("shutdown")
+def flush_drift_monitor():
+    if drift_monitor is not None:
+        drift_monitor.flush()
+
+
+# ------------------ EXPLANATION WORKER ------------------
+# Off the request path: scoring only queues ids (see utils/explanations.py)
+explanation_worker = ExplanationWorker(SessionLocal, get_backend()) if worker_enabled() else None
+
+
+def queue_explanations(prediction_ids: list):
+    if explanation_worker is not None:
+        explanation_worker.submit(prediction_ids)
+
+
+@app.on_event("startup")
+def start_explanation_worker():
+    if explanation_worker is not None:
+        explanation_worker.start()
+        print(f"✅ Explanation worker started ({explanation_worker.backend.name} backend)")
+
+
+@app.on_event("shutdown")
+def stop_explanation_worker():
+    if explanation_worker is not None:
+        explanation_worker.stop()
+
+
 # ------------------ DB SESSION DEPENDENCY ------------------
 def get_db():
     db = SessionLocal()
@@ -75,6 +274,49 @@ def get_db():
         db.close()
 
 
+def get_read_db():
+    # Read replica (or the primary when none is configured); may lag writes slightly
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# ------------------ AUTH DEPENDENCY ------------------
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+def get_current_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)
+) -> TokenUser:
+    """Caller from the Bearer access token, verified in memory (no user lookup)."""
+    if credentials is None:
+        raise HTTPException(status_code=401, detail="Not authenticated",
+                            headers={"WWW-Authenticate": "Bearer"})
+    try:
+        return decode_access_token(credentials.credentials)
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=401, detail="Invalid or expired token",
+                            headers={"WWW-Authenticate": "Bearer"})
+
+
+def get_download_user(
+    token: Optional[str] = None,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)
+) -> TokenUser:
+    """Like get_current_user, but also accepts ?token= (plain links cannot send headers)."""
+    if credentials is None and token is not None:
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    return get_current_user(credentials)
+
+
+def check_token_email(current_user: TokenUser, email: str):
+    """403 when a request names a different user than its token."""
+    if email.lower() != current_user.email.lower():
+        raise HTTPException(status_code=403, detail="Token does not belong to this user")
+
+
 # ------------------ HEALTH CHECK ------------------
 @app.get("/api/health")
 def health_check():
@@ -86,8 +328,86 @@ def health_check():
     }
 
 
+@app.get("/api/health/pools")
+def pool_health():
+    """Connection pool usage for the primary and the read replica"""
+    pools = pool_status()
+    return {
+        "status": "success",
+        "message": "Read replica configured" if "read" in pools else "Reads use the primary",
+        "data": pools
+    }
+
+
+@app.get("/api/health/storage")
+def storage_health():
+    """Database backend (PostgreSQL or embedded SQLite) and, for SQLite, WAL state and file sizes"""
+    return {
+        "status": "success",
+        "message": f"Storage backend: {engine.dialect.name}",
+        "data": storage_status()
+    }
+
+
+@app.get("/api/health/bulkheads")
+def bulkhead_health():
+    """Concurrency, queue depth and saturation per endpoint class"""
+    return {
+        "status": "success",
+        "message": "Bulkhead metrics",
+        "data": bulkhead_metrics()
+    }
+
+
+@app.get("/api/health/explanations")
+def explanation_health():
+    """Explanation worker queue, batching and deduplication counters"""
+    if explanation_worker is None:
+        return {"status": "success", "message": "Template explanations rendered on read", "data": None}
+    return {"status": "success", "message": "Explanation worker metrics", "data": explanation_worker.metrics()}
+
+
+@app.get("/api/health/breakers")
+def breaker_health():
+    """Circuit breaker state and counters for the guarded /api/predict stages"""
+    breakers = breaker_metrics()
+    open_breakers = [name for name, breaker in breakers.items() if breaker["state"] != "closed"]
+    return {
+        "status": "success",
+        "message": f"Degraded: {', '.join(open_breakers)}" if open_breakers else "All breakers closed",
+        "data": breakers
+    }
+
+
+@app.get("/api/health/tracing")
+def tracing_health():
+    """Sampling settings, kept/discarded trace counts and exporter state"""
+    metrics = tracer.metrics()
+    return {
+        "status": "success",
+        "message": (
+            "Tracing enabled" if tracer.enabled else
+            "Tracing disabled (sampled incoming traces are followed)" if tracer.follow_parent else
+            "Tracing disabled"
+        ),
+        "data": metrics
+    }
+
+
+@app.on_event("shutdown")
+def stop_bulkheads():
+    shutdown_bulkheads()
+    shutdown_breakers()
+
+
+@app.on_event("shutdown")
+def stop_tracing():
+    tracer.shutdown()
+
+
 # ------------------ REGISTER ------------------
 @app.post("/api/register")
+@bulkhead("auth")
 def register_user(user: UserCreate, db: Session = Depends(get_db)):
     """
     Register a new user
@@ -124,6 +444,7 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
 
 # ------------------ LOGIN ------------------
 @app.post("/api/login")
+@bulkhead("auth")
 def login_user(user: UserLogin, db: Session = Depends(get_db)):
     """
     Authenticate user login
@@ -133,12 +454,16 @@ def login_user(user: UserLogin, db: Session = Depends(get_db)):
         if not db_user or not verify_password(user.password, db_user.password):
             raise HTTPException(status_code=401, detail="Invalid email or password")
         
+        access_token, _ = create_access_token(db_user.email, db_user.full_name)
         return {
             "status": "success",
             "message": "Login successful",
             "data": {
                 "email": db_user.email,
-                "full_name": db_user.full_name
+                "full_name": db_user.full_name,
+                "access_token": access_token,
+                "token_type": "bearer",
+                "expires_in": settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
             }
         }
     except HTTPException:
@@ -147,120 +472,201 @@ def login_user(user: UserLogin, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Login failed: {str(e)}")
 
 
+# ------------------ LOGOUT ------------------
+@app.post("/api/logout")
+@bulkhead("auth")
+def logout_user(current_user: TokenUser = Depends(get_current_user)):
+    """
+    Revoke the caller's access token
+    """
+    revoked_tokens.revoke(current_user.jti, current_user.expires_at)
+    return {"status": "success", "message": "Logged out", "data": {"email": current_user.email}}
+
+
+# ------------------ LATENCY BUDGET ------------------
+def predict_model_proba(features_df: pd.DataFrame) -> float:
+    return float(cat_model.predict_proba(features_df)[0, 1])
+
+
+def count_high_risk_transactions(customer_id: str, window_start: datetime, timeout_ms: float) -> int:
+    """Velocity-rule count on its own session (the request's may not be shared across threads)."""
+    db = SessionLocal()
+    try:
+        if db.get_bind().dialect.name == "postgresql":
+            # The server cancels it too, rather than finishing work nobody waits for
+            db.execute(text(f"SET LOCAL statement_timeout = {max(int(timeout_ms), 1)}"))
+        return db.query(func.count(Prediction.id)).filter(
+            Prediction.customer_id == customer_id,
+            Prediction.timestamp >= window_start,
+            Prediction.risk_score > VELOCITY_RISK_SCORE
+        ).scalar()
+    finally:
+        db.close()
+
+
+def guarded_result(call, deadline: Deadline, degraded: list):
+    """Result of a guarded stage within the request deadline, or None (recorded as degraded)."""
+    try:
+        return call.result(deadline.remaining_ms(settings.PREDICT_WRITE_RESERVE_MS))
+    except StageSkipped as e:
+        degraded.append({"stage": e.stage, "reason": e.reason})
+        return None
+
+
 # ------------------ PREDICT FRAUD ------------------
 @app.post("/api/predict", response_model=PredictResponse)
-def predict_transaction(data: PredictRequest, db: Session = Depends(get_db)):
+@bulkhead("scoring")
+@profile_endpoint
+def predict_transaction(
+    data: PredictRequest,
+    explain: Optional[str] = None,
+    x_latency_budget_ms: Optional[str] = Header(None),
+    current_user: TokenUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
     """
     Predict fraud for a transaction using hybrid approach (ML model + rule-based system)
+    With explain=shap the response adds the model's per-feature SHAP attributions.
+    Model inference and the velocity query must finish within the latency budget
+    (X-Latency-Budget-Ms); otherwise the result is marked degraded (rule-only without the model)
     """
     try:
+        try:
+            deadline = Deadline(request_budget_ms(x_latency_budget_ms))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="X-Latency-Budget-Ms must be a number of milliseconds")
+        check_explain_mode(explain)
+
         # Validate model is loaded
         if cat_model is None:
             raise HTTPException(status_code=503, detail="Model not available")
         
-        # Validate user
-        user = db.query(User).filter(User.email == data.email).first()
-        if not user:
-            raise HTTPException(status_code=401, detail="User not registered")
+        # Validate user (signed token, no database read)
+        check_token_email(current_user, data.email)
 
         # Convert to dict
         data_dict = data.dict()
 
         # Derive auto features
-        features_df = derive_features_auto(data_dict)
-        features = features_df.to_dict(orient="records")[0]
+        with stage("feature_derivation"):
+            features_df = derive_features_auto(data_dict)
+            features = features_df.to_dict(orient="records")[0]
+
+        # Guarded stages run concurrently, each behind its circuit breaker
+        degraded = []
+        window_start = datetime.utcnow() - timedelta(hours=VELOCITY_WINDOW_HOURS)
+        velocity_call = get_breaker("velocity_query").start(
+            count_high_risk_transactions, data_dict["customer_id"], window_start,
+            deadline.remaining_ms(settings.PREDICT_WRITE_RESERVE_MS)
+        )
+        model_call = get_breaker("model_inference").start(predict_model_proba, features_df)
 
-        # Model prediction
-        model_proba = float(cat_model.predict_proba(features_df)[0, 1])
-        
         # -----------------------------
         # RULE-BASED CHECKS
         # -----------------------------
-        rule_flags = []
-        rule_score = 0.0
-
-        # Rule 1: High amount transaction
-        if features["transaction_amount"] > 100000:
-            rule_flags.append("High amount transaction (>₹100K)")
-            rule_score += 0.2
-
-        # Rule 2: Large night-time transaction
-        if features["is_night_txn"] == 1 and features["transaction_amount"] > 50000:
-            rule_flags.append("Large night-time transaction")
-            rule_score += 0.2
-
-        # Rule 3: New unverified account
-        if features["account_age_days"] < 10 and features["kyc_verified"] == 0:
-            rule_flags.append("New unverified account")
-            rule_score += 0.25
-
-        # Rule 4: Weekend high-value transaction
-        if features["is_weekend_txn"] == 1 and features["transaction_amount"] > 80000:
-            rule_flags.append("Weekend high-value transaction")
-            rule_score += 0.15
-
-        # Rule 5: Holiday transaction risk
-        if features.get("is_holiday_txn", 0) == 1 and features["transaction_amount"] > 70000:
-            rule_flags.append("High-value holiday transaction")
-            rule_score += 0.1
+        with stage("rules"):
+            rule_flags, rule_score = evaluate_rules(features)
+
+        # Model prediction
+        with stage("model_inference"):
+            model_proba = guarded_result(model_call, deadline, degraded)
 
         # Rule 6: Historical pattern - repeated high-risk transactions
-        one_hour_ago = datetime.utcnow() - timedelta(hours=1)
-        recent_txns = db.query(Prediction).filter(
-            Prediction.customer_id == data_dict["customer_id"],
-            Prediction.timestamp >= one_hour_ago
-        ).all()
-        
-        high_value_txns = sum(1 for txn in recent_txns if txn.risk_score > 0.7)
-        if high_value_txns >= 3:
-            rule_flags.append("Multiple high-risk transactions in last hour")
-            rule_score += 0.3
+        with stage("velocity_query"):
+            high_value_txns = guarded_result(velocity_call, deadline, degraded)
+        if high_value_txns is not None and high_value_txns >= VELOCITY_MIN_COUNT:
+            rule_flags.append(VELOCITY_RULE_FLAG)
+            rule_score += VELOCITY_RULE_WEIGHT
 
         # -----------------------------
         # HYBRID DECISION
         # -----------------------------
-        combined_score = round(min(1.0, model_proba + rule_score), 4)
-        final_is_fraud = int(combined_score >= 0.6)
+        if model_proba is None:
+            # Degraded: rule engine only, against its own threshold
+            combined_score = round(min(1.0, rule_score), 4)
+            final_is_fraud = int(combined_score >= settings.DEGRADED_FRAUD_THRESHOLD)
+        else:
+            combined_score = round(min(1.0, model_proba + rule_score), 4)
+            final_is_fraud = int(combined_score >= 0.6)
+
+        # Tail sampling keeps the traces worth reading later
+        annotate(**{"fraud.risk_score": combined_score, "fraud.is_fraud": final_is_fraud})
+        if settings.TRACE_KEEP_FLAGGED:
+            if final_is_fraud:
+                keep_trace("fraud")
+            if degraded:
+                keep_trace("degraded")
 
         # Generate explanation
-        explanation = generate_explanation(
-            data_dict, 
-            features, 
-            combined_score, 
-            rule_score, 
-            rule_flags
-        )
+        with stage("explanation"):
+            explanation = generate_explanation(
+                data_dict, 
+                features, 
+                combined_score, 
+                rule_score, 
+                rule_flags
+            )
 
-        # Store in database
-        new_pred = Prediction(
-            customer_id=data_dict["customer_id"],
-            transaction_id=data_dict["transaction_id"],
-            email=data_dict["email"],
-            risk_score=combined_score,
-            is_fraud=final_is_fraud,
-            derived_features={**features, "rule_flags": rule_flags},
-            explanation=explanation
-        )
-        db.add(new_pred)
-        db.commit()
-        db.refresh(new_pred)
+        attribution = None
+        if explain and model_proba is not None:
+            with stage("shap"):
+                attribution = shap_attributions(features_df)[0]
+            if attribution:
+                explanation += "\n\n" + describe_attribution(attribution)
 
-        return PredictResponse(
+        # Store in database (template explanations are rendered on read)
+        with stage("db_write"):
+            new_pred = Prediction.from_scoring(
+                customer_id=data_dict["customer_id"],
+                transaction_id=data_dict["transaction_id"],
+                email=data_dict["email"],
+                features=features,
+                model_probability=model_proba,
+                rule_score=rule_score,
+                rule_flags=rule_flags,
+                risk_score=combined_score,
+                is_fraud=final_is_fraud
+            )
+            db.add(new_pred)
+            try:
+                db.commit()
+            except IntegrityError as e:
+                # The unique index (or, when partitioned, the transaction_id registry) refuses repeats
+                db.rollback()
+                if is_duplicate_transaction(e):
+                    raise HTTPException(status_code=400, detail="transaction_id already exists")
+                raise
+            db.refresh(new_pred)
+        customer_store.update_from_prediction(new_pred)
+        if model_proba is not None:
+            observe_drift(features, model_proba)
+        live_analytics.notify()
+        queue_explanations([new_pred.id])
+
+        return fast_json(PredictResponse(
             status="success",
-            message="Prediction completed successfully",
+            message=(
+                "Prediction completed successfully" if not degraded else
+                "Prediction completed in degraded mode (rule-only score)" if model_proba is None else
+                "Prediction completed in degraded mode (velocity rule skipped)"
+            ),
             data={
                 "prediction_id": new_pred.id,
-                "user": user.full_name,
-                "model_risk_score": round(model_proba, 4),
+                "user": current_user.full_name,
+                "model_risk_score": round(model_proba, 4) if model_proba is not None else None,
                 "rule_score": round(rule_score, 2),
                 "combined_score": combined_score,
                 "is_fraud": final_is_fraud,
                 "rules_triggered": rule_flags,
                 "derived_features": features,
                 "explanation": explanation,
-                "timestamp": new_pred.timestamp.isoformat()
+                "timestamp": new_pred.timestamp.isoformat(),
+                "degraded": bool(degraded),
+                "degraded_stages": degraded,
+                "latency_budget_ms": deadline.budget_ms,
+                **({"attributions": attribution} if explain else {})
             }
-        )
+        ))
 
     except HTTPException:
         raise
@@ -271,20 +677,40 @@ def predict_transaction(data: PredictRequest, db: Session = Depends(get_db)):
 
 # ------------------ TRANSACTION HISTORY ------------------
 @app.get("/api/transactions/{email}", response_model=TransactionHistoryResponse)
-def get_transaction_history(email: str, db: Session = Depends(get_db)):
+@bulkhead("analytics")
+@profile_endpoint
+def get_transaction_history(
+    email: str,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    media_type: str = Depends(response_media_type),
+    current_user: TokenUser = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
     """
     Get complete transaction history for a specific user
+    With start_date/end_date (inclusive) only that range is read, including
+    months that have been archived to Parquet.
     """
     try:
-        # Verify user exists
-        user = db.query(User).filter(User.email == email).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
+        # Only the token's owner may read this history
+        check_token_email(current_user, email)
 
-        # Fetch all predictions for this user
-        predictions = db.query(Prediction).filter(
-            Prediction.email == email
-        ).order_by(Prediction.timestamp.desc()).all()
+        # Fetch all predictions for this user (a range prunes partitions)
+        start, end = day_bounds(start_date, end_date)
+        with stage("db_query"):
+            query = db.query(Prediction).filter(Prediction.email == email)
+            if start is not None:
+                query = query.filter(Prediction.timestamp >= start)
+            if end is not None:
+                query = query.filter(Prediction.timestamp < end)
+            predictions = query.order_by(Prediction.timestamp.desc()).all()
+
+        if start_date or end_date:
+            with stage("archive_query"):
+                archived = archived_predictions(start, end, email=email)
+            if archived:
+                predictions = sorted(predictions + archived, key=lambda p: p.timestamp, reverse=True)
 
         transactions = []
         for pred in predictions:
@@ -294,21 +720,22 @@ def get_transaction_history(email: str, db: Session = Depends(get_db)):
                 "transaction_id": pred.transaction_id,
                 "risk_score": pred.risk_score,
                 "is_fraud": pred.is_fraud,
-                "derived_features": pred.derived_features,
-                "explanation": pred.explanation,
+                "derived_features": pred.features,
+                "explanation": pred.explanation_text,
                 "timestamp": pred.timestamp.isoformat()
             })
 
-        return TransactionHistoryResponse(
+        return negotiated(TransactionHistoryResponse(
             status="success",
             message=f"Found {len(transactions)} transactions",
             data={
                 "user_email": email,
-                "user_name": user.full_name,
+                "user_name": current_user.full_name,
                 "total_transactions": len(transactions),
+                "last_prediction_id": max((p.id for p in predictions), default=0),
                 "transactions": transactions
             }
-        )
+        ), media_type, "transactions")
 
     except HTTPException:
         raise
@@ -316,18 +743,91 @@ def get_transaction_history(email: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Failed to fetch transactions: {str(e)}")
 
 
+# ------------------ HISTORY EXPORT ------------------
+@app.get("/api/transactions/{email}/export")
+def export_transaction_history(
+    email: str,
+    format: str = "csv",
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    q: Optional[str] = None,
+    prediction: Optional[str] = None,
+    channel: Optional[str] = None,
+    explanations: bool = True,
+    current_user: TokenUser = Depends(get_download_user)
+):
+    """
+    Stream a user's transaction history as CSV, NDJSON or Parquet
+    Rows are read in blocks through a server-side cursor and sent as they are
+    encoded; q/prediction/channel match the dashboard filters. Accepts ?token=
+    so the browser can download it with a plain link.
+    """
+    check_token_email(current_user, email)
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(status_code=400, detail="Parquet export needs pyarrow")
+    if prediction is not None:
+        prediction = prediction.lower()
+        if prediction not in PREDICTION_LABELS:
+            raise HTTPException(status_code=400, detail=f"prediction must be one of: {', '.join(PREDICTION_LABELS)}")
+    try:
+        channel_filter = channel_code(channel)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not acquire_slot():
+        raise HTTPException(status_code=503, detail="Too many exports running, retry shortly",
+                            headers={"Retry-After": "5"})
+    start, end = day_bounds(start_date, end_date)
+    blocks = iter_predictions(
+        ReadSessionLocal, email, start, end, search=q, prediction=prediction, channel=channel_filter,
+        include_archive=bool(start_date or end_date)
+    )
+    media_type, extension = EXPORT_FORMATS[format]
+    filename = f"transactions_{datetime.utcnow():%Y-%m-%d}.{extension}"
+    return StreamingResponse(
+        stream_export(blocks, format, explanations, on_close=release_slot),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "Cache-Control": "no-store"}
+    )
+
+
 # ------------------ ANALYTICS DASHBOARD ------------------
 @app.get("/api/analytics", response_model=AnalyticsResponse)
-def get_analytics(db: Session = Depends(get_db)):
+@bulkhead("analytics")
+@profile_endpoint
+def get_analytics(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    db: Session = Depends(get_read_db)
+):
     """
     Get comprehensive analytics for dashboard visualization
+    With start_date/end_date (inclusive) only that range is aggregated,
+    including months that have been archived to Parquet.
     """
     try:
-        # Fetch all predictions
-        all_predictions = db.query(Prediction).all()
+        # Fetch the typed columns used by the dashboard (no JSON parsing)
+        start, end = day_bounds(start_date, end_date)
+        columns = ["timestamp", "is_fraud", "risk_score", "transaction_amount", "channel"]
+        with stage("db_query"):
+            query = db.query(Prediction.id, *(getattr(Prediction, column) for column in columns))
+            if start is not None:
+                query = query.filter(Prediction.timestamp >= start)
+            if end is not None:
+                query = query.filter(Prediction.timestamp < end)
+            all_predictions = query.all()
+        # Cursor for /api/analytics/stream: deltas continue after this id
+        last_prediction_id = max((p.id for p in all_predictions), default=0)
+
+        if start_date or end_date:
+            with stage("archive_query"):
+                archived = load_archived(start, end, columns=columns)
+            all_predictions.extend(archived.itertuples(index=False))
         
         if not all_predictions:
-            return AnalyticsResponse(
+            return fast_json(AnalyticsResponse(
                 status="success",
                 message="No data available yet",
                 data={
@@ -342,9 +842,10 @@ def get_analytics(db: Session = Depends(get_db)):
                         "fraud_rate_trend": [],
                         "fraud_by_channel": {},
                         "amount_vs_risk_scatter": []
-                    }
+                    },
+                    "last_prediction_id": last_prediction_id
                 }
-            )
+            ))
 
         # Calculate KPIs
         total_txns = len(all_predictions)
@@ -353,7 +854,7 @@ def get_analytics(db: Session = Depends(get_db)):
         
         # Estimate amount protected (fraud transactions)
         amount_protected = sum(
-            p.derived_features.get("transaction_amount", 0) 
+            p.transaction_amount or 0
             for p in all_predictions if p.is_fraud == 1
         )
         
@@ -387,25 +888,25 @@ def get_analytics(db: Session = Depends(get_db)):
             })
         
         # Graph 3: Fraud Distribution by Channel
-        channel_mapping = {0: "Online", 1: "ATM", 2: "POS", 3: "Mobile"}
+        channel_mapping = CHANNEL_NAMES
         channel_fraud = defaultdict(int)
         
         for pred in all_predictions:
             if pred.is_fraud == 1:
-                channel_code = pred.derived_features.get("channel_encoded", 0)
-                channel_name = channel_mapping.get(channel_code, "Unknown")
+                channel_value = pred.channel or 0
+                channel_name = channel_mapping.get(channel_value, "Unknown")
                 channel_fraud[channel_name] += 1
         
         # Graph 4: Transaction Amount vs Risk Score (Scatter Plot)
         scatter_data = []
         for pred in all_predictions:
             scatter_data.append({
-                "transaction_amount": pred.derived_features.get("transaction_amount", 0),
+                "transaction_amount": pred.transaction_amount or 0,
                 "risk_score": pred.risk_score,
                 "is_fraud": pred.is_fraud
             })
         
-        return AnalyticsResponse(
+        return fast_json(AnalyticsResponse(
             status="success",
             message="Analytics generated successfully",
             data={
@@ -420,19 +921,82 @@ def get_analytics(db: Session = Depends(get_db)):
                     "fraud_rate_trend": fraud_rate_trend,
                     "fraud_by_channel": dict(channel_fraud),
                     "amount_vs_risk_scatter": scatter_data
-                }
+                },
+                "last_prediction_id": last_prediction_id
             }
-        )
+        ))
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analytics generation failed: {str(e)}")
 
+# ------------------ CUSTOMER PROFILE ------------------
+@app.get("/api/customers/{customer_id}/profile", response_model=CustomerProfileResponse)
+@bulkhead("analytics")
+def get_customer_profile(
+    customer_id: str,
+    current_user: TokenUser = Depends(get_current_user)
+):
+    """
+    Online aggregates for one customer (served from memory, no DB access)
+    Requires a valid token; runs on the analytics bulkhead like the other reads.
+    """
+    aggregate = customer_store.get(customer_id)
+    if aggregate is None:
+        raise HTTPException(status_code=404, detail="Customer not found")
+
+    return CustomerProfileResponse(
+        status="success",
+        message="Customer profile retrieved successfully",
+        data={
+            "customer_id": customer_id,
+            "transaction_count": aggregate.count,
+            "decayed_transaction_count": round(aggregate.decayed_count, 4),
+            "avg_transaction_amount": round(aggregate.mean_amount, 2),
+            "std_transaction_amount": round(aggregate.std_amount, 2),
+            "last_seen": datetime.utcfromtimestamp(aggregate.last_seen).isoformat(),
+            "seconds_since_last": round(aggregate.seconds_since_last, 1)
+        }
+    )
+
+
+# ------------------ LIVE ANALYTICS STREAM ------------------
+@app.get("/api/analytics/stream")
+async def stream_analytics(
+    request: Request,
+    email: Optional[str] = None,
+    since: Optional[int] = None,
+    last_event_id: Optional[int] = Header(None),
+    current_user: TokenUser = Depends(get_download_user)
+):
+    """
+    Server-Sent Events with incremental analytics (see utils/live_analytics.py)
+    Without email: `delta` events for the analytics page.
+    With email: `transactions` events with that user's new history rows.
+    since = last_prediction_id of the snapshot the client already holds.
+    Accepts ?token= (EventSource cannot send headers).
+    """
+    if email is not None:
+        check_token_email(current_user, email)
+    if last_event_id is not None:
+        since = last_event_id  # EventSource reconnect
+    subscriber = await live_analytics.subscribe(email=email, since=since)
+    return StreamingResponse(
+        live_analytics.stream(subscriber, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 # ------------------ MODEL METRICS ------------------
 @app.get("/api/metrics", response_model=MetricsResponse)
 def get_model_metrics():
     """
     Get model performance metrics (based on actual training results)
     """
+    importance = {"feature_importance": [], "method": None, "model_version": None}
+    if shap_explainer is not None:
+        importance = shap_explainer.global_importance()
+
     return MetricsResponse(
         status="success",
         message="Model metrics retrieved successfully",
@@ -453,17 +1017,11 @@ def get_model_metrics():
                     "false_negative": 15
                 }
             },
-            # Keep these unless you want to regenerate actual importance values
-            "feature_importance": [
-                {"feature": "transaction_amount", "importance": 0.234},
-                {"feature": "account_age_days", "importance": 0.189},
-                {"feature": "kyc_verified", "importance": 0.156},
-                {"feature": "is_night_txn", "importance": 0.123},
-                {"feature": "hour_of_day", "importance": 0.098},
-                {"feature": "channel_encoded", "importance": 0.087},
-                {"feature": "is_high_amount_transaction", "importance": 0.073},
-                {"feature": "day_of_week", "importance": 0.040}
-            ],
+            # Mean |SHAP| over the training data, computed once per model file
+            "feature_importance": importance["feature_importance"],
+            "feature_importance_method": importance["method"],
+            "model_file_version": importance["model_version"],
+            "attribution_stats": shap_explainer.metrics() if shap_explainer is not None else None,
             "performance_summary": {
                 "total_predictions": 1000,
                 "fraud_detected": 71,
@@ -476,71 +1034,133 @@ def get_model_metrics():
     )
 
 
+# ------------------ FEATURE DRIFT ------------------
+@app.get("/api/drift", response_model=DriftResponse)
+@bulkhead("analytics")
+def get_feature_drift(hours: Optional[float] = None):
+    """
+    PSI and KS drift of live features and model score against the training data
+    Histograms of all API workers over the last `hours` (default: every window kept)
+    """
+    if drift_monitor is None:
+        raise HTTPException(status_code=503, detail="Drift monitor not available")
+    if hours is not None and hours <= 0:
+        raise HTTPException(status_code=400, detail="hours must be > 0")
+
+    report = drift_monitor.report(hours)
+    if report["rows"] < settings.DRIFT_MIN_ROWS:
+        message = f"Only {report['rows']} scored transaction(s) in this window, too few to judge drift"
+    else:
+        message = f"{len(report['drifted_features'])} feature(s) drifting over the last {report['window_hours']}h"
+    return DriftResponse(status="success", message=message, data=report)
+
+
+# ------------------ WHAT-IF SIMULATION ------------------
+simulation_cache = ColumnCache()
+
+
+@app.post("/api/simulate", response_model=SimulationResponse)
+@bulkhead("analytics")
+@profile_endpoint
+def simulate_decisions(data: SimulationRequest, db: Session = Depends(get_read_db)):
+    """
+    Recompute fraud decisions over stored predictions with other thresholds and rule weights
+    Vectorized over the model probability and rule bitmask of every prediction in the range
+    """
+    try:
+        rule_weights = resolve_weights(data.rule_weights)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        start, end = day_bounds(data.start_date, data.end_date)
+        load_start = time.perf_counter()
+        with stage("db_query"):
+            columns, cached = simulation_cache.get(
+                (start, end, data.include_archive),
+                lambda: load_decision_columns(db, start, end, data.include_archive)
+            )
+        load_ms = (time.perf_counter() - load_start) * 1000
+
+        simulate_start = time.perf_counter()
+        with stage("simulation"):
+            result = simulate(columns, data.thresholds, rule_weights)
+        result["load_ms"] = round(load_ms, 1)
+        result["simulate_ms"] = round((time.perf_counter() - simulate_start) * 1000, 1)
+        result["cached"] = cached
+
+        return fast_json(SimulationResponse(
+            status="success",
+            message=f"Simulated {len(data.thresholds)} scenario(s) over {result['rows']} predictions",
+            data=result
+        ))
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Simulation failed: {str(e)}")
+
+
 # ------------------ BULK PREDICT ------------------
 @app.post("/api/bulk-predict", response_model=BulkPredictResponse)
-def bulk_predict_transactions(data: BulkPredictRequest, db: Session = Depends(get_db)):
+@bulkhead("bulk")
+@profile_endpoint
+def bulk_predict_transactions(
+    data: BulkPredictRequest,
+    explain: Optional[str] = None,
+    media_type: str = Depends(response_media_type),
+    current_user: TokenUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
     """
     Bulk fraud prediction for multiple transactions
-    Accepts up to 1000 transactions at once
+    Accepts up to 1000 transactions at once; explain=shap adds batched SHAP attributions
     """
     start_time = time.time()
     
     try:
+        check_explain_mode(explain)
+
         # Validate model is loaded
         if cat_model is None:
             raise HTTPException(status_code=503, detail="Model not available")
         
-        # Validate user
-        user = db.query(User).filter(User.email == data.email).first()
-        if not user:
-            raise HTTPException(status_code=401, detail="User not registered")
+        # Validate user (signed token, no database read)
+        check_token_email(current_user, data.email)
         
         results = []
+        stored = []
+        scored = []
+        explained = []
         successful = 0
         failed = 0
         fraud_detected = 0
+
+        # Ids already stored (or repeated in this request) fail per row instead of the whole insert
+        taken = set(known_transaction_ids(db, [txn.get("transaction_id") for txn in data.transactions]))
         
         # Process each transaction
         for txn_data in data.transactions:
             try:
+                if txn_data.get("transaction_id") in taken:
+                    raise ValueError("transaction_id already exists")
+                taken.add(txn_data.get("transaction_id"))
+
                 # Add email to transaction data
                 txn_data["email"] = data.email
                 
                 # Derive features
-                features_df = derive_features_auto(txn_data)
-                features = features_df.to_dict(orient="records")[0]
+                with stage("feature_derivation"):
+                    features_df = derive_features_auto(txn_data)
+                    features = features_df.to_dict(orient="records")[0]
                 
                 # Model prediction
-                model_proba = float(cat_model.predict_proba(features_df)[0, 1])
+                with stage("model_inference"):
+                    model_proba = float(cat_model.predict_proba(features_df)[0, 1])
                 
                 # Rule-based checks
-                rule_flags = []
-                rule_score = 0.0
-                
-                # Rule 1: High amount
-                if features["transaction_amount"] > 100000:
-                    rule_flags.append("High amount transaction (>₹100K)")
-                    rule_score += 0.2
-                
-                # Rule 2: Night transaction
-                if features["is_night_txn"] == 1 and features["transaction_amount"] > 50000:
-                    rule_flags.append("Large night-time transaction")
-                    rule_score += 0.2
-                
-                # Rule 3: New unverified account
-                if features["account_age_days"] < 10 and features["kyc_verified"] == 0:
-                    rule_flags.append("New unverified account")
-                    rule_score += 0.25
-                
-                # Rule 4: Weekend high-value
-                if features["is_weekend_txn"] == 1 and features["transaction_amount"] > 80000:
-                    rule_flags.append("Weekend high-value transaction")
-                    rule_score += 0.15
-                
-                # Rule 5: Holiday risk
-                if features.get("is_holiday_txn", 0) == 1 and features["transaction_amount"] > 70000:
-                    rule_flags.append("High-value holiday transaction")
-                    rule_score += 0.1
+                with stage("rules"):
+                    rule_flags, rule_score = evaluate_rules(features)
                 
                 # Combined score
                 combined_score = round(min(1.0, model_proba + rule_score), 4)
@@ -549,22 +1169,21 @@ def bulk_predict_transactions(data: BulkPredictRequest, db: Session = Depends(ge
                 if final_is_fraud:
                     fraud_detected += 1
                 
-                # Generate explanation
-                explanation = generate_explanation(
-                    txn_data, features, combined_score, rule_score, rule_flags
-                )
-                
                 # Store in database
-                new_pred = Prediction(
+                new_pred = Prediction.from_scoring(
                     customer_id=txn_data["customer_id"],
                     transaction_id=txn_data["transaction_id"],
                     email=data.email,
+                    features=features,
+                    model_probability=model_proba,
+                    rule_score=rule_score,
+                    rule_flags=rule_flags,
                     risk_score=combined_score,
-                    is_fraud=final_is_fraud,
-                    derived_features={**features, "rule_flags": rule_flags},
-                    explanation=explanation
+                    is_fraud=final_is_fraud
                 )
                 db.add(new_pred)
+                stored.append(new_pred)
+                scored.append((features, model_proba))
                 
                 # Add to results
                 results.append({
@@ -578,6 +1197,8 @@ def bulk_predict_transactions(data: BulkPredictRequest, db: Session = Depends(ge
                     "status": "success",
                     "error_message": None
                 })
+                if explain:
+                    explained.append((len(results) - 1, features))
                 
                 successful += 1
                 
@@ -595,17 +1216,42 @@ def bulk_predict_transactions(data: BulkPredictRequest, db: Session = Depends(ge
                     "error_message": str(e)
                 })
         
+        # One batched SHAP call for all scored rows
+        if explained:
+            with stage("shap"):
+                indices, rows = zip(*explained)
+                attributions = shap_attributions(pd.DataFrame(list(rows))[FEATURE_NAMES])
+            for index, attribution in zip(indices, attributions):
+                results[index]["attributions"] = attribution
+
         # Commit all successful predictions
-        db.commit()
+        with stage("db_write"):
+            try:
+                db.flush()
+            except IntegrityError as e:
+                # Stored by a concurrent request since the check above
+                db.rollback()
+                if is_duplicate_transaction(e):
+                    raise HTTPException(status_code=400, detail="transaction_id already exists")
+                raise
+            # Read ids/timestamps now; after commit each access would reload the row
+            committed = [(p.customer_id, p.transaction_amount, p.timestamp, p.id) for p in stored]
+            db.commit()
+        for customer_id, amount, timestamp, prediction_id in committed:
+            customer_store.update(customer_id, amount, epoch_seconds(timestamp), prediction_id)
+        for features, model_proba in scored:
+            observe_drift(features, model_proba)
+        live_analytics.notify()
+        queue_explanations([prediction_id for *_, prediction_id in committed])
         
         # Calculate processing time
         processing_time = round(time.time() - start_time, 2)
         
-        return BulkPredictResponse(
+        return negotiated(BulkPredictResponse(
             status="success",
             message=f"Bulk prediction completed: {successful} successful, {failed} failed",
             data={
-                "user": user.full_name,
+                "user": current_user.full_name,
                 "total_processed": len(data.transactions),
                 "successful": successful,
                 "failed": failed,
@@ -615,13 +1261,346 @@ def bulk_predict_transactions(data: BulkPredictRequest, db: Session = Depends(ge
                 "avg_time_per_transaction_ms": round((processing_time / len(data.transactions)) * 1000, 2),
                 "results": results
             }
-        )
+        ), media_type, "results")
         
     except HTTPException:
         raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Bulk prediction failed: {str(e)}")
+
+
+# ------------------ COLUMNAR BULK PREDICT ------------------
+@app.post("/api/bulk-predict/columnar", response_model=ColumnarBulkPredictResponse)
+@bulkhead("bulk")
+@profile_endpoint
+def bulk_predict_columnar(
+    data: ColumnarBulkPredictRequest,
+    media_type: str = Depends(response_media_type),
+    current_user: TokenUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Bulk fraud prediction for a column-oriented batch
+    Validates, featurizes and scores all rows in vectorized passes;
+    invalid rows are reported by index and the rest are stored
+    """
+    start_time = time.time()
+
+    try:
+        # Validate model is loaded
+        if cat_model is None:
+            raise HTTPException(status_code=503, detail="Model not available")
+
+        # Validate user (signed token, no database read)
+        check_token_email(current_user, data.email)
+
+        total = len(data.transaction_id)
+        with stage("validation"):
+            frame, errors = validate_columns(data)
+
+            # Ids already stored would fail the whole insert
+            existing = known_transaction_ids(db, frame["transaction_id"].tolist())
+            if existing:
+                duplicate = frame["transaction_id"].isin(list(existing))
+                for index in frame.index[duplicate]:
+                    errors[int(index)] = "transaction_id already exists"
+                frame = frame[~duplicate]
+
+        scored = None
+        prediction_ids = []
+        if len(frame):
+            with stage("scoring"):
+                scored = score_frame(cat_model, frame)
+
+            with stage("db_write"):
+                timestamp = datetime.utcnow()
+                rows = compact_rows(frame, scored, data.email)
+                prediction_ids = insert_predictions(db, rows, timestamp)
+                db.commit()
+
+            ts = epoch_seconds(timestamp)
+            for row, prediction_id in zip(rows, prediction_ids):
+                customer_store.update(row["customer_id"], row["transaction_amount"], ts, prediction_id)
+            observe_drift_rows(rows)
+            live_analytics.notify()
+            queue_explanations(prediction_ids)
+
+        successful = len(prediction_ids)
+        failed = len(errors)
+        fraud_detected = int(scored["is_fraud"].sum()) if scored is not None else 0
+        processing_time = round(time.time() - start_time, 2)
+
+        return negotiated(ColumnarBulkPredictResponse(
+            status="success",
+            message=f"Bulk prediction completed: {successful} successful, {failed} failed",
+            data={
+                "user": current_user.full_name,
+                "total_processed": total,
+                "successful": successful,
+                "failed": failed,
+                "fraud_detected": fraud_detected,
+                "fraud_rate": round((fraud_detected / successful * 100) if successful > 0 else 0, 2),
+                "processing_time_seconds": processing_time,
+                "avg_time_per_transaction_ms": round((processing_time / total) * 1000, 4),
+                "results": result_columns(frame, scored, prediction_ids),
+                "errors": [
+                    {"index": index, "transaction_id": data.transaction_id[index], "error_message": message}
+                    for index, message in sorted(errors.items())
+                ]
+            }
+        ), media_type, "results")
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Bulk prediction failed: {str(e)}")
+
+
+# ------------------ BATCH JOBS ------------------
+def record_job_chunk(rows: list, prediction_ids: list, timestamp: datetime):
+    """After each stored job chunk: same bookkeeping as /api/bulk-predict."""
+    ts = epoch_seconds(timestamp)
+    for row, prediction_id in zip(rows, prediction_ids):
+        customer_store.update(row["customer_id"], row["transaction_amount"], ts, prediction_id)
+    observe_drift_rows(rows)
+    live_analytics.notify()
+    queue_explanations(prediction_ids)
+
+
+job_manager = JobManager(SessionLocal, on_commit=record_job_chunk)
+
+
+@app.on_event("startup")
+def resume_jobs():
+    # At startup rather than import: the job pool's spawned processes import this module too
+    resumed = job_manager.resume_pending()
+    if resumed:
+        print(f"✅ Resumed {len(resumed)} batch job(s)")
+
+
+@app.on_event("shutdown")
+def stop_jobs():
+    job_manager.shutdown()
+
+
+def get_job_manifest(job_id: str, current_user: TokenUser) -> dict:
+    """Manifest of a job; 404 if unknown, 403 if it belongs to another user."""
+    manifest = read_manifest(job_id) if job_id.isalnum() else None
+    if manifest is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    check_token_email(current_user, manifest["email"])
+    return manifest
+
+
+def check_job_input(path: Path):
+    """400 unless the file is CSV/Parquet with the required columns."""
+    try:
+        columns = input_columns(path)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Could not read the file header")
+    missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Missing required columns: {', '.join(missing)}")
+
+
+def job_response(manifest: dict, message: str) -> Response:
+    return fast_json(JobResponse(status="success", message=message, data=progress(manifest)))
+
+
+@app.post("/api/jobs", response_model=JobResponse, status_code=202)
+@bulkhead("bulk")
+def submit_job(
+    email: str = Form(...),
+    file: UploadFile = File(...),
+    current_user: TokenUser = Depends(get_current_user)
+):
+    """
+    Score an uploaded CSV/Parquet file in the background
+    Returns the job id at once; follow /api/jobs/{job_id}/events for progress
+    """
+    check_token_email(current_user, email)
+    try:
+        file_format = input_format(file.filename or "")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    upload_dir = job_manager.new_upload_dir()
+    source = upload_dir / f"input.{file_format}"
+    max_bytes = settings.JOB_MAX_UPLOAD_MB * 1024 * 1024
+    size = 0
+    try:
+        with open(source, "wb") as out:
+            while block := file.file.read(1024 * 1024):
+                size += len(block)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413,
+                                        detail=f"File exceeds {settings.JOB_MAX_UPLOAD_MB}MB limit")
+                out.write(block)
+        check_job_input(source)
+        manifest = job_manager.create(email, source, file.filename, stored_input=True)
+    except Exception:
+        shutil.rmtree(upload_dir, ignore_errors=True)
+        raise
+
+    return fast_json(JobResponse(status="success", message="Job queued", data=progress(manifest)),
+                     status_code=202)
+
+
+@app.post("/api/jobs/local", response_model=JobResponse, status_code=202)
+@bulkhead("bulk")
+def submit_local_job(data: JobFromPathRequest, current_user: TokenUser = Depends(get_current_user)):
+    """
+    Score a file from the server's JOBS_LOCAL_ROOT in the background
+    The file is read in place (no upload)
+    """
+    check_token_email(current_user, data.email)
+
+    root = Path(settings.JOBS_LOCAL_ROOT).resolve()
+    source = (root / data.path).resolve()
+    if not source.is_relative_to(root):
+        raise HTTPException(status_code=400, detail="Path must be inside the jobs data directory")
+    if not source.is_file():
+        raise HTTPException(status_code=404, detail="File not found")
+    check_job_input(source)
+
+    manifest = job_manager.create(data.email, source, source.name, stored_input=False)
+    return fast_json(JobResponse(status="success", message="Job queued", data=progress(manifest)),
+                     status_code=202)
+
+
+@app.get("/api/jobs/{job_id}", response_model=JobResponse)
+def get_job(job_id: str, current_user: TokenUser = Depends(get_download_user)):
+    """Current progress of a batch job"""
+    manifest = get_job_manifest(job_id, current_user)
+    return job_response(manifest, f"Job {manifest['status']}")
+
+
+@app.get("/api/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, request: Request,
+                            current_user: TokenUser = Depends(get_download_user)):
+    """
+    Server-Sent Events with a batch job's progress
+    `progress` after every checkpointed chunk, `done` once it completes or fails.
+    Accepts ?token= (EventSource cannot send headers).
+    """
+    get_job_manifest(job_id, current_user)
+    return StreamingResponse(
+        progress_events(job_id, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/api/jobs/{job_id}/results")
+@bulkhead("analytics")
+def get_job_results(job_id: str, format: str = "csv", limit: int = 1000,
+                    current_user: TokenUser = Depends(get_download_user)):
+    """
+    Results of a completed batch job
+    format = csv (streamed) | parquet | json (first `limit` rows, for the UI).
+    Accepts ?token= so the browser can download it with a plain link.
+    """
+    manifest = get_job_manifest(job_id, current_user)
+    if manifest["status"] != "completed":
+        raise HTTPException(status_code=409, detail=f"Job is {manifest['status']}")
+
+    stem = Path(manifest["filename"]).stem
+    if format == "csv":
+        return StreamingResponse(
+            iter_results_csv(job_id),
+            media_type="text/csv",
+            headers={"Content-Disposition": f'attachment; filename="{stem}_scored.csv"'}
+        )
+    if format == "parquet":
+        return FileResponse(results_path(job_id), media_type="application/vnd.apache.parquet",
+                            filename=f"{stem}_scored.parquet")
+    if format != "json":
+        raise HTTPException(status_code=400, detail="format must be csv, parquet or json")
+
+    results = pd.read_parquet(results_path(job_id)).head(max(0, limit))
+    results = results.astype(object).where(results.notna(), None)
+    results["rules_triggered"] = [value.split("; ") if value else [] for value in results["rules_triggered"]]
+    successful = manifest["successful"]
+    return fast_json(JobResponse(
+        status="success",
+        message=f"Job completed: {successful} successful, {manifest['failed']} failed",
+        data={
+            **progress(manifest),
+            "total_processed": manifest["total_rows"],
+            "fraud_rate": round(manifest["fraud_detected"] / successful * 100 if successful else 0, 2),
+            "truncated": manifest["total_rows"] > len(results),
+            "results": results.to_dict(orient="records")
+        }
+    ))
+
+
+# ------------------ STREAMING SCORE (WEBSOCKET) ------------------
+def score_stream_batch(items: list) -> list:
+    """One /ws/score micro-batch: validate, score and store; one message per transaction."""
+    db = SessionLocal()
+    try:
+        messages, rows, prediction_ids = score_items(db, cat_model, items)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    if rows:
+        record_job_chunk(rows, prediction_ids, rows[0]["timestamp"])
+    return messages
+
+
+stream_scorer = StreamScorer(score_stream_batch, get_bulkhead("stream").run)
+
+
+@app.on_event("startup")
+async def start_stream_scorer():
+    stream_scorer.start()
+
+
+@app.on_event("shutdown")
+async def stop_stream_scorer():
+    await stream_scorer.stop()
+
+
+@app.websocket("/ws/score")
+async def stream_scoring(websocket: WebSocket, token: Optional[str] = None):
+    """
+    Persistent scoring channel for high-rate clients (see utils/streaming.py)
+    Authenticate with ?token=<access token> or an Authorization: Bearer header;
+    transactions are scored in shared micro-batches and answered by transaction_id
+    """
+    header = websocket.headers.get("authorization", "")
+    if token is None and header.lower().startswith("bearer "):
+        token = header[7:]
+    try:
+        current_user = decode_access_token(token or "")
+    except jwt.InvalidTokenError:
+        await websocket.close(code=1008, reason="Invalid or expired token")
+        return
+    if cat_model is None:
+        await websocket.close(code=1011, reason="Model not available")
+        return
+
+    await websocket.accept()
+    await stream_scorer.serve(websocket, current_user.email)
+
+
+@app.get("/api/health/stream")
+def stream_health():
+    """WebSocket scoring channel: connections, queue depth and batch sizes"""
+    return {
+        "status": "success",
+        "message": "Stream scorer metrics",
+        "data": stream_scorer.metrics()
+    }
+
+
 # ------------------ ROOT ENDPOINT ------------------
 @app.get("/")
 def root():
@@ -633,6 +1612,7 @@ def root():
             "health": "/api/health",
             "register": "/api/register",
             "login": "/api/login",
+            "logout": "/api/logout",
             "predict": "/api/predict",
             "transactions": "/api/transactions/{email}",
             "analytics": "/api/analytics",
@@ -4,7 +4,7 @@ Handles environment variables and application settings
 """
 
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 import os
 from pathlib import Path
 
@@ -25,12 +25,13 @@ class Settings(BaseSettings):
     DEBUG: bool = False
     
     # Database Configuration
-    DB_USER=<your_database_username>
-    DB_PASSWORD=<your_database_password>
-    DB_HOST=<your_database_host_url_or_ip>
-    DB_PORT=5432
-    DB_NAME=<your_database_name>
-    DB_SSLMODE=require
+    DB_BACKEND: str = "postgres"  # "postgres" | "sqlite" (embedded single-node, SQLITE_PATH)
+    DB_USER: str = "your_database_username"
+    DB_PASSWORD: str = "your_database_password"
+    DB_HOST: str = "your_database_host_url_or_ip"
+    DB_PORT: int = 5432
+    DB_NAME: str = "your_database_name"
+    DB_SSLMODE: str = "require"
     
 
 
@@ -39,9 +40,30 @@ class Settings(BaseSettings):
     DB_MAX_OVERFLOW: int = 10
     DB_POOL_TIMEOUT: int = 30
     DB_POOL_RECYCLE: int = 3600
+
+    # Read replica for analytics/history/metrics (empty: reads use the primary).
+    # DB_READ_URL is a full URL; otherwise DB_READ_HOST/DB_READ_PORT with the
+    # primary's credentials and database name
+    DB_READ_URL: str = ""
+    DB_READ_HOST: str = ""
+    DB_READ_PORT: int = 0
+    DB_READ_POOL_SIZE: int = 10
+    DB_READ_MAX_OVERFLOW: int = 10
+
+    # Embedded SQLite backend (DB_BACKEND=sqlite): WAL mode, pragmas set per connection
+    SQLITE_PATH: str = "state/riskshield.db"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"  # with WAL: survives process crashes; FULL also survives power loss
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000  # a writer waits this long for the write lock
+    SQLITE_CACHE_MB: int = 64  # page cache per connection
+    SQLITE_MMAP_MB: int = 256  # memory-mapped reads
+    SQLITE_WAL_AUTOCHECKPOINT: int = 1000  # pages written before the WAL is checkpointed
     
     # Model Configuration
     MODEL_PATH: str = "model/catboost_fraud_model_balanced_tuned.cbm"
+    # "catboost" loads MODEL_PATH with the catboost package, "numpy" evaluates
+    # the exported NUMPY_MODEL_PATH with utils/tree_model.py (no catboost import)
+    MODEL_BACKEND: str = "catboost"
+    NUMPY_MODEL_PATH: str = "model/catboost_fraud_model_balanced_tuned.npz"
     
     # Security
     SECRET_KEY: str = "change-this-secret-key-in-production"
@@ -91,7 +113,7 @@ class Settings(BaseSettings):
     # Feature Flags
     ENABLE_ML_MODEL: bool = True
     ENABLE_RULE_ENGINE: bool = True
-    ENABLE_HF_EXPLANATIONS: bool = False
+    ENABLE_HF_EXPLANATIONS: bool = False  # shorthand for EXPLANATION_BACKEND="hf"
     ENABLE_METRICS: bool = True
     
     # Performance
@@ -100,6 +122,125 @@ class Settings(BaseSettings):
     
     # Monitoring
     METRICS_PORT: int = 9090
+
+    # Request profiling (utils/profiling.py)
+    PROFILING_ADMIN_TOKEN: str = ""  # empty disables the X-Profile trace switch
+    PROFILE_SAMPLE_RATE: float = 0.0  # fraction of requests sampled to file
+    PROFILE_OUTPUT_FILE: str = "logs/profiles.jsonl"
+
+    # Request tracing (utils/tracing.py)
+    TRACE_SAMPLE_RATE: float = 0.0  # head sampling: fraction of requests traced and kept
+    TRACE_FOLLOW_PARENT: bool = True  # keep requests whose incoming traceparent is sampled
+    TRACE_TAIL_SAMPLING: bool = False  # record every request, keep slow/failed/flagged ones
+    TRACE_SLOW_MS: float = 250.0  # tail sampling keeps requests at least this slow
+    TRACE_KEEP_FLAGGED: bool = True  # tail sampling keeps fraud-flagged and degraded predictions
+    TRACE_EXPORTER: str = "jsonl"  # "jsonl" (TRACE_OUTPUT_FILE) | "otlp" (TRACE_OTLP_ENDPOINT, OTLP/JSON)
+    TRACE_OUTPUT_FILE: str = "logs/traces.jsonl"
+    TRACE_OTLP_ENDPOINT: str = "http://localhost:4318/v1/traces"
+    TRACE_SERVICE_NAME: str = "riskshield-api"
+    TRACE_EXPORT_QUEUE: int = 1000  # kept traces waiting for export; more are dropped
+    TRACE_EXPORT_BATCH: int = 64  # traces per write / POST
+    TRACE_SQL_MAX_CHARS: int = 500  # statement text kept per SQL span
+
+    # Partitioning & archival (utils/partitions.py, PostgreSQL only)
+    PARTITION_MONTHS_AHEAD: int = 2  # future monthly partitions kept ready
+    PARTITION_CHECK_HOURS: float = 6.0  # how often the API re-runs ensure_partitions (0: startup only)
+    RETENTION_MONTHS: int = 12  # older months are exported to Parquet and detached
+    ARCHIVE_DIR: str = "archive"
+
+    # Live analytics stream (utils/live_analytics.py)
+    LIVE_STREAM_TICK_SECONDS: float = 1.0  # deltas are coalesced per tick
+    LIVE_STREAM_POLL_SECONDS: float = 5.0  # picks up other workers' writes
+    LIVE_STREAM_HEARTBEAT_SECONDS: float = 15.0
+    LIVE_STREAM_BATCH_LIMIT: int = 5000  # rows per tail query / catch-up
+    LIVE_STREAM_QUEUE_SIZE: int = 100  # events buffered per slow client
+    LIVE_STREAM_GAP_SECONDS: float = 30.0  # how long skipped ids are re-checked
+
+    # Online per-customer aggregates (utils/customer_store.py)
+    CUSTOMER_STORE_HALF_LIFE_HOURS: float = 24.0  # decay of the transaction count
+    CUSTOMER_STORE_PATH: str = "state/customer_store.npz"
+
+    # Calendar table for feature derivation (utils/calendar_table.py)
+    CALENDAR_FIRST_YEAR: int = 2015
+    CALENDAR_LAST_YEAR: int = 2035
+    CALENDAR_SUBDIVISION: str = ""  # e.g. "MH" adds that state's holidays
+    CALENDAR_FESTIVALS: List[str] = []  # "YYYY-MM-DD:YYYY-MM-DD" periods
+
+    # Feature drift monitor (utils/drift.py)
+    DRIFT_ENABLED: bool = True
+    DRIFT_REFERENCE_CSV: str = "../../data/processed/train_data/train_features.csv"
+    DRIFT_REFERENCE_PATH: str = "state/drift_reference.npz"  # cached reference histograms
+    DRIFT_DIR: str = "state/drift"  # per-worker histogram files, merged on read
+    DRIFT_BINS: int = 10  # quantile bins for amount, account age and model probability
+    DRIFT_WINDOW_MINUTES: int = 60
+    DRIFT_WINDOWS: int = 24  # windows kept (24 x 60 min = last day)
+    DRIFT_FLUSH_SECONDS: float = 30.0
+    DRIFT_MIN_ROWS: int = 200  # fewer rows are reported as insufficient_data
+
+    # SHAP attributions (utils/attributions.py, needs catboost)
+    SHAP_BUDGET_MS_PER_ROW: float = 5.0  # explain=shap latency allowance per row
+    SHAP_CACHE_SIZE: int = 50000  # quantized signatures kept with their values
+    SHAP_CHUNK_ROWS: int = 256
+    SHAP_BACKGROUND_CSV: str = "../../data/processed/train_data/train_features.csv"
+    SHAP_IMPORTANCE_DIR: str = "state"  # global importance cached per model version
+
+    # History export (utils/export.py)
+    EXPORT_BATCH_ROWS: int = 2000  # rows fetched (yield_per) and encoded per chunk
+    EXPORT_MAX_CONCURRENT: int = 4  # exports streaming at once; more get 503
+
+    # Synthetic scale-test data (utils/synthetic.py, scripts/seed_database.py)
+    SYNTHETIC_SOURCE_CSV: str = "../../data/raw/fraud_dataset.csv"  # sample the marginals are fitted on
+    SEED_BATCH_ROWS: int = 100_000  # rows generated, scored and loaded per batch
+
+    # What-if simulation (utils/simulation.py)
+    SIMULATION_CACHE_SECONDS: float = 60.0  # loaded columns reused per date range
+
+    # Explanation worker (utils/explanations.py)
+    EXPLANATION_BACKEND: str = "template"  # "template" | "hf"
+    EXPLANATION_WORKER_ENABLED: bool = False  # also store template text (tests, benchmarks)
+    EXPLANATION_BATCH_SIZE: int = 64
+    EXPLANATION_BATCH_WAIT_MS: int = 200
+    EXPLANATION_QUEUE_SIZE: int = 10000
+    EXPLANATION_CACHE_SIZE: int = 4096  # signatures kept with their text
+    HF_EXPLANATION_MODEL: str = "distilgpt2"
+    HF_EXPLANATION_MAX_TOKENS: int = 150
+
+    # Bulkhead executors (utils/bulkheads.py): concurrent calls per endpoint
+    # class, and how many more may wait before new ones get 503
+    BULKHEAD_SCORING_WORKERS: int = 16
+    BULKHEAD_SCORING_QUEUE: int = 64
+    BULKHEAD_BULK_WORKERS: int = 2
+    BULKHEAD_BULK_QUEUE: int = 4
+    BULKHEAD_ANALYTICS_WORKERS: int = 4
+    BULKHEAD_ANALYTICS_QUEUE: int = 16
+    BULKHEAD_AUTH_WORKERS: int = 4
+    BULKHEAD_AUTH_QUEUE: int = 32
+    BULKHEAD_STREAM_WORKERS: int = 2  # micro-batches scored at once
+    BULKHEAD_STREAM_QUEUE: int = 2
+
+    # Latency budget and circuit breakers for /api/predict (utils/breakers.py)
+    PREDICT_LATENCY_BUDGET_MS: float = 250.0  # default deadline; X-Latency-Budget-Ms overrides
+    PREDICT_MIN_BUDGET_MS: float = 20.0  # client budgets are clamped to this range
+    PREDICT_MAX_BUDGET_MS: float = 5000.0
+    PREDICT_WRITE_RESERVE_MS: float = 40.0  # kept back from guarded stages for the insert and response
+    BREAKER_FAILURE_THRESHOLD: int = 5  # consecutive timeouts/errors that open a breaker
+    BREAKER_RESET_SECONDS: float = 30.0  # open time before one trial call is let through
+    BREAKER_WORKERS: int = 8  # threads per guarded stage (abandoned calls hold theirs until done)
+    DEGRADED_FRAUD_THRESHOLD: float = 0.4  # rule-only score flagged as fraud while the model is skipped
+
+    # WebSocket scoring channel (utils/streaming.py)
+    STREAM_MAX_BATCH: int = 256  # transactions scored together
+    STREAM_MAX_WAIT_MS: float = 2.0  # a batch waits this long to fill after its first row
+    STREAM_QUEUE_ROWS: int = 4096  # received but not yet batched, all connections; full stops reads
+    STREAM_MAX_IN_FLIGHT: int = 512  # per connection: unanswered transactions before reads stop
+
+    # Batch scoring jobs (utils/jobs.py)
+    JOBS_DIR: str = "jobs"  # manifests, inputs, checkpoints and results
+    JOB_CHUNK_ROWS: int = 5000  # rows per chunk / checkpoint
+    JOB_WORKERS: int = 2  # scoring processes
+    JOB_MAX_UPLOAD_MB: int = 200
+    JOBS_LOCAL_ROOT: str = "data"  # /api/jobs/local only reads files under here
+    JOB_PROGRESS_POLL_SECONDS: float = 0.5
     
     # Email Configuration (for alerts - optional)
     SMTP_HOST: str = "smtp.gmail.com"
@@ -117,12 +258,28 @@ class Settings(BaseSettings):
     
     @property
     def database_url(self) -> str:
-        """Generate database URL (Neon + local compatible)"""
+        """Generate database URL (Neon + local compatible, or the embedded SQLite file)"""
+        if self.DB_BACKEND == "sqlite":
+            return f"sqlite:///{self.SQLITE_PATH}"
         return (
             f"postgresql://{self.DB_USER}:{self.DB_PASSWORD}@"
             f"{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}?sslmode={self.DB_SSLMODE}"
         )
 
+    @property
+    def read_database_url(self) -> Optional[str]:
+        """Read replica URL, or None when reads go to the primary"""
+        if self.DB_BACKEND == "sqlite":
+            return None  # readers share the file (WAL: they never block the writer)
+        if self.DB_READ_URL:
+            return self.DB_READ_URL
+        if not self.DB_READ_HOST:
+            return None
+        return (
+            f"postgresql://{self.DB_USER}:{self.DB_PASSWORD}@"
+            f"{self.DB_READ_HOST}:{self.DB_READ_PORT or self.DB_PORT}/{self.DB_NAME}?sslmode={self.DB_SSLMODE}"
+        )
+
     @property
     def async_database_url(self) -> str:
         """Generate async database URL (Neon + asyncpg)"""
@@ -189,7 +346,10 @@ def display_config():
     print(f"Debug Mode: {settings.DEBUG}")
     print(f"API Host: {settings.API_HOST}")
     print(f"API Port: {settings.API_PORT}")
-    print(f"Database: {settings.DB_NAME} @ {settings.DB_HOST}:{settings.DB_PORT}")
+    if settings.DB_BACKEND == "sqlite":
+        print(f"Database: SQLite (WAL) @ {settings.SQLITE_PATH}")
+    else:
+        print(f"Database: {settings.DB_NAME} @ {settings.DB_HOST}:{settings.DB_PORT}")
     print(f"Model Path: {settings.MODEL_PATH}")
     print(f"Model Exists: {settings.validate_model_path()}")
     print(f"Fraud Threshold: {settings.FRAUD_THRESHOLD}")
@@ -208,9 +368,17 @@ def validate_configuration() -> List[str]:
     issues = []
     
     # Check database configuration
+    if settings.DB_BACKEND not in ("postgres", "sqlite"):
+        issues.append(f"❌ ERROR: Unknown DB_BACKEND {settings.DB_BACKEND!r} (postgres or sqlite)")
+    if settings.DB_BACKEND == "sqlite" and settings.SQLITE_SYNCHRONOUS.upper() not in ("OFF", "NORMAL", "FULL", "EXTRA"):
+        issues.append("❌ ERROR: SQLITE_SYNCHRONOUS must be OFF, NORMAL, FULL or EXTRA")
     if settings.DB_PASSWORD == "admin123":
         issues.append("⚠️  WARNING: Using default database password")
     
+    # Check tracing exporter
+    if settings.TRACE_EXPORTER not in ("jsonl", "otlp"):
+        issues.append("❌ ERROR: TRACE_EXPORTER must be jsonl or otlp")
+
     # Check secret keys
     if "change-this" in settings.SECRET_KEY.lower():
         issues.append("⚠️  WARNING: Using default SECRET_KEY")
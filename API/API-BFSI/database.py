@@ -3,7 +3,11 @@ Database Configuration and Connection Management
 Uses centralized configuration from config.py
 """
 
-from sqlalchemy import create_engine
+import threading
+from pathlib import Path
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from config import settings
@@ -14,24 +18,101 @@ logger = logging.getLogger(__name__)
 # Database URL from settings
 SQLALCHEMY_DATABASE_URL = settings.database_url
 
-# Create engine with connection pooling
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    pool_size=settings.DB_POOL_SIZE,
-    max_overflow=settings.DB_MAX_OVERFLOW,
-    pool_timeout=settings.DB_POOL_TIMEOUT,
-    pool_recycle=settings.DB_POOL_RECYCLE,
-    pool_pre_ping=True,  # Verify connections before using
-    echo=settings.DEBUG  # Log SQL queries in debug mode
-)
+# Replica URL (None: reads use the primary)
+SQLALCHEMY_READ_DATABASE_URL = settings.read_database_url
+
+
+class PoolStats:
+    """Checkout / connect counters for one engine's pool (see pool_status)."""
+
+    def __init__(self, engine):
+        self.checkouts = 0
+        self.connects = 0
+        self.invalidated = 0
+        self._lock = threading.Lock()
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "invalidate", self._on_invalidate)
 
-# Session factory
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidated += 1
+
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    WAL journal and tuned pragmas on every new SQLite connection
+    Readers never block the writer, and a commit with synchronous=NORMAL
+    only appends to the WAL (fsync at checkpoints), so it stays well under
+    a millisecond. foreign_keys gives the ON DELETE CASCADE PostgreSQL has.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS.upper()}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.execute(f"PRAGMA cache_size=-{int(settings.SQLITE_CACHE_MB) * 1024}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_MB) * 1024 * 1024}")
+    cursor.execute(f"PRAGMA wal_autocheckpoint={int(settings.SQLITE_WAL_AUTOCHECKPOINT)}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+def _create_engine(url: str, pool_size: int, max_overflow: int):
+    """Engine with connection pooling (SQLite files get WAL and the SQLITE_* pragmas)"""
+    engine = create_engine(
+        url,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=True,  # Verify connections before using
+        echo=settings.DEBUG  # Log SQL queries in debug mode
+    )
+    if engine.dialect.name == "sqlite":
+        database = make_url(url).database
+        if database and database != ":memory:":
+            Path(database).parent.mkdir(parents=True, exist_ok=True)
+        event.listen(engine, "connect", _sqlite_pragmas)
+    return engine
+
+
+# Primary: all writes, and reads that must see them (velocity rule, duplicate checks)
+engine = _create_engine(SQLALCHEMY_DATABASE_URL, settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW)
+
+# Read replica with its own pool: analytics, history and metrics scans
+if SQLALCHEMY_READ_DATABASE_URL:
+    read_engine = _create_engine(
+        SQLALCHEMY_READ_DATABASE_URL, settings.DB_READ_POOL_SIZE, settings.DB_READ_MAX_OVERFLOW
+    )
+else:
+    read_engine = engine
+
+pool_stats = {"primary": PoolStats(engine)}
+if read_engine is not engine:
+    pool_stats["read"] = PoolStats(read_engine)
+
+# Session factories
 SessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
     bind=engine
 )
 
+ReadSessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    bind=read_engine
+)
+
 # Base class for ORM models
 Base = declarative_base()
 
@@ -52,6 +133,65 @@ def get_db():
         db.close()
 
 
+def get_read_db():
+    """
+    Read-only session dependency on the replica (the primary without one)
+    Replica reads may lag the primary slightly
+    """
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def pool_status() -> dict:
+    """Current pool usage and lifetime counters per engine"""
+    engines = {"primary": engine}
+    if read_engine is not engine:
+        engines["read"] = read_engine
+
+    status = {}
+    for name, pool_engine in engines.items():
+        pool = pool_engine.pool
+        stats = pool_stats[name]
+        status[name] = {
+            "url": pool_engine.url.render_as_string(hide_password=True),
+            "pool_class": type(pool).__name__,
+            "size": pool.size() if hasattr(pool, "size") else None,
+            "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+            "checked_in": pool.checkedin() if hasattr(pool, "checkedin") else None,
+            "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+            "checkouts": stats.checkouts,
+            "connects": stats.connects,
+            "invalidated": stats.invalidated
+        }
+    return status
+
+
+def storage_status() -> dict:
+    """Backend of the primary, with journal mode and file sizes for SQLite"""
+    status = {"backend": engine.dialect.name, "url": engine.url.render_as_string(hide_password=True)}
+    if engine.dialect.name != "sqlite":
+        return status
+    with engine.connect() as connection:
+        def pragma(name: str):
+            return connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+        page_size = pragma("page_size")
+        status.update({
+            "journal_mode": pragma("journal_mode"),
+            "synchronous": {0: "OFF", 1: "NORMAL", 2: "FULL", 3: "EXTRA"}.get(pragma("synchronous")),
+            "foreign_keys": bool(pragma("foreign_keys")),
+            "database_bytes": page_size * pragma("page_count"),
+            "free_bytes": page_size * pragma("freelist_count")
+        })
+    database = engine.url.database
+    wal = Path(f"{database}-wal") if database else None
+    status["wal_bytes"] = wal.stat().st_size if wal is not None and wal.exists() else 0
+    return status
+
+
 def init_db():
     """
     Initialize database tables
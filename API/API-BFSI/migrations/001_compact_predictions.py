@@ -0,0 +1,125 @@
+"""
+Migration 001: compact typed storage for predictions
+
+  1. Adds the typed columns, bitmasks and the (customer_id, timestamp) index
+  2. Makes derived_features nullable (new rows no longer write it)
+  3. Backfills existing rows from their derived_features JSON in batches
+  4. Drops explanations that equal the template rendering (re-rendered on
+     read) and, unless --keep-json is given, clears the JSON payload
+
+model_probability is backfilled as risk_score - rule_score; rows whose
+combined score was capped at 1.0 therefore get a lower bound.
+
+Run from API/API-BFSI (safe to re-run, only un-migrated rows are touched):
+    python migrations/001_compact_predictions.py [--batch-size 5000] [--keep-json]
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect, text
+
+from database import engine, SessionLocal
+from models import Prediction
+from utils.features import pack_feature_flags
+from utils.hf_model import generate_explanation
+from utils.rules import RULE_FLAGS, rules_to_mask, mask_to_score
+
+TABLE = Prediction.__table__
+
+
+def add_columns() -> None:
+    existing = {col["name"] for col in inspect(engine).get_columns(TABLE.name)}
+    with engine.begin() as conn:
+        for column in TABLE.columns:
+            if column.name in existing:
+                continue
+            col_type = column.type.compile(dialect=engine.dialect)
+            conn.execute(text(f"ALTER TABLE {TABLE.name} ADD COLUMN {column.name} {col_type}"))
+            print(f"   + column {column.name} {col_type}")
+
+        if engine.dialect.name == "postgresql":
+            conn.execute(text(f"ALTER TABLE {TABLE.name} ALTER COLUMN derived_features DROP NOT NULL"))
+        else:
+            print("   ⚠️ derived_features NOT NULL can only be dropped on PostgreSQL; "
+                  "recreate the table on other databases")
+
+    for index in TABLE.indexes:
+        index.create(bind=engine, checkfirst=True)
+
+
+def compact_row(row) -> dict:
+    """Typed values for one legacy row."""
+    legacy = dict(row.derived_features or {})
+    rule_flags = [flag for flag in legacy.pop("rule_flags", []) if flag in RULE_FLAGS]
+    rule_mask = rules_to_mask(rule_flags)
+    rule_score = mask_to_score(rule_mask)
+
+    values = {
+        "id": row.id,
+        "transaction_amount": legacy.get("transaction_amount", 0),
+        "account_age_days": legacy.get("account_age_days", 0),
+        "channel": legacy.get("channel_encoded", 0),
+        "hour_of_day": legacy.get("hour_of_day", 0),
+        "day_of_week": legacy.get("day_of_week", 0),
+        "feature_flags": pack_feature_flags(legacy),
+        "model_probability": max(0.0, row.risk_score - rule_score),
+        "rule_score": rule_score,
+        "rule_mask": rule_mask,
+    }
+
+    rendered = generate_explanation({}, legacy, row.risk_score, rule_score, rule_flags)
+    if row.explanation == rendered:
+        values["explanation"] = None
+    return values
+
+
+def backfill(batch_size: int, keep_json: bool) -> int:
+    migrated = 0
+    last_id = 0
+    while True:
+        with SessionLocal() as db:
+            rows = db.query(
+                Prediction.id, Prediction.risk_score,
+                Prediction.derived_features, Prediction.explanation
+            ).filter(
+                Prediction.feature_flags.is_(None),
+                Prediction.id > last_id
+            ).order_by(Prediction.id).limit(batch_size).all()
+            if not rows:
+                return migrated
+
+            mappings = []
+            for row in rows:
+                values = compact_row(row)
+                if not keep_json:
+                    values["derived_features"] = None
+                mappings.append(values)
+
+            db.bulk_update_mappings(Prediction, mappings)
+            db.commit()
+            last_id = rows[-1].id
+            migrated += len(rows)
+            print(f"   migrated {migrated} rows (last id {last_id})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact the predictions table")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--keep-json", action="store_true",
+                        help="Keep the legacy derived_features JSON after backfilling")
+    args = parser.parse_args()
+
+    print("🗄️  Migration 001: compact predictions")
+    add_columns()
+    migrated = backfill(args.batch_size, args.keep_json)
+    print(f"✅ Done, {migrated} rows migrated")
+    if migrated and not args.keep_json and engine.dialect.name == "postgresql":
+        print("ℹ️  Run VACUUM (FULL) predictions to return the freed space to the OS")
+
+
+if __name__ == "__main__":
+    main()
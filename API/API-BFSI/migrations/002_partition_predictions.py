@@ -0,0 +1,120 @@
+"""
+Migration 002: monthly range partitioning of predictions (PostgreSQL only)
+
+  1. Renames the current table to predictions_unpartitioned
+  2. Creates predictions PARTITION BY RANGE (timestamp) with the same columns
+     and one partition per month from the oldest row to PARTITION_MONTHS_AHEAD
+  3. Copies the rows, moves the id sequence over and verifies the row count
+  4. Installs the transaction_id registry (see below)
+  5. Drops the old table unless --keep-old is given
+
+PostgreSQL requires unique constraints on a partitioned table to include the
+partition key, so the primary key becomes (id, timestamp) and the
+transaction_id unique index becomes (transaction_id, timestamp). Table-wide
+transaction_id uniqueness is kept by prediction_transaction_ids, filled by an
+insert trigger (utils/partitions.py). Tables partitioned before the registry
+existed get it from migrations/003_transaction_id_registry.py.
+
+Run from API/API-BFSI after 001_compact_predictions.py:
+    python migrations/002_partition_predictions.py [--keep-old]
+Then schedule `python -m utils.partitions archive` (see utils/partitions.py).
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+from config import settings
+from database import engine
+from models import Prediction
+from utils.partitions import (
+    TABLE, add_months, create_partition, install_transaction_id_registry, is_partitioned, month_start
+)
+
+OLD_TABLE = f"{TABLE}_unpartitioned"
+
+
+def create_indexes(conn) -> None:
+    for index in Prediction.__table__.indexes:
+        columns = [f'"{column.name}"' for column in index.columns]
+        if index.unique and '"timestamp"' not in columns:
+            columns.append('"timestamp"')
+        unique = "UNIQUE " if index.unique else ""
+        conn.execute(text(f"CREATE {unique}INDEX {index.name} ON {TABLE} ({', '.join(columns)})"))
+        print(f"   + index {index.name} ({', '.join(columns)})")
+
+
+def partition_table(keep_old: bool) -> None:
+    with engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE {TABLE} RENAME TO {OLD_TABLE}"))
+        # Free the index names for the new table
+        for (index_name,) in conn.execute(text(
+            "SELECT indexname FROM pg_indexes WHERE tablename = :table"
+        ), {"table": OLD_TABLE}):
+            conn.execute(text(f"ALTER INDEX {index_name} RENAME TO {index_name}_old"))
+
+        conn.execute(text(
+            f"CREATE TABLE {TABLE} (LIKE {OLD_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+            f'PARTITION BY RANGE ("timestamp")'
+        ))
+        conn.execute(text(f'ALTER TABLE {TABLE} ALTER COLUMN "timestamp" SET NOT NULL'))
+        conn.execute(text(f'ALTER TABLE {TABLE} ADD PRIMARY KEY (id, "timestamp")'))
+        conn.execute(text(
+            f"ALTER TABLE {TABLE} ADD FOREIGN KEY (email) REFERENCES users (email) ON DELETE CASCADE"
+        ))
+        create_indexes(conn)
+
+        sequence = conn.execute(text(
+            "SELECT pg_get_serial_sequence(:table, 'id')"
+        ), {"table": OLD_TABLE}).scalar()
+        if sequence:
+            conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {TABLE}.id"))
+
+        current = month_start(datetime.utcnow().date())
+        oldest = conn.execute(text(f'SELECT min("timestamp") FROM {OLD_TABLE}')).scalar()
+        month = month_start(oldest.date()) if oldest else current
+        last = add_months(current, settings.PARTITION_MONTHS_AHEAD)
+        while month <= last:
+            print(f"   + partition {create_partition(conn, month)}")
+            month = add_months(month, 1)
+
+        columns = ", ".join(f'"{column.name}"' for column in Prediction.__table__.columns)
+        copied = conn.execute(text(
+            f'INSERT INTO {TABLE} ({columns}) SELECT {columns} FROM {OLD_TABLE} '
+            f'WHERE "timestamp" IS NOT NULL'
+        )).rowcount
+        total = conn.execute(text(f"SELECT count(*) FROM {OLD_TABLE}")).scalar()
+        if copied != total:
+            raise RuntimeError(f"Copied {copied} of {total} rows (rows without timestamp?)")
+        print(f"   copied {copied} rows")
+        registered = install_transaction_id_registry(conn)
+        print(f"   + transaction_id registry ({registered} ids)")
+
+        if not keep_old:
+            conn.execute(text(f"DROP TABLE {OLD_TABLE}"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Partition the predictions table by month")
+    parser.add_argument("--keep-old", action="store_true",
+                        help=f"Keep the original table as {OLD_TABLE}")
+    args = parser.parse_args()
+
+    print("🗄️  Migration 002: partition predictions by month")
+    if engine.dialect.name != "postgresql":
+        print(f"⚠️ Range partitioning needs PostgreSQL (connected to {engine.dialect.name}); nothing to do")
+        return
+    if is_partitioned(engine):
+        print("✅ predictions is already partitioned")
+        return
+    partition_table(args.keep_old)
+    print("✅ Done")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Migration 003: table-wide transaction_id uniqueness for a partitioned predictions table
+
+Migration 002 could only keep a (transaction_id, timestamp) unique index, so
+a repeated transaction_id with another timestamp was stored twice. This adds
+prediction_transaction_ids (transaction_id PRIMARY KEY) and the row trigger
+that registers every inserted id (utils/partitions.py), so a repeat fails in
+the database whatever path inserts it. Databases partitioned by the current
+002 already have it; running this again is harmless.
+
+Ids that are already duplicated are listed and registered once; remove the
+extra rows by hand if they should not be there.
+
+Run from API/API-BFSI after 002_partition_predictions.py:
+    python migrations/003_transaction_id_registry.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+from database import engine
+from utils.partitions import REGISTRY_TABLE, TABLE, install_transaction_id_registry, is_partitioned
+
+DUPLICATES_SHOWN = 20
+
+
+def main():
+    print("🗄️  Migration 003: transaction_id registry")
+    if engine.dialect.name != "postgresql" or not is_partitioned(engine):
+        print("✅ predictions is not partitioned: its transaction_id index is already unique")
+        return
+
+    with engine.begin() as conn:
+        # Serialise with concurrent inserts while the backfill runs
+        conn.execute(text(f"LOCK TABLE {TABLE} IN SHARE ROW EXCLUSIVE MODE"))
+        duplicates = conn.execute(text(
+            f"SELECT transaction_id, count(*) FROM {TABLE} GROUP BY transaction_id "
+            f"HAVING count(*) > 1 ORDER BY count(*) DESC LIMIT {DUPLICATES_SHOWN}"
+        )).all()
+        registered = install_transaction_id_registry(conn)
+
+    print(f"   {registered} id(s) registered in {REGISTRY_TABLE}")
+    if duplicates:
+        print(f"⚠️ transaction_ids already stored more than once (first {DUPLICATES_SHOWN}):")
+        for transaction_id, count in duplicates:
+            print(f"   {transaction_id}: {count} rows")
+    print("✅ Done")
+
+
+if __name__ == "__main__":
+    main()
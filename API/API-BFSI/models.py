@@ -1,8 +1,12 @@
-from sqlalchemy import Column, String, Float, Integer, DateTime, JSON, ForeignKey, Text
+from sqlalchemy import Column, String, Float, Integer, SmallInteger, DateTime, JSON, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from database import Base
 from datetime import datetime
 
+from utils.features import pack_feature_flags, unpack_features
+from utils.rules import rules_to_mask, mask_to_rules
+from utils.hf_model import generate_explanation
+
 # ==================== USERS TABLE ====================
 class User(Base):
     """
@@ -26,6 +30,14 @@ class User(Base):
 class Prediction(Base):
     """
     Predictions table for storing fraud detection results
+
+    Hot fields are typed columns; the seven binary features and the triggered
+    rules are packed into bitmasks (see utils/features.py and utils/rules.py).
+    Template explanations are not stored - `explanation` is only set when the
+    text cannot be re-rendered from the row, and `derived_features` only holds
+    the JSON of rows written before migrations/001_compact_predictions.py.
+    The `features`, `rule_flags` and `explanation_text` properties rebuild the
+    values the API has always returned.
     """
     __tablename__ = "predictions"
 
@@ -35,12 +47,93 @@ class Prediction(Base):
     email = Column(String(100), ForeignKey("users.email", ondelete="CASCADE"), nullable=False)
     risk_score = Column(Float, nullable=False)
     is_fraud = Column(Integer, nullable=False)
-    derived_features = Column(JSON, nullable=False)
+
+    # Typed feature columns
+    transaction_amount = Column(Float)
+    account_age_days = Column(Integer)
+    channel = Column(SmallInteger)
+    hour_of_day = Column(SmallInteger)
+    day_of_week = Column(SmallInteger)
+    feature_flags = Column(SmallInteger)
+
+    # Model / rule breakdown of risk_score
+    model_probability = Column(Float)
+    rule_score = Column(Float)
+    rule_mask = Column(SmallInteger)
+
+    derived_features = Column(JSON, nullable=True)
     explanation = Column(Text, nullable=True)
     timestamp = Column(DateTime, default=datetime.utcnow, index=True)
 
     # Relationship
     user = relationship("User", back_populates="predictions")
 
+    __table_args__ = (
+        # Velocity rule: one customer's recent predictions
+        Index("ix_predictions_customer_timestamp", "customer_id", "timestamp"),
+    )
+
+    @classmethod
+    def from_scoring(cls, **kwargs) -> "Prediction":
+        """Build a compact row from a scoring result (see compact_values)."""
+        return cls(**cls.compact_values(**kwargs))
+
+    @staticmethod
+    def compact_values(customer_id: str, transaction_id: str, email: str,
+                       features: dict, model_probability: float, rule_score: float,
+                       rule_flags: list, risk_score: float, is_fraud: int,
+                       explanation: str = None) -> dict:
+        """Column values for a scoring result, also usable for bulk inserts."""
+        return dict(
+            customer_id=customer_id,
+            transaction_id=transaction_id,
+            email=email,
+            risk_score=risk_score,
+            is_fraud=is_fraud,
+            transaction_amount=features["transaction_amount"],
+            account_age_days=features["account_age_days"],
+            channel=features["channel_encoded"],
+            hour_of_day=features["hour_of_day"],
+            day_of_week=features["day_of_week"],
+            feature_flags=pack_feature_flags(features),
+            model_probability=model_probability,
+            rule_score=rule_score,
+            rule_mask=rules_to_mask(rule_flags),
+            explanation=explanation
+        )
+
+    # ---------- Compatibility layer for the pre-compact JSON layout ----------
+    @property
+    def is_compact(self) -> bool:
+        return self.feature_flags is not None
+
+    @property
+    def rule_flags(self) -> list:
+        if self.is_compact:
+            return mask_to_rules(self.rule_mask or 0)
+        return (self.derived_features or {}).get("rule_flags", [])
+
+    @property
+    def features(self) -> dict:
+        """Derived features plus rule_flags, as the API returned them before."""
+        if not self.is_compact:
+            return self.derived_features or {}
+        features = unpack_features(
+            self.feature_flags, self.transaction_amount, self.account_age_days,
+            self.channel, self.hour_of_day, self.day_of_week
+        )
+        features["rule_flags"] = self.rule_flags
+        return features
+
+    @property
+    def explanation_text(self) -> str:
+        """Stored explanation, or the template explanation rendered on demand."""
+        if self.explanation is not None or not self.is_compact:
+            return self.explanation
+        features = self.features
+        return generate_explanation(
+            {}, features, self.risk_score, self.rule_score or 0.0, features["rule_flags"]
+        )
+
     def __repr__(self):
-        return f"<Prediction(id={self.id}, transaction_id={self.transaction_id}, is_fraud={self.is_fraud})>"
\ No newline at end of file
+        return f"<Prediction(id={self.id}, transaction_id={self.transaction_id}, is_fraud={self.is_fraud})>"
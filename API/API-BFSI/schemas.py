@@ -1,6 +1,6 @@
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, model_validator
 from typing import List, Dict, Any, Optional
-from datetime import datetime
+from datetime import date, datetime
 
 # ==================== USER SCHEMAS ====================
 
@@ -271,6 +271,7 @@ class BulkPredictResult(BaseModel):
     rules_triggered: List[str]
     status: str  # "success" or "error"
     error_message: Optional[str] = None
+    attributions: Optional[Dict[str, Any]] = None  # explain=shap
 
 
 class BulkPredictResponse(BaseModel):
@@ -292,4 +293,242 @@ class BulkPredictResponse(BaseModel):
                     "results": []
                 }
             }
-        }
\ No newline at end of file
+        }
+
+
+class ColumnarBulkPredictRequest(BaseModel):
+    """
+    Column-oriented bulk request: one typed array per field, all the same
+    length. Row i is made of the i-th element of every array.
+    """
+    email: EmailStr
+    customer_id: List[str] = Field(..., min_length=1, max_length=100000)
+    transaction_id: List[str] = Field(..., min_length=1, max_length=100000)
+    transaction_datetime: List[str] = Field(..., min_length=1, max_length=100000)
+    transaction_amount: List[float] = Field(..., min_length=1, max_length=100000)
+    kyc_verified: List[int] = Field(..., min_length=1, max_length=100000)
+    account_age_days: List[int] = Field(..., min_length=1, max_length=100000)
+    channel_encoded: List[int] = Field(..., min_length=1, max_length=100000)
+
+    @model_validator(mode="after")
+    def check_lengths(self):
+        lengths = {name: len(getattr(self, name)) for name in (
+            "customer_id", "transaction_id", "transaction_datetime", "transaction_amount",
+            "kyc_verified", "account_age_days", "channel_encoded"
+        )}
+        if len(set(lengths.values())) > 1:
+            raise ValueError(f"All columns must have the same length, got {lengths}")
+        return self
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "email": "user@example.com",
+                "customer_id": ["CUST001", "CUST002"],
+                "transaction_id": ["TXN001", "TXN002"],
+                "transaction_datetime": ["2025-01-15 14:30:00", "2025-01-15 23:05:00"],
+                "transaction_amount": [50000, 125000.5],
+                "kyc_verified": [1, 0],
+                "account_age_days": [180, 5],
+                "channel_encoded": [0, 2]
+            }
+        }
+
+
+class ColumnarBulkPredictResponse(BaseModel):
+    status: str
+    message: str
+    data: Dict[str, Any]
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "status": "success",
+                "message": "Bulk prediction completed: 1 successful, 1 failed",
+                "data": {
+                    "total_processed": 2,
+                    "successful": 1,
+                    "failed": 1,
+                    "fraud_detected": 1,
+                    "processing_time_seconds": 0.01,
+                    "results": {
+                        "index": [1],
+                        "prediction_id": [124],
+                        "transaction_id": ["TXN002"],
+                        "customer_id": ["CUST002"],
+                        "risk_score": [0.9123],
+                        "is_fraud": [1],
+                        "model_risk_score": [0.5123],
+                        "rule_score": [0.4],
+                        "rules_triggered": [["High amount transaction (>₹100K)"]]
+                    },
+                    "errors": [
+                        {"index": 0, "transaction_id": "TXN001",
+                         "error_message": "transaction_id already exists"}
+                    ]
+                }
+            }
+        }
+
+
+# ==================== BATCH JOB SCHEMAS ====================
+
+class JobFromPathRequest(BaseModel):
+    """Score a CSV/Parquet file that already sits under JOBS_LOCAL_ROOT."""
+    email: EmailStr
+    path: str = Field(..., min_length=1, description="Path relative to JOBS_LOCAL_ROOT")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "email": "user@example.com",
+                "path": "transactions_2025_01.parquet"
+            }
+        }
+
+
+class JobResponse(BaseModel):
+    status: str
+    message: str
+    data: Dict[str, Any]
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "status": "success",
+                "message": "Job running",
+                "data": {
+                    "job_id": "3f2c9a6e1b7d4e0f8a5c2b1d9e7f6a4c",
+                    "filename": "transactions.csv",
+                    "status": "running",
+                    "total_rows": 120000,
+                    "rows_done": 45000,
+                    "percent": 37.5,
+                    "chunks_done": 9,
+                    "total_chunks": 24,
+                    "successful": 44870,
+                    "failed": 130,
+                    "fraud_detected": 2210,
+                    "error": None
+                }
+            }
+        }
+
+
+# ==================== CUSTOMER PROFILE SCHEMAS ====================
+
+class CustomerProfileResponse(BaseModel):
+    status: str
+    message: str
+    data: Dict[str, Any]
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "status": "success",
+                "message": "Customer profile retrieved successfully",
+                "data": {
+                    "customer_id": "CUST12345",
+                    "transaction_count": 42,
+                    "decayed_transaction_count": 3.71,
+                    "avg_transaction_amount": 18250.4,
+                    "std_transaction_amount": 9120.7,
+                    "last_seen": "2025-01-15T14:30:00",
+                    "seconds_since_last": 812.5
+                }
+            }
+        }
+
+
+# ==================== SIMULATION SCHEMAS ====================
+
+class SimulationRequest(BaseModel):
+    """Replay stored decisions with other thresholds / rule weights (keyed by rule flag)."""
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    thresholds: List[float] = Field(default=[0.6], min_length=1, max_length=50)
+    rule_weights: Dict[str, float] = Field(default_factory=dict)
+    include_archive: bool = False
+
+    @model_validator(mode="after")
+    def check_ranges(self):
+        if any(not 0 <= threshold <= 1 for threshold in self.thresholds):
+            raise ValueError("thresholds must be between 0 and 1")
+        if self.start_date and self.end_date and self.start_date > self.end_date:
+            raise ValueError("start_date must not be after end_date")
+        return self
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "start_date": "2025-01-01",
+                "end_date": "2025-01-31",
+                "thresholds": [0.5, 0.6, 0.7],
+                "rule_weights": {"High amount transaction (>₹100K)": 0.3}
+            }
+        }
+
+
+class SimulationResponse(BaseModel):
+    status: str
+    message: str
+    data: Dict[str, Any]
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "status": "success",
+                "message": "Simulated 3 scenario(s) over 1000000 predictions",
+                "data": {
+                    "rows": 1000000,
+                    "skipped_rows": 0,
+                    "rule_weights": [
+                        {"rule": "High amount transaction (>₹100K)", "weight": 0.3,
+                         "default_weight": 0.2, "hits": 121044}
+                    ],
+                    "current": {"flagged": 181220, "fraud_rate": 18.12, "amount_flagged": 21950312004.5},
+                    "scenarios": [
+                        {"threshold": 0.6, "flagged": 190112, "fraud_rate": 19.01,
+                         "amount_flagged": 23101220117.0, "newly_flagged": 8892, "newly_cleared": 0,
+                         "amount_newly_flagged": 1150908112.5, "amount_newly_cleared": 0.0}
+                    ],
+                    "load_ms": 812.4,
+                    "simulate_ms": 21.7,
+                    "cached": False
+                }
+            }
+        }
+
+
+# ==================== DRIFT SCHEMAS ====================
+
+class DriftResponse(BaseModel):
+    status: str
+    message: str
+    data: Dict[str, Any]
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "status": "success",
+                "message": "1 feature(s) drifting over the last 24.0h",
+                "data": {
+                    "window_hours": 24.0,
+                    "rows": 18250,
+                    "workers": 4,
+                    "reference_rows": 4000,
+                    "reference_source": "../../data/processed/train_data/train_features.csv",
+                    "drifted_features": ["transaction_amount"],
+                    "features": {
+                        "transaction_amount": {
+                            "psi": 0.3121,
+                            "ks": 0.2215,
+                            "status": "significant",
+                            "edges": [4120.5, 9876.0, 25011.2],
+                            "expected": [0.0, 0.25, 0.25, 0.25, 0.25],
+                            "observed": [12, 2011, 3870, 5120, 7237]
+                        }
+                    }
+                }
+            }
+        }
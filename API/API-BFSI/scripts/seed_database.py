@@ -0,0 +1,209 @@
+"""
+Seed the database with synthetic users and scored predictions for scale tests
+
+Transactions come from utils/synthetic.py (marginals fitted on
+SYNTHETIC_SOURCE_CSV, skewed customers, bursty sessions) in time order, and
+are scored like the bulk endpoint (score_frame: model + rules 1-5, no
+velocity rule). Each batch of SEED_BATCH_ROWS is loaded with the fastest
+path the database has:
+
+  * PostgreSQL - COPY predictions FROM STDIN (CSV). Monthly partitions are
+    created first when the table is partitioned; ANALYZE runs at the end.
+  * other databases - one executemany INSERT per batch
+
+With --defer-indexes the non-unique indexes are dropped first and rebuilt
+once at the end, which is much faster than maintaining them row by row.
+
+Users are <prefix>-user-<n>@example.com with --password; each synthetic
+customer belongs to one of them. Predictions keep the transaction time as
+their timestamp, so analytics and history cover the whole --days range.
+
+Run from API/API-BFSI:
+    python scripts/seed_database.py --rows 10000000 [--users 50] [--customers 200000]
+        [--customer-skew 0.8] [--burst-mean 3] [--days 365] [--defer-indexes] [--dry-run]
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import insert, select, text
+
+from config import settings
+from database import Base, engine, SessionLocal
+from models import Prediction, User
+from utils.auth import hash_password
+from utils.partitions import ensure_partitions
+from utils.scoring import compact_rows, load_model, score_frame
+from utils.synthetic import SyntheticProfile, TransactionGenerator
+
+TABLE = Prediction.__table__
+
+
+def seed_users(prefix: str, count: int, password: str) -> list:
+    """Create the synthetic users that do not exist yet; returns all their emails."""
+    emails = [f"{prefix.lower()}-user-{n}@example.com" for n in range(count)]
+    with SessionLocal() as db:
+        existing = set(db.scalars(select(User.email).where(User.email.in_(emails))))
+        missing = [(n, email) for n, email in enumerate(emails) if email not in existing]
+        if missing:
+            hashed = hash_password(password)  # one bcrypt hash shared by every seeded user
+            db.execute(insert(User), [
+                {"email": email, "full_name": f"Synthetic User {n}", "password": hashed,
+                 "created_at": datetime.utcnow()}
+                for n, email in missing
+            ])
+            db.commit()
+    print(f"👥 {len(missing)} user(s) created, {len(existing)} already present")
+    return emails
+
+
+def prediction_rows(model, chunk: pd.DataFrame, emails: np.ndarray, prefix: str) -> list:
+    """Score one generated chunk into compact_rows insert parameters."""
+    scored = score_frame(model, chunk)
+    rows = compact_rows(chunk, scored, None)
+    # Customer <prefix>C<n> belongs to user n % users
+    customer = chunk["customer_id"].str.slice(len(prefix) + 1).astype(np.int64).to_numpy()
+    owners = emails[customer % len(emails)]
+    timestamps = chunk["transaction_datetime"].dt.to_pydatetime()
+    for row, email, timestamp in zip(rows, owners, timestamps):
+        row["email"] = email
+        row["timestamp"] = timestamp
+    return rows
+
+
+def copy_rows(conn, rows: list) -> None:
+    """COPY ... FROM STDIN of one batch (PostgreSQL / psycopg2)."""
+    columns = list(rows[0])
+    buffer = io.StringIO()
+    pd.DataFrame(rows, columns=columns).to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    cursor = conn.connection.dbapi_connection.cursor()
+    cursor.copy_expert(
+        f"COPY {TABLE.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer
+    )
+
+
+def secondary_indexes() -> list:
+    """Indexes that can be rebuilt after the load (unique ones stay to catch duplicates)."""
+    return [index for index in TABLE.indexes if not index.unique]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed synthetic users and predictions")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--customers", type=int, default=100_000)
+    parser.add_argument("--customer-skew", type=float, default=0.8,
+                        help="Customer weight 1 / rank**skew (0: uniform, 1: Zipf)")
+    parser.add_argument("--burst-mean", type=float, default=3.0,
+                        help="Average transactions per customer session (1: no bursts)")
+    parser.add_argument("--burst-gap", type=float, default=120.0,
+                        help="Average seconds between transactions of a session")
+    parser.add_argument("--days", type=int, default=365, help="History length, ending now")
+    parser.add_argument("--fraud-rate", type=float, default=None,
+                        help="Fraudulent share of sessions (default: the source sample's rate)")
+    parser.add_argument("--source", default=None, help="Labelled CSV to fit (SYNTHETIC_SOURCE_CSV)")
+    parser.add_argument("--prefix", default="SYN", help="Prefix of transaction, customer and user ids")
+    parser.add_argument("--password", default="Synthetic123", help="Password of the seeded users")
+    parser.add_argument("--batch-rows", type=int, default=settings.SEED_BATCH_ROWS)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--defer-indexes", action="store_true",
+                        help="Drop non-unique indexes during the load, rebuild them at the end")
+    parser.add_argument("--dry-run", action="store_true", help="Generate and score only, write nothing")
+    args = parser.parse_args()
+
+    postgres = engine.dialect.name == "postgresql"
+    end = datetime.utcnow().replace(microsecond=0)
+    start = end - timedelta(days=args.days)
+
+    profile = SyntheticProfile.fit(args.source)
+    generator = TransactionGenerator(
+        profile, customers=args.customers, customer_skew=args.customer_skew,
+        burst_mean=args.burst_mean, burst_gap=args.burst_gap, start=start, end=end,
+        fraud_rate=args.fraud_rate, id_prefix=args.prefix, seed=args.seed
+    )
+    print("=" * 72)
+    print(f"🌱 Seeding {args.rows:,} predictions over {args.days} days "
+          f"({engine.dialect.name}{', dry run' if args.dry_run else ''})")
+    print(f"   source {profile.source}: fraud rate {generator.fraud_rate:.4f}, "
+          f"{args.customers:,} customers (skew {args.customer_skew}), bursts of ~{args.burst_mean}")
+    print("=" * 72)
+
+    model = load_model()
+    emails = np.array(["dry-run@example.com"], dtype=object)
+    deferred = []
+    if not args.dry_run:
+        Base.metadata.create_all(bind=engine)
+        with SessionLocal() as db:
+            if db.scalar(select(Prediction.id).where(Prediction.transaction_id.startswith(args.prefix)).limit(1)):
+                print(f"❌ Predictions with prefix {args.prefix!r} already exist - pass another --prefix")
+                sys.exit(1)
+        emails = np.array(seed_users(args.prefix, args.users, args.password), dtype=object)
+        created = ensure_partitions(engine, since=start.date())
+        if created:
+            print(f"🗂️  Created {len(created)} partition(s)")
+        if args.defer_indexes:
+            deferred = secondary_indexes()
+            with engine.begin() as conn:
+                for index in deferred:
+                    conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+            print(f"   dropped {len(deferred)} index(es) until the load is done")
+
+    started = time.perf_counter()
+    timings = {"generate": 0.0, "score": 0.0, "load": 0.0}
+    written = 0
+    try:
+        chunks = generator.chunks(args.rows, args.batch_rows)
+        while True:
+            step = time.perf_counter()
+            chunk = next(chunks, None)
+            if chunk is None:
+                break
+            timings["generate"] += time.perf_counter() - step
+
+            step = time.perf_counter()
+            rows = prediction_rows(model, chunk, emails, args.prefix)
+            timings["score"] += time.perf_counter() - step
+
+            step = time.perf_counter()
+            if not args.dry_run:
+                with engine.begin() as conn:
+                    if postgres:
+                        copy_rows(conn, rows)
+                    else:
+                        conn.execute(insert(TABLE), rows)
+            timings["load"] += time.perf_counter() - step
+
+            written += len(rows)
+            elapsed = time.perf_counter() - started
+            print(f"   {written:>12,} rows   {written / elapsed:>10,.0f} rows/s   "
+                  f"(up to {chunk['transaction_datetime'].iloc[-1]})")
+    finally:
+        if deferred:
+            step = time.perf_counter()
+            for index in deferred:
+                index.create(bind=engine, checkfirst=True)
+            print(f"   rebuilt {len(deferred)} index(es) in {time.perf_counter() - step:.1f}s")
+
+    if postgres and not args.dry_run:
+        with engine.connect() as conn:
+            conn.execution_options(isolation_level="AUTOCOMMIT").execute(text(f"ANALYZE {TABLE.name}"))
+
+    elapsed = time.perf_counter() - started
+    print("=" * 72)
+    print(f"✅ {written:,} predictions in {elapsed:.1f}s ({written / elapsed:,.0f} rows/s): "
+          + ", ".join(f"{name} {seconds:.1f}s" for name, seconds in timings.items()))
+    if not args.dry_run:
+        print(f"   log in as {emails[0]} / {args.password}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark: row-oriented vs column-oriented bulk payloads
+Builds the same batch in both request shapes and compares the JSON size,
+parse + validation time and end-to-end scoring time (no HTTP, no database).
+The row shape is capped at 1000 transactions per request, so larger batches
+are split into several row requests, as a client would have to.
+
+Run from API/API-BFSI:
+    python tests/bench_bulk_payload.py [--rows 1000] [--repeat 5]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_micro import load_models, sample_transaction
+from schemas import BulkPredictRequest, ColumnarBulkPredictRequest, PredictRequest
+from utils.features import derive_features_auto
+from utils.rules import evaluate_rules
+from utils.scoring import COLUMNS, compact_rows, score_frame, validate_columns
+
+EMAIL = "bench@example.com"
+ROW_REQUEST_LIMIT = 1000
+
+
+def best_of(func, repeat: int) -> float:
+    """Fastest of `repeat` runs, in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, (time.perf_counter() - start) * 1000)
+    return best
+
+
+def check_rows(requests: list) -> None:
+    """The field checks the row shape would need: one PredictRequest per row."""
+    for request in requests:
+        for txn in request.transactions:
+            PredictRequest(email=request.email, **txn)
+
+
+def score_rows(model, requests: list) -> None:
+    """What /api/bulk-predict does per row, minus the database."""
+    for txn in (txn for request in requests for txn in request.transactions):
+        features_df = derive_features_auto(txn)
+        features = features_df.to_dict(orient="records")[0]
+        model_proba = float(model.predict_proba(features_df)[0, 1])
+        rule_flags, rule_score = evaluate_rules(features)
+        round(min(1.0, model_proba + rule_score), 4)
+
+
+def score_columns(model, request: ColumnarBulkPredictRequest) -> None:
+    """What /api/bulk-predict/columnar does, minus the database."""
+    frame, _ = validate_columns(request)
+    compact_rows(frame, score_frame(model, frame), EMAIL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk payload format benchmark")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    transactions = [sample_transaction(rng) for _ in range(args.rows)]
+    row_bodies = [
+        json.dumps({"email": EMAIL, "transactions": transactions[i:i + ROW_REQUEST_LIMIT]}).encode()
+        for i in range(0, len(transactions), ROW_REQUEST_LIMIT)
+    ]
+    columnar_body = json.dumps(
+        {"email": EMAIL, **{name: [txn[name] for txn in transactions] for name in COLUMNS}}
+    ).encode()
+    row_size = sum(len(body) for body in row_bodies)
+
+    print("=" * 60)
+    print(f"📦 Bulk payload benchmark ({args.rows:,} rows, best of {args.repeat})")
+    print("=" * 60)
+    print(f"   request size        rows {row_size / 1024:9.1f} KB   "
+          f"columnar {len(columnar_body) / 1024:9.1f} KB   ({row_size / len(columnar_body):.1f}x)"
+          f"   [{len(row_bodies)} row request(s)]")
+
+    def parse_rows():
+        return [BulkPredictRequest.model_validate_json(body) for body in row_bodies]
+
+    row_parse = best_of(parse_rows, args.repeat)
+    row_requests = parse_rows()
+    row_checked = row_parse + best_of(lambda: check_rows(row_requests), max(1, args.repeat // 2))
+    columnar_parse = best_of(
+        lambda: validate_columns(ColumnarBulkPredictRequest.model_validate_json(columnar_body)),
+        args.repeat
+    )
+    print(f"   parse only          rows {row_parse:9.2f} ms   (untyped dicts, no field checks)")
+    print(f"   parse+validate      rows {row_checked:9.2f} ms   columnar {columnar_parse:9.2f} ms   "
+          f"({row_checked / columnar_parse:.0f}x)")
+
+    columnar_request = ColumnarBulkPredictRequest.model_validate_json(columnar_body)
+    for name, model in load_models().items():
+        row_ms = best_of(lambda: score_rows(model, row_requests), 1)
+        columnar_ms = best_of(lambda: score_columns(model, columnar_request), args.repeat)
+        print(f"   score [{name:<8}]    rows {row_ms:9.1f} ms   columnar {columnar_ms:9.1f} ms   "
+              f"({row_ms / columnar_ms:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Shared helpers for the RiskShield benchmark scripts
+Latency summaries, JSON result files and build-to-build comparison
+"""
+
+import json
+import platform
+import subprocess
+from datetime import datetime
+from typing import Dict, Any, List
+
+import numpy as np
+
+
+def summarize(samples_ms: List[float]) -> Dict[str, float]:
+    """Latency percentiles (milliseconds) for a list of samples."""
+    if not samples_ms:
+        return {"count": 0, "mean_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+    values = np.asarray(samples_ms, dtype=np.float64)
+    return {
+        "count": int(values.size),
+        "mean_ms": round(float(values.mean()), 4),
+        "p50_ms": round(float(np.percentile(values, 50)), 4),
+        "p95_ms": round(float(np.percentile(values, 95)), 4),
+        "p99_ms": round(float(np.percentile(values, 99)), 4),
+        "max_ms": round(float(values.max()), 4),
+    }
+
+
+def build_info() -> Dict[str, Any]:
+    """Identify the build a result file belongs to."""
+    try:
+        commit = subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        commit = "unknown"
+    return {
+        "commit": commit,
+        "timestamp": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+    }
+
+
+def save_results(path: str, kind: str, config: Dict[str, Any], results: Dict[str, Any]) -> None:
+    """Write a benchmark result file that compare_results() can read back."""
+    payload = {"kind": kind, "build": build_info(), "config": config, "results": results}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+    print(f"\n💾 Results saved to {path}")
+
+
+def compare_results(baseline_path: str, results: Dict[str, Any], metric: str = "p95_ms") -> None:
+    """Print the change of one latency metric per benchmark against a saved run."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    print(f"\n📈 Comparison vs {baseline_path} ({baseline['build']['commit']}), metric: {metric}")
+    print("-" * 60)
+    for name, stats in results.items():
+        old = baseline["results"].get(name, {}).get(metric)
+        new = stats.get(metric)
+        if old is None or new is None:
+            continue
+        change = ((new - old) / old * 100) if old else 0.0
+        marker = "🔴" if change > 10 else "🟢" if change < -10 else "⚪"
+        print(f"   {marker} {name:<28} {old:>10.3f} → {new:>10.3f}  ({change:+.1f}%)")
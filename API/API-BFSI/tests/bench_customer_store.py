@@ -0,0 +1,81 @@
+"""
+Benchmark: online per-customer aggregate store
+Checks the running mean/std against NumPy, then reports update and read
+latency, memory per customer and snapshot/restore time.
+
+Run from API/API-BFSI:
+    python tests/bench_customer_store.py [--customers 100000] [--events 1000000]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.customer_store import CustomerStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Customer aggregate store benchmark")
+    parser.add_argument("--customers", type=int, default=100_000)
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    customer_idx = rng.integers(0, args.customers, args.events)
+    amounts = rng.lognormal(9, 1.2, args.events).round(2)
+    timestamps = 1_700_000_000 + np.sort(rng.uniform(0, 30 * 86400, args.events))
+    ids = [f"CUST{i}" for i in range(args.customers)]
+
+    print("=" * 60)
+    print(f"👥 Customer store benchmark ({args.customers:,} customers, {args.events:,} events)")
+    print("=" * 60)
+
+    store = CustomerStore(half_life_hours=24)
+    start = time.perf_counter()
+    for i in range(args.events):
+        store.update(ids[customer_idx[i]], float(amounts[i]), float(timestamps[i]), i + 1)
+    elapsed = time.perf_counter() - start
+    print(f"   update   {elapsed / args.events * 1e6:8.2f} µs/event  ({args.events / elapsed:,.0f} events/s)")
+
+    sample = rng.integers(0, args.customers, 100_000)
+    start = time.perf_counter()
+    for i in sample:
+        store.get(ids[i])
+    elapsed = time.perf_counter() - start
+    print(f"   get      {elapsed / len(sample) * 1e6:8.2f} µs/read")
+
+    # Correctness of the Welford aggregates for a few customers
+    worst = 0.0
+    for i in rng.integers(0, args.customers, 200):
+        values = amounts[customer_idx == i]
+        aggregate = store.get(ids[i])
+        if len(values) > 1:
+            worst = max(worst, abs(aggregate.mean_amount - values.mean()) / values.mean(),
+                        abs(aggregate.std_amount - values.std(ddof=1)) / values.std(ddof=1))
+    print(f"   max relative error of mean/std vs NumPy: {worst:.2e}")
+
+    print(f"   memory   {store.memory_bytes() / len(store):8.1f} bytes/customer in arrays")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "customer_store.npz")
+        start = time.perf_counter()
+        store.snapshot(path)
+        snapshot_s = time.perf_counter() - start
+        start = time.perf_counter()
+        restored = CustomerStore.restore(path)
+        restore_s = time.perf_counter() - start
+        print(f"   snapshot {snapshot_s * 1000:8.1f} ms   restore {restore_s * 1000:8.1f} ms   "
+              f"({os.path.getsize(path) / 1e6:.1f} MB)")
+        now = float(timestamps[-1])
+        assert restored.get(ids[0], now) == store.get(ids[0], now), "restore mismatch"
+
+
+if __name__ == "__main__":
+    main()
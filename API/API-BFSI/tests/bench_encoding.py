@@ -0,0 +1,145 @@
+"""
+Benchmark: response encoding per format
+Encodes synthetic bulk-predict results and transaction history pages the way
+the API does and reports encode time per 1000 rows and body size for:
+
+  * response_model - FastAPI's default path before utils/encoding.py, as in
+                     the pinned fastapi==0.115: validate against the *Response
+                     model, serialize to Python, JSONResponse json.dumps
+  * orjson         - fast_json / negotiated(..., "application/json")
+  * msgpack        - Accept: application/msgpack
+  * arrow          - Accept: application/vnd.apache.arrow.stream
+
+Run from API/API-BFSI:
+    python tests/bench_encoding.py [--rows 1000] [--repeat 20]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import TypeAdapter
+
+from bench_micro import sample_transaction
+from schemas import BulkPredictResponse, TransactionHistoryResponse
+from utils.encoding import encode_arrow, encode_json, encode_msgpack, msgpack, pa
+from utils.features import derive_features_auto
+from utils.hf_model import generate_explanation
+from utils.rules import evaluate_rules
+
+
+def bulk_response(transactions: list) -> BulkPredictResponse:
+    results = []
+    for txn in transactions:
+        features = derive_features_auto(txn).to_dict(orient="records")[0]
+        rule_flags, rule_score = evaluate_rules(features)
+        risk_score = round(min(1.0, random.random() + rule_score), 4)
+        results.append({
+            "transaction_id": txn["transaction_id"],
+            "customer_id": txn["customer_id"],
+            "risk_score": risk_score,
+            "is_fraud": int(risk_score >= 0.6),
+            "model_risk_score": round(random.random(), 4),
+            "rule_score": round(rule_score, 2),
+            "rules_triggered": rule_flags,
+            "status": "success",
+            "error_message": None
+        })
+    return BulkPredictResponse(
+        status="success",
+        message=f"Bulk prediction completed: {len(results)} successful, 0 failed",
+        data={"total_processed": len(results), "successful": len(results), "failed": 0, "results": results}
+    )
+
+
+def history_response(transactions: list) -> TransactionHistoryResponse:
+    rows = []
+    for i, txn in enumerate(transactions):
+        features = derive_features_auto(txn).to_dict(orient="records")[0]
+        rule_flags, rule_score = evaluate_rules(features)
+        risk_score = round(min(1.0, random.random() + rule_score), 4)
+        rows.append({
+            "id": i + 1,
+            "customer_id": txn["customer_id"],
+            "transaction_id": txn["transaction_id"],
+            "risk_score": risk_score,
+            "is_fraud": int(risk_score >= 0.6),
+            "derived_features": dict(features, rule_flags=rule_flags),
+            "explanation": generate_explanation(txn, features, risk_score, rule_score, rule_flags),
+            "timestamp": txn["transaction_datetime"].replace(" ", "T")
+        })
+    return TransactionHistoryResponse(
+        status="success",
+        message=f"Found {len(rows)} transactions",
+        data={"user_email": "bench@example.com", "user_name": "Bench", "total_transactions": len(rows),
+              "last_prediction_id": len(rows), "transactions": rows}
+    )
+
+
+def default_response_body(adapter: TypeAdapter, response) -> bytes:
+    """fastapi.routing.serialize_response + JSONResponse.render (fastapi 0.115)."""
+    content = adapter.dump_python(adapter.validate_python(response), mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def time_encoder(func, repeat: int):
+    """(best time in ms, encoded size in bytes)."""
+    body = func()
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, (time.perf_counter() - start) * 1000)
+    return best, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Response encoding benchmark")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    rng = random.Random(args.seed)
+    transactions = [sample_transaction(rng) for _ in range(args.rows)]
+    per_1000 = 1000 / args.rows
+
+    print("=" * 60)
+    print(f"🧾 Response encoding benchmark ({args.rows:,} rows, best of {args.repeat})")
+    print("=" * 60)
+
+    for name, response, rows_key in (
+        ("bulk-predict", bulk_response(transactions), "results"),
+        ("transactions", history_response(transactions), "transactions"),
+    ):
+        adapter = TypeAdapter(type(response))
+        encoders = {
+            "response_model": lambda: default_response_body(adapter, response),
+            "orjson": lambda: encode_json(response),
+        }
+        if msgpack is not None:
+            encoders["msgpack"] = lambda: encode_msgpack(response)
+        if pa is not None:
+            encoders["arrow"] = lambda: encode_arrow(response, rows_key)
+
+        assert json.loads(encoders["orjson"]()) == json.loads(encoders["response_model"]()), \
+            "orjson output differs from the response_model encoding"
+
+        print(f"   {name}")
+        baseline = None
+        for encoder, func in encoders.items():
+            elapsed, size = time_encoder(func, args.repeat)
+            baseline = baseline or elapsed
+            print(f"      {encoder:<15} {elapsed * per_1000:8.2f} ms / 1000 rows   "
+                  f"{size / 1024:8.1f} KB   ({baseline / elapsed:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
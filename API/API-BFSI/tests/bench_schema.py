@@ -0,0 +1,185 @@
+"""
+Benchmark: legacy JSON prediction rows vs. the compact typed schema
+Loads the same synthetic predictions into two SQLite files and compares
+bytes per row and the analytics scan (KPIs, monthly trend, channel split).
+
+Run from API/API-BFSI:
+    python tests/bench_schema.py --rows 200000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+
+from database import Base
+from models import User, Prediction
+from utils.features import derive_features_auto
+from utils.hf_model import generate_explanation
+from utils.rules import evaluate_rules
+
+LEGACY_DDL = """
+CREATE TABLE predictions (
+    id INTEGER PRIMARY KEY,
+    customer_id VARCHAR(50) NOT NULL,
+    transaction_id VARCHAR(50) NOT NULL UNIQUE,
+    email VARCHAR(100) NOT NULL,
+    risk_score FLOAT NOT NULL,
+    is_fraud INTEGER NOT NULL,
+    derived_features JSON NOT NULL,
+    explanation TEXT,
+    timestamp DATETIME
+)
+"""
+
+
+def synthetic_predictions(n_rows: int, seed: int):
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    for i in range(n_rows):
+        txn = {
+            "transaction_datetime": (start + timedelta(minutes=rng.randint(0, 525600))).strftime("%Y-%m-%d %H:%M:%S"),
+            "transaction_amount": round(rng.uniform(100, 200000), 2),
+            "kyc_verified": rng.randint(0, 1),
+            "account_age_days": rng.randint(0, 1000),
+            "channel_encoded": rng.randint(0, 3),
+        }
+        yield i, txn, rng.random(), start + timedelta(minutes=i % 525600)
+
+
+def build_rows(n_rows: int, seed: int):
+    # Feature derivation is the slow part; derive a pool and reuse it
+    pool = []
+    for _, txn, proba, _ in synthetic_predictions(min(n_rows, 2000), seed):
+        features = derive_features_auto(txn).to_dict(orient="records")[0]
+        rule_flags, rule_score = evaluate_rules(features)
+        pool.append((features, proba, rule_flags, rule_score))
+
+    rows = []
+    for i, _, _, timestamp in synthetic_predictions(n_rows, seed):
+        features, proba, rule_flags, rule_score = pool[i % len(pool)]
+        combined = round(min(1.0, proba + rule_score), 4)
+        rows.append((i, features, proba, rule_flags, rule_score, combined, int(combined >= 0.6), timestamp))
+    return rows
+
+
+def vacuum(engine) -> None:
+    # VACUUM cannot run inside a transaction
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM"))
+
+
+def load_legacy(path: str, rows: list) -> None:
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        conn.execute(text(LEGACY_DDL))
+        conn.execute(text(
+            "INSERT INTO predictions (customer_id, transaction_id, email, risk_score, is_fraud, "
+            "derived_features, explanation, timestamp) VALUES (:c, :t, :e, :r, :f, :d, :x, :ts)"
+        ), [
+            {"c": f"CUST{i % 5000}", "t": f"TXN{i}", "e": "bench@example.com", "r": combined,
+             "f": is_fraud, "d": json.dumps({**features, "rule_flags": rule_flags}),
+             "x": generate_explanation({}, features, combined, rule_score, rule_flags), "ts": ts}
+            for i, features, proba, rule_flags, rule_score, combined, is_fraud, ts in rows
+        ])
+    vacuum(engine)
+
+
+def load_compact(path: str, rows: list) -> None:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine, tables=[User.__table__, Prediction.__table__])
+    with engine.begin() as conn:
+        conn.execute(Prediction.__table__.insert(), [
+            {
+                **Prediction.compact_values(
+                    f"CUST{i % 5000}", f"TXN{i}", "bench@example.com", features, proba,
+                    rule_score, rule_flags, combined, is_fraud
+                ),
+                "timestamp": ts
+            }
+            for i, features, proba, rule_flags, rule_score, combined, is_fraud, ts in rows
+        ])
+    vacuum(engine)
+
+
+def aggregate(records) -> dict:
+    """The same aggregations /api/analytics performs."""
+    total = fraud = 0
+    amount = 0.0
+    monthly = defaultdict(lambda: [0, 0])
+    channels = defaultdict(int)
+    for ts, is_fraud, risk, txn_amount, channel in records:
+        total += 1
+        month = monthly[ts[:7]]
+        month[0] += 1
+        if is_fraud:
+            fraud += 1
+            amount += txn_amount
+            month[1] += 1
+            channels[channel] += 1
+    return {"total": total, "fraud": fraud, "amount": round(amount, 2)}
+
+
+def scan_legacy(path: str) -> dict:
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT timestamp, is_fraud, risk_score, derived_features FROM predictions"
+        )).all()
+    records = []
+    for ts, is_fraud, risk, payload in rows:
+        features = json.loads(payload)
+        records.append((ts, is_fraud, risk, features["transaction_amount"], features["channel_encoded"]))
+    return aggregate(records)
+
+
+def scan_compact(path: str) -> dict:
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT timestamp, is_fraud, risk_score, transaction_amount, channel FROM predictions"
+        )).all()
+    return aggregate(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prediction storage schema benchmark")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rows = build_rows(args.rows, args.seed)
+    print("=" * 60)
+    print(f"🗄️  Prediction schema benchmark ({args.rows:,} rows, SQLite)")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        results = {}
+        for name, loader, scanner in (("legacy", load_legacy, scan_legacy),
+                                      ("compact", load_compact, scan_compact)):
+            path = os.path.join(tmp_dir, f"{name}.db")
+            loader(path, rows)
+            start = time.perf_counter()
+            summary = scanner(path)
+            scan_s = time.perf_counter() - start
+            results[name] = (os.path.getsize(path) / args.rows, scan_s, summary)
+            print(f"   {name:<8} {results[name][0]:>8.1f} bytes/row   analytics scan {scan_s * 1000:>9.1f} ms")
+
+        if results["legacy"][2] != results["compact"][2]:
+            print("⚠️ Aggregates differ between layouts!")
+        size_ratio = results["legacy"][0] / results["compact"][0]
+        scan_ratio = results["legacy"][1] / results["compact"][1]
+        print(f"\n   compact rows are {size_ratio:.1f}x smaller, scan is {scan_ratio:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
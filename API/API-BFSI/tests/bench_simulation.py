@@ -0,0 +1,108 @@
+"""
+Benchmark: what-if decision replay (utils/simulation.py)
+Fills a scratch SQLite predictions table with synthetic scored rows, then
+reports the time to load the decision columns and to evaluate scenarios,
+and checks that the default threshold and weights reproduce every stored
+decision.
+
+Run from API/API-BFSI:
+    python tests/bench_simulation.py [--rows 1000000] [--thresholds 5]
+    python tests/bench_simulation.py --db-url postgresql://...   # existing table, read only
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from models import Prediction, User
+from utils.rules import RULE_FLAGS, RULE_WEIGHTS
+from utils.simulation import load_decision_columns, resolve_weights, rule_score_table, simulate
+
+
+def fill(engine, rows: int, seed: int, batch: int = 50_000) -> None:
+    rng = np.random.default_rng(seed)
+    Prediction.metadata.create_all(engine)
+    table = rule_score_table(RULE_WEIGHTS)
+    start = datetime(2025, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__), [{"email": "sim@example.com", "full_name": "Sim", "password": "x"}])
+        for offset in range(0, rows, batch):
+            n = min(batch, rows - offset)
+            probability = rng.beta(1.2, 6, n)
+            mask = rng.integers(0, 64, n) & rng.integers(0, 64, n) & rng.integers(0, 64, n)
+            risk = np.round(np.minimum(1.0, probability + table[mask]), 4)
+            amount = rng.lognormal(10, 1.3, n).round(2)
+            seconds = rng.integers(0, 90 * 86400, n)
+            conn.execute(insert(Prediction.__table__), [
+                {
+                    "customer_id": f"C{offset + i % 5000}", "transaction_id": f"SIM{offset + i}",
+                    "email": "sim@example.com", "risk_score": float(risk[i]), "is_fraud": int(risk[i] >= 0.6),
+                    "transaction_amount": float(amount[i]), "model_probability": float(probability[i]),
+                    "rule_score": float(table[mask[i]]), "rule_mask": int(mask[i]),
+                    "timestamp": start + timedelta(seconds=int(seconds[i]))
+                }
+                for i in range(n)
+            ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="What-if simulation benchmark")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--thresholds", type=int, default=5)
+    parser.add_argument("--db-url", default=None, help="Use an existing database instead of a scratch SQLite file")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    scratch = None
+    if args.db_url:
+        engine = create_engine(args.db_url)
+    else:
+        scratch = tempfile.NamedTemporaryFile(suffix=".db", delete=False).name
+        engine = create_engine(f"sqlite:///{scratch}")
+        start = time.perf_counter()
+        fill(engine, args.rows, args.seed)
+        print(f"   filled {args.rows:,} rows in {time.perf_counter() - start:.1f}s")
+
+    print("=" * 60)
+    print(f"🧪 What-if simulation benchmark ({engine.dialect.name})")
+    print("=" * 60)
+
+    try:
+        with Session(engine) as db:
+            start = time.perf_counter()
+            columns = load_decision_columns(db)
+            load = time.perf_counter() - start
+        print(f"   load      {load * 1000:8.1f} ms  ({len(columns):,} rows, {columns.skipped:,} skipped)")
+
+        thresholds = np.linspace(0.4, 0.8, args.thresholds).round(2).tolist()
+        weights = resolve_weights({RULE_FLAGS[0]: 0.3})
+        start = time.perf_counter()
+        result = simulate(columns, thresholds, weights)
+        elapsed = time.perf_counter() - start
+        print(f"   simulate  {elapsed * 1000:8.1f} ms  ({len(thresholds)} thresholds, "
+              f"{elapsed / len(thresholds) / max(len(columns), 1) * 1e9:.1f} ns/row/scenario)")
+        for scenario in result["scenarios"]:
+            print(f"      threshold {scenario['threshold']:.2f}: fraud rate {scenario['fraud_rate']:6.2f}%  "
+                  f"+{scenario['newly_flagged']:,} / -{scenario['newly_cleared']:,}")
+
+        baseline = simulate(columns, [0.6], list(RULE_WEIGHTS))["scenarios"][0]
+        changed = baseline["newly_flagged"] + baseline["newly_cleared"]
+        print(f"   defaults reproduce stored decisions: {'✅' if changed == 0 else f'❌ {changed:,} differ'}")
+    finally:
+        engine.dispose()
+        if scratch:
+            os.unlink(scratch)
+
+
+if __name__ == "__main__":
+    main()
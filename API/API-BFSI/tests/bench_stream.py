@@ -0,0 +1,116 @@
+"""
+Benchmark: /ws/score streaming channel against per-request /api/predict
+Sends the same number of synthetic transactions over --connections
+WebSockets (each pipelining up to the server's max_in_flight) and as
+individual /api/predict calls over as many keep-alive HTTP connections, and
+reports throughput and per-transaction latency (send to result) for both.
+
+Start the API first (uvicorn app:app), then from API/API-BFSI:
+    python tests/bench_stream.py [--transactions 5000] [--connections 4] [--window 0]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import httpx
+import websockets
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_common import summarize
+from load_test import LoadGenerator
+
+
+async def stream_client(url: str, transactions: list, window: int, latencies: list, errors: list) -> None:
+    async with websockets.connect(url, max_queue=None) as ws:
+        ready = json.loads(await ws.recv())
+        window = min(window or ready["max_in_flight"], ready["max_in_flight"])
+        sent_at = {}
+        credits = asyncio.Semaphore(window)
+
+        async def send():
+            for transaction in transactions:
+                await credits.acquire()
+                sent_at[transaction["transaction_id"]] = time.perf_counter()
+                await ws.send(json.dumps(transaction))
+
+        sender = asyncio.create_task(send())
+        for _ in transactions:
+            message = json.loads(await ws.recv())
+            credits.release()
+            started = sent_at.pop(message["transaction_id"])
+            if message["type"] == "result":
+                latencies.append((time.perf_counter() - started) * 1000)
+            else:
+                errors.append(message["error_message"])
+        await sender
+
+
+async def http_client(client: httpx.AsyncClient, email: str, transactions: list,
+                      latencies: list, errors: list) -> None:
+    for transaction in transactions:
+        start = time.perf_counter()
+        response = await client.post("/api/predict", json={"email": email, **transaction})
+        if response.status_code < 400:
+            latencies.append((time.perf_counter() - start) * 1000)
+        else:
+            errors.append(response.text)
+
+
+def report(name: str, latencies: list, errors: list, elapsed: float) -> None:
+    stats = summarize(latencies)
+    print(f"   {name:<10} {stats['count'] / elapsed:9.1f} tx/s   p50={stats['p50_ms']:8.1f}  "
+          f"p99={stats['p99_ms']:8.1f} ms   errors={len(errors)}")
+    if errors:
+        print(f"              first error: {errors[0][:120]}")
+
+
+async def run(args) -> None:
+    generator = LoadGenerator(args.base_url, args.email, 1, args.seed)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60,
+                                 limits=httpx.Limits(max_connections=args.connections)) as client:
+        await generator.setup(client)
+        token = client.headers["Authorization"].split(" ", 1)[1]
+        ws_url = args.base_url.replace("http", "ws", 1) + f"/ws/score?token={token}"
+
+        print("=" * 72)
+        print(f"📡 Streaming benchmark: {args.transactions:,} transactions over {args.connections} connection(s)")
+        print("=" * 72)
+
+        for name in ("websocket", "http"):
+            transactions = [generator.next_transaction() for _ in range(args.transactions)]
+            shares = [transactions[i::args.connections] for i in range(args.connections)]
+            latencies, errors = [], []
+            start = time.perf_counter()
+            if name == "websocket":
+                await asyncio.gather(*(stream_client(ws_url, share, args.window, latencies, errors)
+                                       for share in shares))
+            else:
+                await asyncio.gather(*(http_client(client, args.email, share, latencies, errors)
+                                       for share in shares))
+            report(name, latencies, errors, time.perf_counter() - start)
+
+        stats = (await client.get("/api/health/stream")).json()["data"]
+        print(f"   server: {stats['batches']:,} batches, avg {stats['avg_batch_rows']} rows "
+              f"(largest {stats['largest_batch']}), avg {stats['avg_batch_ms']} ms, "
+              f"{stats['blocked_reads']} blocked reads")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WebSocket streaming scoring benchmark")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--transactions", type=int, default=5000)
+    parser.add_argument("--connections", type=int, default=4)
+    parser.add_argument("--window", type=int, default=0,
+                        help="Transactions in flight per connection (0: the server's max_in_flight)")
+    parser.add_argument("--email", default="loadtest@example.com")
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark: native CatBoost vs. the pure-NumPy oblivious-tree evaluator
+Checks that both agree on the test set, then compares single-row latency
+and batch throughput.
+
+Run from API/API-BFSI:
+    python tests/bench_tree_model.py [--rows 100000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.features import derive_features_auto
+from utils.tree_model import ObliviousTreeModel
+
+CBM_PATH = "model/catboost_fraud_model_balanced_tuned.cbm"
+NPZ_PATH = "model/catboost_fraud_model_balanced_tuned.npz"
+TEST_FEATURES = "../../data/processed/test_data/test_features.csv"
+
+
+def time_single_row(model, features_df: pd.DataFrame, repeats: int) -> dict:
+    """Latency of predict_proba on a one-row DataFrame, like /api/predict."""
+    for _ in range(50):
+        model.predict_proba(features_df)
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.predict_proba(features_df)
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples = np.array(samples)
+    return {
+        "p50_us": round(float(np.percentile(samples, 50)), 1),
+        "p99_us": round(float(np.percentile(samples, 99)), 1),
+    }
+
+
+def time_batch(model, X: pd.DataFrame, repeats: int = 3) -> float:
+    """Rows per second for a single large predict_proba call."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.predict_proba(X)
+        best = min(best, time.perf_counter() - start)
+    return len(X) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CatBoost vs NumPy tree evaluator benchmark")
+    parser.add_argument("--rows", type=int, default=100_000, help="Rows for the batch benchmark")
+    parser.add_argument("--repeats", type=int, default=2000, help="Single-row iterations")
+    args = parser.parse_args()
+
+    from catboost import CatBoostClassifier
+
+    native = CatBoostClassifier()
+    native.load_model(CBM_PATH)
+    numpy_model = ObliviousTreeModel.load(NPZ_PATH)
+
+    X_test = pd.read_csv(TEST_FEATURES).drop(columns=["customer_id"], errors="ignore")
+
+    print("=" * 60)
+    print("🌲 Oblivious-tree evaluator benchmark")
+    print("=" * 60)
+
+    # 1. Agreement on the test set
+    diff = np.abs(native.predict_proba(X_test)[:, 1] - numpy_model.predict_proba(X_test)[:, 1])
+    print(f"\n1️⃣  Agreement on {len(X_test)} test rows: max |Δp| = {diff.max():.3e}")
+
+    # 2. Single-row latency (API path: one derived-features DataFrame per call)
+    row = derive_features_auto({
+        "transaction_datetime": "2025-01-15 23:30:00",
+        "transaction_amount": 75000.5,
+        "kyc_verified": 0,
+        "account_age_days": 12,
+        "channel_encoded": 1
+    })
+    print("\n2️⃣  Single-row latency")
+    for name, model in (("catboost", native), ("numpy", numpy_model)):
+        stats = time_single_row(model, row, args.repeats)
+        print(f"   {name:<9} p50={stats['p50_us']:>8} µs   p99={stats['p99_us']:>8} µs")
+
+    # 3. Batch throughput
+    reps = int(np.ceil(args.rows / len(X_test)))
+    X_big = pd.concat([X_test] * reps, ignore_index=True).iloc[:args.rows]
+    print(f"\n3️⃣  Batch throughput ({len(X_big):,} rows)")
+    for name, model in (("catboost", native), ("numpy", numpy_model)):
+        print(f"   {name:<9} {time_batch(model, X_big):>12,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
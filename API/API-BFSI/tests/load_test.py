@@ -0,0 +1,177 @@
+"""
+Asynchronous load generator for the RiskShield API
+Drives /api/predict, /api/bulk-predict, /api/analytics and /api/transactions
+at a target request rate against a running server and database.
+
+Requests are issued open-loop: each one is scheduled at a fixed interval and
+its latency is measured from the scheduled start, so a slow server cannot hide
+queueing delay by slowing the generator down (no coordinated omission).
+
+Start the API first (uvicorn app:app), then from API/API-BFSI:
+    python tests/load_test.py --rps 50 --duration 30 --output load.json
+    python tests/load_test.py --rps 50 --duration 30 --compare load.json
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_common import summarize, save_results, compare_results
+
+# Share of requests per endpoint (normalized, so the weights need not sum to 1)
+DEFAULT_MIX = {
+    "predict": 0.80,
+    "bulk_predict": 0.05,
+    "analytics": 0.10,
+    "transactions": 0.05,
+}
+
+
+class LoadGenerator:
+    def __init__(self, base_url: str, email: str, bulk_size: int, seed: int):
+        self.base_url = base_url
+        self.email = email
+        self.bulk_size = bulk_size
+        self.rng = random.Random(seed)
+        self.counter = 0
+        self.run_id = f"{int(time.time())}{self.rng.randint(100, 999)}"
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def next_transaction(self) -> dict:
+        """Unique synthetic transaction (transaction_id must be unique in the DB)."""
+        self.counter += 1
+        rng = self.rng
+        return {
+            "customer_id": f"LOAD{rng.randint(1, 500)}",
+            "transaction_id": f"L{self.run_id}{self.counter:08d}",
+            "transaction_datetime": (
+                f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} "
+                f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00"
+            ),
+            "transaction_amount": round(rng.uniform(100, 200000), 2),
+            "kyc_verified": rng.randint(0, 1),
+            "account_age_days": rng.randint(0, 1000),
+            "channel_encoded": rng.randint(0, 3),
+        }
+
+    def build_request(self, endpoint: str):
+        if endpoint == "predict":
+            return "POST", "/api/predict", {"email": self.email, **self.next_transaction()}
+        if endpoint == "bulk_predict":
+            txns = [self.next_transaction() for _ in range(self.bulk_size)]
+            return "POST", "/api/bulk-predict", {"email": self.email, "transactions": txns}
+        if endpoint == "analytics":
+            return "GET", "/api/analytics", None
+        return "GET", f"/api/transactions/{self.email}", None
+
+    async def setup(self, client: httpx.AsyncClient) -> None:
+        """Register the load-test user (ignored if it already exists) and log in."""
+        credentials = {"email": self.email, "password": "LoadTest123"}
+        await client.post("/api/register", json={"full_name": "Load Test", **credentials})
+        response = await client.post("/api/login", json=credentials)
+        response.raise_for_status()
+        client.headers["Authorization"] = f"Bearer {response.json()['data']['access_token']}"
+
+    async def fire(self, client: httpx.AsyncClient, endpoint: str, scheduled: float) -> None:
+        method, path, payload = self.build_request(endpoint)
+        try:
+            response = await client.request(method, path, json=payload)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        latency_ms = (time.perf_counter() - scheduled) * 1000
+        if ok:
+            self.latencies[endpoint].append(latency_ms)
+        else:
+            self.errors[endpoint] += 1
+
+    async def run(self, rps: float, duration: float, mix: dict, concurrency: int) -> float:
+        endpoints = list(mix)
+        weights = [mix[e] for e in endpoints]
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=60, limits=limits) as client:
+            await self.setup(client)
+
+            interval = 1.0 / rps
+            total = int(rps * duration)
+            tasks = []
+            start = time.perf_counter()
+            for i in range(total):
+                scheduled = start + i * interval
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                endpoint = self.rng.choices(endpoints, weights)[0]
+                tasks.append(asyncio.create_task(self.fire(client, endpoint, scheduled)))
+            await asyncio.gather(*tasks)
+            return time.perf_counter() - start
+
+
+def parse_mix(value: str) -> dict:
+    """'predict=0.8,analytics=0.2' -> {'predict': 0.8, 'analytics': 0.2}"""
+    mix = {}
+    for part in value.split(","):
+        name, weight = part.split("=")
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint '{name}'")
+        mix[name] = float(weight)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RiskShield API load generator")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--rps", type=float, default=20, help="Target requests per second")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to generate load")
+    parser.add_argument("--concurrency", type=int, default=100, help="Max open connections")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="Endpoint weights, e.g. predict=0.8,analytics=0.2")
+    parser.add_argument("--bulk-size", type=int, default=100, help="Transactions per bulk request")
+    parser.add_argument("--email", default="loadtest@example.com")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Compare against a previous JSON result file")
+    args = parser.parse_args()
+
+    generator = LoadGenerator(args.base_url, args.email, args.bulk_size, args.seed)
+    elapsed = asyncio.run(generator.run(args.rps, args.duration, args.mix, args.concurrency))
+
+    results = {}
+    total_ok = 0
+    for endpoint in args.mix:
+        stats = summarize(generator.latencies[endpoint])
+        stats["errors"] = generator.errors[endpoint]
+        stats["throughput_rps"] = round(stats["count"] / elapsed, 2)
+        results[endpoint] = stats
+        total_ok += stats["count"]
+
+    print("=" * 72)
+    print(f"🚦 Load test: target {args.rps} rps for {args.duration}s → "
+          f"achieved {total_ok / elapsed:.1f} rps ({elapsed:.1f}s)")
+    print("=" * 72)
+    for endpoint, stats in results.items():
+        print(
+            f"   {endpoint:<14} n={stats['count']:>6}  err={stats['errors']:>4}  "
+            f"p50={stats['p50_ms']:>8.1f}  p95={stats['p95_ms']:>8.1f}  "
+            f"p99={stats['p99_ms']:>8.1f} ms"
+        )
+
+    if args.output:
+        config = {k: v for k, v in vars(args).items() if k not in ("output", "compare")}
+        save_results(args.output, "load", config, results)
+    if args.compare:
+        compare_results(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -32,12 +32,21 @@ class RiskShieldClient:
         return response.json()
     
     def login_user(self, email: str, password: str) -> Dict[str, Any]:
-        """Login user"""
+        """Login user; the access token is sent with every later request"""
         payload = {
             "email": email,
             "password": password
         }
         response = self.session.post(f"{self.base_url}/api/login", json=payload)
+        result = response.json()
+        if response.ok:
+            self.session.headers["Authorization"] = f"Bearer {result['data']['access_token']}"
+        return result
+
+    def logout_user(self) -> Dict[str, Any]:
+        """Revoke the current access token"""
+        response = self.session.post(f"{self.base_url}/api/logout")
+        self.session.headers.pop("Authorization", None)
         return response.json()
     
     def predict_transaction(self, 
@@ -87,6 +96,15 @@ class RiskShieldClient:
         response = self.session.post(f"{self.base_url}/api/bulk-predict", json=payload)
         return response.json()
 
+    def bulk_predict_columnar(self, email: str, transactions: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Bulk predict using the column-oriented payload (one array per field)"""
+        fields = ["customer_id", "transaction_id", "transaction_datetime", "transaction_amount",
+                  "kyc_verified", "account_age_days", "channel_encoded"]
+        payload = {"email": email}
+        payload.update({field: [txn[field] for txn in transactions] for field in fields})
+        response = self.session.post(f"{self.base_url}/api/bulk-predict/columnar", json=payload)
+        return response.json()
+
 def generate_test_transaction(email: str, customer_id: str, 
                               scenario: str = "normal") -> Dict[str, Any]:
     """Generate test transaction data based on scenario"""
@@ -262,6 +280,7 @@ def quick_fraud_test():
         client.register_user("Quick Test", test_email, test_password)
     except:
         pass  # User might already exist
+    client.login_user(test_email, test_password)
     
     # Test high-risk transaction
     txn_data = generate_test_transaction(test_email, "CUST9999", "high_risk")
@@ -309,6 +328,7 @@ def test_bulk_predict():
         client.register_user("Bulk Test User", test_email, test_password)
     except:
         pass
+    client.login_user(test_email, test_password)
     
     # Generate 50 test transactions
     transactions = []
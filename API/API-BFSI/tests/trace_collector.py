@@ -0,0 +1,98 @@
+"""
+Local stand-in for an OpenTelemetry collector (OTLP/HTTP, JSON encoding)
+Accepts POST /v1/traces from the API (TRACE_EXPORTER=otlp), prints one line
+per span tree and appends the raw requests to --output (JSON lines).
+Protobuf payloads are rejected with 415: only the JSON encoding is handled.
+
+Run from API/API-BFSI:
+    python tests/trace_collector.py [--port 4318] [--output logs/collected_traces.jsonl] [--quiet]
+Then start the API with TRACE_EXPORTER=otlp TRACE_OTLP_ENDPOINT=http://localhost:4318/v1/traces
+"""
+
+import argparse
+import json
+import os
+import threading
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def summarize_payload(payload: dict) -> list:
+    """One line per trace: root span, duration and span count."""
+    traces = defaultdict(list)
+    for resource in payload.get("resourceSpans", []):
+        for scope in resource.get("scopeSpans", []):
+            for span in scope.get("spans", []):
+                traces[span["traceId"]].append(span)
+    lines = []
+    for trace_id, spans in traces.items():
+        ids = {span["spanId"] for span in spans}
+        root = next((span for span in spans if span.get("parentSpanId") not in ids), spans[0])
+        duration = (int(root["endTimeUnixNano"]) - int(root["startTimeUnixNano"])) / 1e6
+        sql = sum(1 for span in spans if span["name"] == "sql")
+        errors = sum(1 for span in spans if span.get("status", {}).get("code") == 2)
+        lines.append(f"   {trace_id}  {root['name']:<40} {duration:9.2f} ms  "
+                     f"{len(spans):3d} spans ({sql} sql{f', {errors} errors' if errors else ''})")
+    return lines
+
+
+def make_handler(output: str, quiet: bool, lock: threading.Lock, counts: dict):
+    class CollectorHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path.rstrip("/") != "/v1/traces":
+                self.send_error(404)
+                return
+            if "json" not in self.headers.get("Content-Type", ""):
+                self.send_error(415, "Only OTLP/JSON is supported")
+                return
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                self.send_error(400, "Invalid JSON")
+                return
+            lines = summarize_payload(payload)
+            with lock:
+                counts["requests"] += 1
+                counts["traces"] += len(lines)
+                if output:
+                    with open(output, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(payload, separators=(",", ":")) + "\n")
+                if not quiet:
+                    print("\n".join(lines))
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(b"{}")
+
+        def log_message(self, *args):
+            pass
+
+    return CollectorHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OTLP/JSON trace collector")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4318)
+    parser.add_argument("--output", help="Append received payloads to this JSON lines file")
+    parser.add_argument("--quiet", action="store_true", help="Do not print received traces")
+    args = parser.parse_args()
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    counts = {"requests": 0, "traces": 0}
+    server = ThreadingHTTPServer((args.host, args.port),
+                                 make_handler(args.output, args.quiet, threading.Lock(), counts))
+    print(f"📡 Collecting OTLP/JSON traces on http://{args.host}:{args.port}/v1/traces")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"\n✅ {counts['traces']} trace(s) in {counts['requests']} export request(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""
+SHAP attributions from CatBoost's native TreeSHAP
+Per-prediction contributions (log-odds, one per feature, plus the model's
+base value) for explain=shap on /api/predict and /api/bulk-predict, and the
+global importance reported by /api/metrics.
+
+  * Batching: all rows of a request go through one ShapValues call
+    (~0.1 ms/row at 1,000 rows against ~3 ms for a single row).
+  * Cache: in an oblivious tree a row only reaches a leaf through
+    "value > border" tests, so rows that fall between the same borders on
+    every feature have identical SHAP values. Rows are keyed by those
+    bucket indices (the quantized signature) and cached in an LRU of
+    SHAP_CACHE_SIZE entries - exact, not an approximation.
+  * Budget: a request gets SHAP_BUDGET_MS_PER_ROW per row. Uncached rows
+    are computed in chunks only while the measured cost per row says the
+    next chunk still fits; rows past the budget come back without
+    attributions instead of slowing the response down.
+  * Global importance is the mean |SHAP| over the training data, computed
+    once per model file (keyed by its hash) and cached under
+    SHAP_IMPORTANCE_DIR.
+
+Needs the catboost package; with MODEL_BACKEND="numpy" and no catboost
+installed, attributions are unavailable and scoring is unaffected.
+
+Usage:
+    python -m utils.attributions importance   # recompute and print global importance
+"""
+
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from config import settings
+
+from utils.features import FEATURE_NAMES
+
+_COST_SAMPLES = 32
+
+
+def model_version(path: str = None) -> str:
+    """Short content hash of the model file."""
+    digest = hashlib.sha1()
+    with open(path or settings.MODEL_PATH, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+class ShapExplainer:
+    """Batched, signature-cached TreeSHAP for one CatBoost model."""
+
+    def __init__(self, model=None, model_path: str = None, cache_size: int = None):
+        from catboost import CatBoostClassifier
+
+        model_path = model_path or settings.MODEL_PATH
+        if model is None or not hasattr(model, "get_feature_importance"):
+            model = CatBoostClassifier()
+            model.load_model(model_path)
+        self.model = model
+        self.model_path = model_path
+        self.version = model_version(model_path)
+        self.cache_size = cache_size or settings.SHAP_CACHE_SIZE
+
+        # The model may know features the API does not derive (always 0 there)
+        self.model_features = list(model.feature_names_)
+        self._output = [self.model_features.index(name) for name in FEATURE_NAMES]
+        borders = model.get_borders()
+        self._borders = [np.asarray(sorted(borders.get(i, [])), dtype=np.float64)
+                         for i in range(len(self.model_features))]
+        self._split_features = [i for i, edges in enumerate(self._borders) if len(edges)]
+
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.base_value = None
+        # Recent ShapValues costs: fixed per call, and per uncached row. Medians,
+        # so an occasional stall (GC, a busy disk) does not close the budget
+        self._call_samples = deque(maxlen=_COST_SAMPLES)
+        self._row_samples = deque(maxlen=_COST_SAMPLES)
+        self._cost_lock = threading.Lock()
+        self.stats = {"rows": 0, "cache_hits": 0, "computed": 0, "over_budget": 0}
+        self._importance = None
+
+    # ------------------ PER-ROW ATTRIBUTIONS ------------------
+    def _matrix(self, frame: pd.DataFrame) -> np.ndarray:
+        return frame.reindex(columns=self.model_features, fill_value=0).to_numpy(dtype=np.float64)
+
+    def signatures(self, matrix: np.ndarray) -> list:
+        """Quantized signature (bucket index per split feature) of every row."""
+        buckets = np.empty((len(matrix), len(self._split_features)), dtype=np.int16)
+        for column, feature in enumerate(self._split_features):
+            # A row goes right at a split when value > border
+            buckets[:, column] = np.searchsorted(self._borders[feature], matrix[:, feature], side="left")
+        return [row.tobytes() for row in buckets]
+
+    def _compute(self, matrix: np.ndarray) -> np.ndarray:
+        from catboost import Pool
+
+        start = time.perf_counter()
+        pool = Pool(matrix)  # columns already in model order (half the cost of a DataFrame pool)
+        values = self.model.get_feature_importance(pool, type="ShapValues")
+        elapsed = (time.perf_counter() - start) * 1000
+
+        # Split the cost into per-call and per-row parts (for the budget)
+        call_ms = self.call_ms or 0.0
+        with self._cost_lock:
+            if len(matrix) == 1:
+                self._call_samples.append(elapsed)
+            else:
+                self._row_samples.append(max(0.0, elapsed - call_ms) / len(matrix))
+        self.base_value = float(values[0, -1])
+        return values[:, self._output]
+
+    def warm_up(self) -> None:
+        """First ShapValues call is slow; make it at startup and seed the cost estimates."""
+        zeros = np.zeros((64, len(self.model_features)))
+        self._compute(zeros[:1])
+        with self._cost_lock:
+            self._call_samples.clear()  # the first call is not representative
+        for rows in (1, 1, 1, 64, 64):
+            self._compute(zeros[:rows])
+        self.global_importance()
+
+    def _median(self, samples: deque):
+        with self._cost_lock:
+            return float(np.median(samples)) if samples else None
+
+    @property
+    def call_ms(self):
+        return self._median(self._call_samples)
+
+    @property
+    def row_ms(self):
+        return self._median(self._row_samples)
+
+    def _estimate_ms(self, rows: int) -> float:
+        return (self.call_ms or 3.0) + rows * (self.row_ms or 0.2)
+
+    def explain(self, frame: pd.DataFrame, budget_ms: float = None) -> list:
+        """
+        SHAP values (array over FEATURE_NAMES) for every row of a feature
+        frame, or None for rows left out by the latency budget.
+        """
+        start = time.perf_counter()
+        matrix = self._matrix(frame)
+        keys = self.signatures(matrix)
+        results = [None] * len(keys)
+
+        missing = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                values = self._cache.get(key)
+                if values is not None:
+                    self._cache.move_to_end(key)
+                    results[i] = values
+                    self.stats["cache_hits"] += 1
+                else:
+                    missing.setdefault(key, []).append(i)
+            self.stats["rows"] += len(keys)
+
+        pending = list(missing.items())
+        chunk = settings.SHAP_CHUNK_ROWS
+        while pending:
+            batch, pending = pending[:chunk], pending[chunk:]
+            if budget_ms is not None:
+                elapsed = (time.perf_counter() - start) * 1000
+                if elapsed + self._estimate_ms(len(batch)) > budget_ms:
+                    # Try a smaller chunk once before giving up on the rest
+                    fits = int((budget_ms - elapsed - (self.call_ms or 3.0)) / (self.row_ms or 0.2))
+                    if fits < 1:
+                        pending = batch + pending
+                        break
+                    pending = batch[fits:] + pending
+                    batch = batch[:fits]
+            values = self._compute(matrix[[rows[0] for _, rows in batch]])
+            with self._lock:
+                for (key, rows), row_values in zip(batch, values):
+                    self._cache[key] = row_values
+                    for i in rows:
+                        results[i] = row_values
+                    self.stats["computed"] += 1
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        if pending:
+            with self._lock:
+                self.stats["over_budget"] += sum(len(rows) for _, rows in pending)
+            # Skipped work is never measured: expire the oldest costs so a
+            # slow spell cannot keep the budget closed for good
+            with self._cost_lock:
+                for samples in (self._call_samples, self._row_samples):
+                    if samples:
+                        samples.popleft()
+        return results
+
+    def attribution(self, values) -> dict:
+        """API shape of one row's SHAP values."""
+        if values is None:
+            return None
+        contributions = {name: round(float(value), 4) for name, value in zip(FEATURE_NAMES, values)}
+        top = sorted(contributions.items(), key=lambda item: -abs(item[1]))[:3]
+        return {
+            "base_value": round(self.base_value, 4),
+            "units": "log_odds",
+            "values": contributions,
+            "top_factors": [{"feature": name, "contribution": value} for name, value in top if value]
+        }
+
+    # ------------------ GLOBAL IMPORTANCE ------------------
+    def global_importance(self) -> dict:
+        """Mean |SHAP| per feature over the training data, normalized; once per model version."""
+        if self._importance is not None:
+            return self._importance
+        path = Path(settings.SHAP_IMPORTANCE_DIR) / f"importance_{self.version}.json"
+        if path.exists():
+            self._importance = json.loads(path.read_text())
+            return self._importance
+
+        background = Path(settings.SHAP_BACKGROUND_CSV)
+        if background.exists():
+            frame = pd.read_csv(background)
+            values = self._compute(self._matrix(frame))
+            raw = np.abs(values).mean(axis=0)
+            method, rows = "mean_abs_shap", len(frame)
+        else:
+            # No training data at hand: CatBoost's PredictionValuesChange (needs no data)
+            raw = self.model.get_feature_importance()[self._output]
+            method, rows = "prediction_values_change", 0
+        total = float(raw.sum()) or 1.0
+        importance = sorted(
+            ({"feature": name, "importance": round(float(value) / total, 4)}
+             for name, value in zip(FEATURE_NAMES, raw)),
+            key=lambda item: -item["importance"]
+        )
+        self._importance = {
+            "model_version": self.version, "method": method, "background_rows": rows,
+            "feature_importance": importance
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(json.dumps(self._importance, indent=2))
+        os.replace(tmp, path)
+        return self._importance
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                **self.stats,
+                "cached_signatures": len(self._cache),
+                "model_version": self.version,
+                "median_call_ms": round(self.call_ms, 3) if self.call_ms is not None else None,
+                "median_row_ms": round(self.row_ms, 4) if self.row_ms is not None else None
+            }
+
+
+def describe_attribution(attribution: dict) -> str:
+    """One sentence naming the features that moved the model score most."""
+    if not attribution or not attribution["top_factors"]:
+        return ""
+    parts = [
+        f"{factor['feature']} {'raised' if factor['contribution'] > 0 else 'lowered'} it "
+        f"({factor['contribution']:+.2f})"
+        for factor in attribution["top_factors"]
+    ]
+    return "Model attribution (SHAP, log-odds): " + ", ".join(parts) + "."
+
+
+def load_explainer(model=None):
+    """ShapExplainer for the configured model, or None if catboost is unavailable."""
+    try:
+        return ShapExplainer(model)
+    except ImportError:
+        return None
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "importance":
+        print("Usage: python -m utils.attributions importance")
+        sys.exit(1)
+
+    explainer = ShapExplainer()
+    cached = Path(settings.SHAP_IMPORTANCE_DIR) / f"importance_{explainer.version}.json"
+    cached.unlink(missing_ok=True)
+    result = explainer.global_importance()
+    print(f"✅ Model {result['model_version']}: {result['method']} over {result['background_rows']} rows")
+    for item in result["feature_importance"]:
+        print(f"   {item['feature']:<28} {item['importance']:.4f}")
@@ -1,4 +1,12 @@
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+
 import bcrypt
+import jwt
+
+from config import settings
 
 def hash_password(password: str) -> str:
     """Hashes a plain text password."""
@@ -7,3 +15,77 @@ def hash_password(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifies if a plain password matches the hashed one."""
     return bcrypt.checkpw(plain_password.encode("utf-8"), hashed_password.encode("utf-8"))
+
+
+# ------------------ ACCESS TOKENS ------------------
+@dataclass(frozen=True)
+class TokenUser:
+    """The caller, as carried by a verified access token (no database read)."""
+    email: str
+    full_name: str
+    jti: str
+    expires_at: int
+
+
+def create_access_token(email: str, full_name: str) -> tuple:
+    """Signed access token for a logged-in user. Returns (token, expiry as epoch seconds)."""
+    now = int(time.time())
+    expires_at = now + settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    claims = {
+        "sub": email,
+        "name": full_name,
+        "jti": uuid.uuid4().hex,
+        "iat": now,
+        "exp": expires_at
+    }
+    return jwt.encode(claims, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM), expires_at
+
+
+def decode_access_token(token: str) -> TokenUser:
+    """
+    Verify signature, expiry and revocation in memory.
+    Raises jwt.InvalidTokenError for any token that must not be accepted.
+    """
+    claims = jwt.decode(
+        token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM],
+        options={"require": ["sub", "jti", "exp"]}
+    )
+    if revoked_tokens.is_revoked(claims["jti"]):
+        raise jwt.InvalidTokenError("Token has been revoked")
+    return TokenUser(
+        email=claims["sub"],
+        full_name=claims.get("name", ""),
+        jti=claims["jti"],
+        expires_at=claims["exp"]
+    )
+
+
+class RevocationList:
+    """
+    Logged-out token ids, each kept only until its token would expire anyway,
+    so the list stays as small as the number of logouts per token lifetime.
+    Held per process: with several API workers a revoked token is refused
+    by the worker that handled the logout, and by all of them after expiry.
+    """
+
+    def __init__(self):
+        self._expiry = {}
+        self._lock = threading.Lock()
+
+    def revoke(self, jti: str, expires_at: int) -> None:
+        with self._lock:
+            self._prune(time.time())
+            self._expiry[jti] = expires_at
+
+    def is_revoked(self, jti: str) -> bool:
+        return jti in self._expiry
+
+    def _prune(self, now: float) -> None:
+        for jti in [jti for jti, expires_at in self._expiry.items() if expires_at < now]:
+            del self._expiry[jti]
+
+    def __len__(self) -> int:
+        return len(self._expiry)
+
+
+revoked_tokens = RevocationList()
@@ -0,0 +1,228 @@
+"""
+Latency budgets and circuit breakers for /api/predict
+Every prediction gets a deadline: PREDICT_LATENCY_BUDGET_MS, or the
+client's X-Latency-Budget-Ms clamped to [PREDICT_MIN_BUDGET_MS,
+PREDICT_MAX_BUDGET_MS]. The stages that can stall - model inference and
+the velocity-rule query - run on their own small executors behind a
+circuit breaker, and the request waits for each at most until the deadline
+minus PREDICT_WRITE_RESERVE_MS (kept for the insert and the response).
+
+A stage that times out or raises counts as a failure. After
+BREAKER_FAILURE_THRESHOLD consecutive failures its breaker opens: calls are
+refused at once for BREAKER_RESET_SECONDS, then a single trial call is let
+through (half-open) and its outcome closes or reopens the breaker. A call
+abandoned at its deadline keeps its thread until it returns, so a stalled
+dependency fills that stage's BREAKER_WORKERS threads, never the request
+threads.
+
+Callers treat a skipped stage as degraded and fall back (see
+predict_transaction): without the model the score is rule-engine only.
+
+    call = get_breaker("model_inference").start(model.predict_proba, frame)
+    ...
+    value = call.result(timeout_ms)     # raises StageSkipped
+"""
+
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Optional
+
+from config import settings
+
+BREAKER_NAMES = ("model_inference", "velocity_query")
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class Deadline:
+    """Latency budget of one request, from the moment the endpoint starts."""
+
+    def __init__(self, budget_ms: float):
+        self.budget_ms = budget_ms
+        self.started = time.perf_counter()
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def remaining_ms(self, reserve_ms: float = 0.0) -> float:
+        return self.budget_ms - self.elapsed_ms() - reserve_ms
+
+
+def request_budget_ms(header: Optional[str]) -> float:
+    """Budget for a request: the X-Latency-Budget-Ms value (clamped) or the default. Raises ValueError."""
+    if header is None:
+        return settings.PREDICT_LATENCY_BUDGET_MS
+    budget = float(header)
+    if budget != budget:  # NaN
+        raise ValueError("not a number")
+    return min(max(budget, settings.PREDICT_MIN_BUDGET_MS), settings.PREDICT_MAX_BUDGET_MS)
+
+
+class StageSkipped(Exception):
+    """A guarded stage did not produce a result: reason is open, timeout, error or no_budget."""
+
+    def __init__(self, stage: str, reason: str):
+        super().__init__(f"{stage}: {reason}")
+        self.stage = stage
+        self.reason = reason
+
+
+class GuardedCall:
+    """A stage started on its breaker's executor; result() waits within a timeout."""
+
+    def __init__(self, breaker: "CircuitBreaker", future=None, started: float = None, trial: bool = False):
+        self.breaker = breaker
+        self.future = future
+        self.started = started
+        self.trial = trial
+
+    @property
+    def name(self) -> str:
+        return self.breaker.name
+
+    def result(self, timeout_ms: float):
+        if self.future is None:
+            raise StageSkipped(self.name, "open")
+        if timeout_ms <= 0 and not self.future.done():
+            self.breaker._abandoned(self)
+            raise StageSkipped(self.name, "no_budget")
+        try:
+            value = self.future.result(timeout=max(timeout_ms, 0) / 1000)
+        except FutureTimeout:
+            self.future.cancel()
+            self.breaker._failure(self, "timeouts")
+            raise StageSkipped(self.name, "timeout")
+        except Exception as e:
+            self.breaker._failure(self, "errors")
+            raise StageSkipped(self.name, "error") from e
+        self.breaker._success(self, (time.perf_counter() - self.started) * 1000)
+        return value
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker with its own bounded executor."""
+
+    def __init__(self, name: str, workers: int = None, failure_threshold: int = None,
+                 reset_seconds: float = None):
+        self.name = name
+        self.failure_threshold = failure_threshold or settings.BREAKER_FAILURE_THRESHOLD
+        self.reset_seconds = settings.BREAKER_RESET_SECONDS if reset_seconds is None else reset_seconds
+        self._executor = ThreadPoolExecutor(max_workers=workers or settings.BREAKER_WORKERS,
+                                            thread_name_prefix=f"breaker-{name}")
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.opened_at = None
+        self._trial_running = False
+        self.consecutive_failures = 0
+        self.stats = {"calls": 0, "successes": 0, "timeouts": 0, "errors": 0,
+                      "short_circuited": 0, "abandoned": 0, "opened": 0}
+        self._success_ms = 0.0
+
+    def _admit(self) -> Optional[bool]:
+        """None when refused, else whether this call is the half-open trial."""
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self.opened_at < self.reset_seconds:
+                    self.stats["short_circuited"] += 1
+                    return None
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN:
+                if self._trial_running:
+                    self.stats["short_circuited"] += 1
+                    return None
+                self._trial_running = True
+                self.stats["calls"] += 1
+                return True
+            self.stats["calls"] += 1
+            return False
+
+    def start(self, func, *args, **kwargs) -> GuardedCall:
+        """Run func on this breaker's executor; an open breaker returns a call that is already skipped."""
+        trial = self._admit()
+        if trial is None:
+            return GuardedCall(self)
+        context = contextvars.copy_context()
+        future = self._executor.submit(context.run, func, *args, **kwargs)
+        return GuardedCall(self, future, time.perf_counter(), trial)
+
+    def call(self, func, timeout_ms: float, *args, **kwargs):
+        return self.start(func, *args, **kwargs).result(timeout_ms)
+
+    def _success(self, call: GuardedCall, elapsed_ms: float) -> None:
+        with self._lock:
+            self.stats["successes"] += 1
+            self._success_ms += elapsed_ms
+            self.consecutive_failures = 0
+            if call.trial:
+                self._trial_running = False
+            if self.state != CLOSED:
+                self.state = CLOSED
+                self.opened_at = None
+
+    def _failure(self, call: GuardedCall, kind: str) -> None:
+        with self._lock:
+            self.stats[kind] += 1
+            self.consecutive_failures += 1
+            if call.trial:
+                self._trial_running = False
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.stats["opened"] += 1
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def _abandoned(self, call: GuardedCall) -> None:
+        # No time left to wait: says nothing about the dependency's health
+        call.future.cancel()
+        with self._lock:
+            self.stats["abandoned"] += 1
+            if call.trial:
+                self._trial_running = False
+
+    def metrics(self) -> dict:
+        with self._lock:
+            open_for = None
+            if self.state == OPEN:
+                open_for = max(0.0, self.reset_seconds - (time.monotonic() - self.opened_at))
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "reset_seconds": self.reset_seconds,
+                "retry_in_seconds": round(open_for, 3) if open_for is not None else None,
+                **self.stats,
+                "avg_success_ms": round(self._success_ms / self.stats["successes"], 3)
+                if self.stats["successes"] else 0.0
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """The named breaker, created on first use."""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        if name not in BREAKER_NAMES:
+            raise ValueError(f"Unknown breaker: {name}")
+        with _breakers_lock:
+            breaker = _breakers.get(name)
+            if breaker is None:
+                breaker = CircuitBreaker(name)
+                _breakers[name] = breaker
+    return breaker
+
+
+def breaker_metrics() -> dict:
+    return {name: get_breaker(name).metrics() for name in BREAKER_NAMES}
+
+
+def shutdown_breakers() -> None:
+    for breaker in list(_breakers.values()):
+        breaker.shutdown()
@@ -0,0 +1,167 @@
+"""
+Bulkhead executors per endpoint class
+Sync endpoints normally share Starlette's one threadpool, so a burst of slow
+analytics or bulk calls can hold every thread /api/predict needs. Each class
+of endpoint gets its own ThreadPoolExecutor instead:
+
+  scoring    /api/predict
+  bulk       /api/bulk-predict, /api/bulk-predict/columnar, job submission
+  analytics  /api/analytics, /api/transactions/{email}, job results
+  auth       /api/register, /api/login (bcrypt is CPU-heavy)
+  stream     /ws/score micro-batches (utils/streaming.py)
+
+Each pool runs at most BULKHEAD_<NAME>_WORKERS calls and lets at most
+BULKHEAD_<NAME>_QUEUE more wait; beyond that the call is refused with 503
+and Retry-After rather than queueing behind the rest. Usage:
+
+    @app.post("/api/predict")
+    @bulkhead("scoring")
+    @profile_endpoint
+    def predict_transaction(...): ...
+
+The handler runs in a copy of the request's context, so profiling stages
+and SQL hooks still see the current request.
+"""
+
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+
+from config import settings
+
+BULKHEAD_NAMES = ("scoring", "bulk", "analytics", "auth", "stream")
+
+
+class Bulkhead:
+    """One isolated executor with a bounded wait queue and usage counters."""
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"bulkhead-{name}")
+        self._lock = threading.Lock()
+        self.active = 0
+        self.queued = 0
+        self.peak_queued = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _admit(self) -> bool:
+        with self._lock:
+            if self.active + self.queued >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                return False
+            self.queued += 1
+            self.peak_queued = max(self.peak_queued, self.queued)
+            return True
+
+    def _start(self, waited: float) -> None:
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+    def _finish(self) -> None:
+        with self._lock:
+            self.active -= 1
+            self.completed += 1
+
+    def _dropped(self, future) -> None:
+        # Cancelled while still waiting (client went away): it never started
+        if future.cancelled():
+            with self._lock:
+                self.queued -= 1
+
+    async def run(self, func, *args, **kwargs):
+        """Run func(*args, **kwargs) on this bulkhead; 503 when it is full."""
+        if not self._admit():
+            raise HTTPException(
+                status_code=503,
+                detail=f"Server busy ({self.name} capacity reached), retry shortly",
+                headers={"Retry-After": "1"}
+            )
+        submitted = time.perf_counter()
+        context = contextvars.copy_context()
+
+        def call():
+            self._start(time.perf_counter() - submitted)
+            try:
+                return context.run(func, *args, **kwargs)
+            finally:
+                self._finish()
+
+        future = self._executor.submit(call)
+        future.add_done_callback(self._dropped)
+        return await asyncio.wrap_future(future)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            started = self.completed + self.active
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "active": self.active,
+                "queued": self.queued,
+                "peak_queued": self.peak_queued,
+                "saturation": round(self.active / self.max_workers, 3),
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_queue_wait_ms": round(self.wait_total / started * 1000, 3) if started else 0.0,
+                "max_queue_wait_ms": round(self.wait_max * 1000, 3)
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_bulkheads = {}
+_bulkheads_lock = threading.Lock()
+
+
+def get_bulkhead(name: str) -> Bulkhead:
+    """The named bulkhead, created from BULKHEAD_<NAME>_WORKERS/_QUEUE on first use."""
+    bulkhead = _bulkheads.get(name)
+    if bulkhead is None:
+        if name not in BULKHEAD_NAMES:
+            raise ValueError(f"Unknown bulkhead: {name}")
+        with _bulkheads_lock:
+            bulkhead = _bulkheads.get(name)
+            if bulkhead is None:
+                prefix = f"BULKHEAD_{name.upper()}"
+                bulkhead = Bulkhead(name, getattr(settings, f"{prefix}_WORKERS"),
+                                    getattr(settings, f"{prefix}_QUEUE"))
+                _bulkheads[name] = bulkhead
+    return bulkhead
+
+
+def bulkhead(name: str):
+    """Run a sync endpoint on the named bulkhead (keeps the signature for FastAPI)."""
+    if name not in BULKHEAD_NAMES:
+        raise ValueError(f"Unknown bulkhead: {name}")
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            return await get_bulkhead(name).run(func, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def bulkhead_metrics() -> dict:
+    return {name: get_bulkhead(name).metrics() for name in BULKHEAD_NAMES}
+
+
+def shutdown_bulkheads() -> None:
+    for bulkhead in list(_bulkheads.values()):
+        bulkhead.shutdown()
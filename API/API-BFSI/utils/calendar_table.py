@@ -0,0 +1,122 @@
+"""
+Precomputed calendar for feature derivation
+One uint8 per day over CALENDAR_FIRST_YEAR..CALENDAR_LAST_YEAR, built once:
+
+  bits 0-2 : weekday (Monday = 0, as datetime.weekday())
+  bit 3    : weekend (Saturday / Sunday)
+  bit 4    : Indian national holiday (holidays.India, as before)
+  bit 5    : regional holiday of CALENDAR_SUBDIVISION (e.g. "MH"), optional
+  bit 6    : inside one of CALENDAR_FESTIVALS ("YYYY-MM-DD:YYYY-MM-DD"), optional
+
+A lookup is `table[date.toordinal() - first_ordinal]` - no holiday objects,
+no allocation. Dates outside the range fall back to the holidays package.
+"""
+
+from datetime import date
+from typing import Optional
+
+import numpy as np
+
+from config import settings
+
+WEEKDAY_MASK = 0b0000111
+WEEKEND = 1 << 3
+NATIONAL_HOLIDAY = 1 << 4
+REGIONAL_HOLIDAY = 1 << 5
+FESTIVAL = 1 << 6
+
+
+class CalendarTable:
+    """Day-indexed calendar flags for a contiguous range of years."""
+
+    def __init__(self, first_year: int, last_year: int, subdivision: str = "",
+                 festivals: list = None):
+        import holidays
+
+        self.first_year = first_year
+        self.last_year = last_year
+        self.subdivision = subdivision
+        self.first_ordinal = date(first_year, 1, 1).toordinal()
+        self.last_ordinal = date(last_year, 12, 31).toordinal()
+
+        days = np.arange(self.first_ordinal, self.last_ordinal + 1)
+        # date.fromordinal(1) is a Monday, so weekday = (ordinal - 1) % 7
+        weekday = ((days - 1) % 7).astype(np.uint8)
+        table = weekday | np.where(weekday >= 5, WEEKEND, 0).astype(np.uint8)
+
+        years = range(first_year, last_year + 1)
+        national = holidays.India(years=years)
+        self._set(table, national.keys(), NATIONAL_HOLIDAY)
+        if subdivision:
+            regional = holidays.India(subdiv=subdivision, years=years)
+            self._set(table, (d for d in regional.keys() if d not in national), REGIONAL_HOLIDAY)
+        for start, end in parse_festivals(festivals or []):
+            lo = max(start.toordinal(), self.first_ordinal) - self.first_ordinal
+            hi = min(end.toordinal(), self.last_ordinal) - self.first_ordinal
+            if lo <= hi:
+                table[lo:hi + 1] |= FESTIVAL
+
+        self.table = table
+        self._flags = table.tolist()  # plain ints: single lookups avoid NumPy scalars
+
+    def _set(self, table: np.ndarray, dates, bit: int) -> None:
+        for day in dates:
+            index = day.toordinal() - self.first_ordinal
+            if 0 <= index < len(table):
+                table[index] |= bit
+
+    # ------------------ LOOKUPS ------------------
+    def flags(self, ordinal: int) -> int:
+        """Calendar byte for a day ordinal (date.toordinal())."""
+        index = ordinal - self.first_ordinal
+        if 0 <= index < len(self._flags):
+            return self._flags[index]
+        return self._outside_range(ordinal)
+
+    def flags_batch(self, ordinals: np.ndarray) -> np.ndarray:
+        """Calendar bytes for an array of day ordinals."""
+        ordinals = np.asarray(ordinals, dtype=np.int64)
+        index = ordinals - self.first_ordinal
+        inside = (index >= 0) & (index < len(self.table))
+        result = self.table[np.where(inside, index, 0)]
+        if not inside.all():
+            for ordinal in np.unique(ordinals[~inside]):
+                result[ordinals == ordinal] = self._outside_range(int(ordinal))
+        return result
+
+    def _outside_range(self, ordinal: int) -> int:
+        """Slow path for dates outside the precomputed years."""
+        import holidays
+
+        day = date.fromordinal(ordinal)
+        value = day.weekday()
+        if value >= 5:
+            value |= WEEKEND
+        if day in holidays.India(years=day.year):
+            value |= NATIONAL_HOLIDAY
+        return value
+
+
+def parse_festivals(festivals: list) -> list:
+    """["2025-10-18:2025-10-23", ...] -> [(date, date), ...] (inclusive)."""
+    periods = []
+    for period in festivals:
+        start, _, end = period.partition(":")
+        periods.append((date.fromisoformat(start), date.fromisoformat(end or start)))
+    return periods
+
+
+_calendar: Optional[CalendarTable] = None
+
+
+def get_calendar() -> CalendarTable:
+    """The process-wide calendar, built on first use from settings."""
+    global _calendar
+    if _calendar is None:
+        _calendar = CalendarTable(
+            settings.CALENDAR_FIRST_YEAR,
+            settings.CALENDAR_LAST_YEAR,
+            subdivision=settings.CALENDAR_SUBDIVISION,
+            festivals=settings.CALENDAR_FESTIVALS
+        )
+    return _calendar
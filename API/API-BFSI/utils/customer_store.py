@@ -0,0 +1,257 @@
+"""
+In-memory online aggregates per customer_id
+Keeps, for every customer, O(1)-update running statistics that the API could
+not compute at serving time before (cf. avg_transaction_amount and
+velocity_check in the training data):
+
+  * decayed_count : exponentially decayed transaction count
+                    (half-life CUSTOMER_STORE_HALF_LIFE_HOURS)
+  * count         : all-time transaction count
+  * mean / M2     : running mean and variance of the amount (Welford)
+  * last_ts       : last-seen timestamp (epoch seconds, prediction time)
+
+State lives in parallel NumPy arrays (48 bytes per customer) plus one
+dict from customer_id to slot. It can be snapshotted to / restored from an
+.npz file and rebuilt from the predictions table.
+
+Each API worker holds its own store: it is loaded at startup (snapshot +
+catch-up from the DB) and then sees the predictions that worker writes.
+
+Usage:
+    python -m utils.customer_store rebuild     # full rebuild -> snapshot
+    python -m utils.customer_store show CUST1  # print one customer
+"""
+
+import math
+import os
+import sys
+import threading
+import time
+from datetime import timezone
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from config import settings
+
+_INITIAL_CAPACITY = 1024
+
+
+class CustomerAggregate(NamedTuple):
+    """Read-only view of one customer's aggregates at a point in time."""
+    customer_id: str
+    count: int
+    decayed_count: float
+    mean_amount: float
+    std_amount: float
+    last_seen: float
+    seconds_since_last: float
+
+
+class CustomerStore:
+    """Array-backed running aggregates keyed by customer_id."""
+
+    def __init__(self, half_life_hours: float = None, capacity: int = _INITIAL_CAPACITY):
+        half_life_hours = half_life_hours or settings.CUSTOMER_STORE_HALF_LIFE_HOURS
+        self.half_life_hours = float(half_life_hours)
+        self._decay_rate = math.log(2) / (self.half_life_hours * 3600.0)
+        self._lock = threading.Lock()
+        self._slots = {}
+        self._ids = []
+        self._size = 0
+        self.last_prediction_id = 0
+        self._allocate(capacity)
+
+    def _allocate(self, capacity: int) -> None:
+        self._decayed = np.zeros(capacity, dtype=np.float64)
+        self._count = np.zeros(capacity, dtype=np.int64)
+        self._amount_n = np.zeros(capacity, dtype=np.int64)
+        self._mean = np.zeros(capacity, dtype=np.float64)
+        self._m2 = np.zeros(capacity, dtype=np.float64)
+        self._last_ts = np.zeros(capacity, dtype=np.float64)
+
+    def _arrays(self) -> dict:
+        return {"decayed": self._decayed, "count": self._count, "amount_n": self._amount_n,
+                "mean": self._mean, "m2": self._m2, "last_ts": self._last_ts}
+
+    def _grow(self) -> None:
+        capacity = len(self._decayed) * 2
+        for name, array in self._arrays().items():
+            grown = np.zeros(capacity, dtype=array.dtype)
+            grown[:self._size] = array[:self._size]
+            setattr(self, f"_{name}", grown)
+
+    def _slot(self, customer_id: str) -> int:
+        slot = self._slots.get(customer_id)
+        if slot is None:
+            if self._size == len(self._decayed):
+                self._grow()
+            slot = self._size
+            self._slots[customer_id] = slot
+            self._ids.append(customer_id)
+            self._size += 1
+        return slot
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, customer_id: str) -> bool:
+        return customer_id in self._slots
+
+    # ------------------ UPDATES ------------------
+    def update(self, customer_id: str, amount: Optional[float], ts: float,
+               prediction_id: int = None) -> None:
+        """Record one transaction (ts in epoch seconds). Out-of-order events are decayed."""
+        with self._lock:
+            slot = self._slot(customer_id)
+            last = self._last_ts[slot]
+            if ts >= last:
+                self._decayed[slot] = self._decayed[slot] * math.exp(-self._decay_rate * (ts - last)) + 1.0
+                self._last_ts[slot] = ts
+            else:
+                self._decayed[slot] += math.exp(-self._decay_rate * (last - ts))
+            self._count[slot] += 1
+
+            if amount is not None:
+                n = self._amount_n[slot] + 1
+                delta = amount - self._mean[slot]
+                self._mean[slot] += delta / n
+                self._m2[slot] += delta * (amount - self._mean[slot])
+                self._amount_n[slot] = n
+
+            if prediction_id is not None and prediction_id > self.last_prediction_id:
+                self.last_prediction_id = prediction_id
+
+    def update_from_prediction(self, prediction) -> None:
+        """Record a committed Prediction row."""
+        self.update(prediction.customer_id, prediction.transaction_amount,
+                    epoch_seconds(prediction.timestamp), prediction.id)
+
+    # ------------------ READS ------------------
+    def get(self, customer_id: str, now: float = None) -> Optional[CustomerAggregate]:
+        """Aggregates for one customer with the decayed count brought to `now`."""
+        now = time.time() if now is None else now
+        # Under the lock: update() may grow (reallocate) the arrays or be mid-way through a slot
+        with self._lock:
+            slot = self._slots.get(customer_id)
+            if slot is None:
+                return None
+            last = float(self._last_ts[slot])
+            count = int(self._count[slot])
+            decayed = float(self._decayed[slot])
+            mean = float(self._mean[slot])
+            m2 = float(self._m2[slot])
+            n = int(self._amount_n[slot])
+        elapsed = max(0.0, now - last)
+        return CustomerAggregate(
+            customer_id=customer_id,
+            count=count,
+            decayed_count=decayed * math.exp(-self._decay_rate * elapsed),
+            mean_amount=mean,
+            std_amount=math.sqrt(m2 / (n - 1)) if n > 1 else 0.0,
+            last_seen=last,
+            seconds_since_last=elapsed
+        )
+
+    def memory_bytes(self) -> int:
+        """Bytes held by the arrays (excluding the id dict)."""
+        return sum(array.nbytes for array in self._arrays().values())
+
+    # ------------------ PERSISTENCE ------------------
+    def snapshot(self, path: str = None) -> Path:
+        """Write the store to an .npz file atomically."""
+        path = Path(path or settings.CUSTOMER_STORE_PATH)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        with self._lock:
+            size = self._size
+            arrays = {name: array[:size].copy() for name, array in self._arrays().items()}
+            ids = np.array(self._ids[:size], dtype=str)
+            meta = np.array([self.half_life_hours, self.last_prediction_id], dtype=np.float64)
+        with open(tmp, "wb") as f:
+            np.savez(f, customer_ids=ids, meta=meta, **arrays)
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def restore(cls, path: str = None) -> "CustomerStore":
+        data = np.load(path or settings.CUSTOMER_STORE_PATH)
+        half_life_hours, last_prediction_id = data["meta"]
+        ids = data["customer_ids"].tolist()
+        store = cls(half_life_hours=float(half_life_hours), capacity=max(len(ids), _INITIAL_CAPACITY))
+        for name, array in store._arrays().items():
+            array[:len(ids)] = data[name]
+        store._ids = ids
+        store._slots = {customer_id: slot for slot, customer_id in enumerate(ids)}
+        store._size = len(ids)
+        store.last_prediction_id = int(last_prediction_id)
+        return store
+
+    def catch_up(self, session_factory, batch_size: int = 10_000) -> int:
+        """Apply predictions newer than last_prediction_id from the database."""
+        from models import Prediction
+
+        applied = 0
+        with session_factory() as db:
+            query = db.query(
+                Prediction.id, Prediction.customer_id,
+                Prediction.transaction_amount, Prediction.timestamp
+            ).filter(
+                Prediction.id > self.last_prediction_id
+            ).order_by(Prediction.id).execution_options(yield_per=batch_size)
+            for row in query:
+                self.update_from_prediction(row)
+                applied += 1
+        return applied
+
+    @classmethod
+    def rebuild(cls, session_factory, batch_size: int = 10_000) -> "CustomerStore":
+        store = cls()
+        store.catch_up(session_factory, batch_size)
+        return store
+
+
+def epoch_seconds(timestamp) -> float:
+    """Prediction timestamps are naive UTC."""
+    return timestamp.replace(tzinfo=timezone.utc).timestamp() if timestamp else 0.0
+
+
+def latest_prediction_id(session_factory) -> int:
+    from sqlalchemy import func
+    from models import Prediction
+
+    with session_factory() as db:
+        return db.query(func.max(Prediction.id)).scalar() or 0
+
+
+def load_store(session_factory) -> CustomerStore:
+    """Restore the last snapshot (if any) and catch up from the database."""
+    path = Path(settings.CUSTOMER_STORE_PATH)
+    store = CustomerStore.restore(path) if path.exists() else CustomerStore()
+    if store.half_life_hours != settings.CUSTOMER_STORE_HALF_LIFE_HOURS:
+        store = CustomerStore()  # decay changed: rebuild from scratch
+    elif store.last_prediction_id > latest_prediction_id(session_factory):
+        # Snapshot from another (recreated or reseeded) database: its cursor would skip new ids
+        print(f"⚠️ Customer store snapshot is ahead of the database "
+              f"(prediction id {store.last_prediction_id}), rebuilding")
+        store = CustomerStore()
+    store.catch_up(session_factory)
+    return store
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    if len(sys.argv) < 2 or sys.argv[1] not in ("rebuild", "show"):
+        print("Usage: python -m utils.customer_store rebuild | show <customer_id>")
+        sys.exit(1)
+
+    if sys.argv[1] == "rebuild":
+        start = time.perf_counter()
+        store = CustomerStore.rebuild(SessionLocal)
+        path = store.snapshot()
+        print(f"✅ {len(store)} customers rebuilt in {time.perf_counter() - start:.1f}s -> {path}")
+    else:
+        store = load_store(SessionLocal)
+        print(store.get(sys.argv[2]) or f"⚠️ Unknown customer {sys.argv[2]}")
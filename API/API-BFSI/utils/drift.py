@@ -0,0 +1,359 @@
+"""
+Streaming feature drift against the training distribution
+Every scored transaction adds one count per feature to a fixed-bin
+histogram; /api/drift compares recent histograms with the training data
+(data/processed/train_data) using PSI and a binned Kolmogorov-Smirnov
+distance, without reading the predictions table.
+
+  * Bins come from the reference: one bin per value for binary and
+    categorical features, training quantiles (DRIFT_BINS) for amount,
+    account age and the model probability, with open-ended outer bins.
+  * Counts are kept per time window (DRIFT_WINDOW_MINUTES) in a ring of
+    DRIFT_WINDOWS slots, so memory is windows x bins whatever the traffic,
+    and old traffic ages out.
+  * Scores over fewer than DRIFT_MIN_ROWS rows are reported but marked
+    insufficient_data rather than drifting.
+  * Histograms are plain counts and merge by addition: each API worker
+    writes its ring to DRIFT_DIR every DRIFT_FLUSH_SECONDS and /api/drift
+    sums the files of all workers (same reference only).
+
+The reference is built once from DRIFT_REFERENCE_CSV (model probabilities
+scored with the serving model) and cached at DRIFT_REFERENCE_PATH.
+
+Usage:
+    python -m utils.drift reference   # rebuild the cached reference
+    python -m utils.drift report      # drift of the merged worker files
+"""
+
+import bisect
+import hashlib
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from config import settings
+
+from utils.features import BINARY_FEATURES, FEATURE_NAMES
+
+SCORE_NAMES = ["model_probability"]
+DRIFT_NAMES = FEATURE_NAMES + SCORE_NAMES
+
+# Integer-valued features with a known range get one bin per value
+DISCRETE_RANGES = {
+    "channel_encoded": (0, 3),
+    "hour_of_day": (0, 23),
+    "day_of_week": (0, 6),
+    **{name: (0, 1) for name in BINARY_FEATURES}
+}
+
+# Conventional PSI bands
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+
+# Added to empty bins so PSI stays finite
+_EPSILON = 1e-4
+
+
+def _severity(psi: float) -> str:
+    if psi >= PSI_SIGNIFICANT:
+        return "significant"
+    if psi >= PSI_MODERATE:
+        return "moderate"
+    return "stable"
+
+
+def drift_scores(expected: np.ndarray, observed: np.ndarray) -> tuple:
+    """(PSI, KS distance) between two histograms over the same bins."""
+    expected = expected / expected.sum()
+    observed = observed / observed.sum()
+    e = np.maximum(expected, _EPSILON)
+    o = np.maximum(observed, _EPSILON)
+    psi = float(np.sum((o - e) * np.log(o / e)))
+    ks = float(np.max(np.abs(np.cumsum(observed) - np.cumsum(expected))))
+    return psi, ks
+
+
+class DriftReference:
+    """Bin layout and training counts for every tracked feature."""
+
+    def __init__(self, edges: dict, counts: dict, rows: int, source: str = ""):
+        self.edges = {name: np.asarray(edges[name], dtype=np.float64) for name in DRIFT_NAMES}
+        self.counts = {name: np.asarray(counts[name], dtype=np.int64) for name in DRIFT_NAMES}
+        self.rows = rows
+        self.source = source
+
+        # Feature i occupies columns offsets[i] .. offsets[i] + bins - 1 of a histogram row
+        sizes = [len(self.edges[name]) + 1 for name in DRIFT_NAMES]
+        self.offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int64)
+        self.total_bins = int(sum(sizes))
+        self._edge_lists = [self.edges[name].tolist() for name in DRIFT_NAMES]
+
+        layout = json.dumps({name: self.edges[name].tolist() for name in DRIFT_NAMES})
+        self.fingerprint = hashlib.sha1(layout.encode()).hexdigest()[:16]
+
+    # ------------------ BUILD ------------------
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame, bins: int = None, source: str = "") -> "DriftReference":
+        """Reference from a frame with FEATURE_NAMES and model_probability columns."""
+        bins = bins or settings.DRIFT_BINS
+        edges, counts = {}, {}
+        for name in DRIFT_NAMES:
+            values = frame[name].to_numpy(dtype=np.float64)
+            if name in DISCRETE_RANGES:
+                low, high = DISCRETE_RANGES[name]
+                # Bin k holds value low + k; outer bins catch anything out of range
+                edges[name] = np.arange(low, high + 2, dtype=np.float64) - 0.5
+            else:
+                quantiles = np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1])
+                edges[name] = np.unique(quantiles)
+            index = np.searchsorted(edges[name], values, side="right")
+            counts[name] = np.bincount(index, minlength=len(edges[name]) + 1)
+        return cls(edges, counts, len(frame), source)
+
+    @classmethod
+    def from_training_csv(cls, model, path: str = None) -> "DriftReference":
+        path = path or settings.DRIFT_REFERENCE_CSV
+        frame = pd.read_csv(path)
+        frame["model_probability"] = model.predict_proba(frame[FEATURE_NAMES])[:, 1]
+        return cls.from_frame(frame, source=str(path))
+
+    def save(self, path: str = None) -> Path:
+        path = Path(path or settings.DRIFT_REFERENCE_PATH)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        arrays = {}
+        for name in DRIFT_NAMES:
+            arrays[f"edges__{name}"] = self.edges[name]
+            arrays[f"counts__{name}"] = self.counts[name]
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, meta=np.array([self.rows, self.source]), **arrays)
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def load(cls, path: str = None) -> "DriftReference":
+        data = np.load(path or settings.DRIFT_REFERENCE_PATH)
+        rows, source = data["meta"].tolist()
+        return cls(
+            {name: data[f"edges__{name}"] for name in DRIFT_NAMES},
+            {name: data[f"counts__{name}"] for name in DRIFT_NAMES},
+            int(rows), source
+        )
+
+    # ------------------ BINNING ------------------
+    def bin_row(self, values: list) -> np.ndarray:
+        """Histogram columns for one row (values in DRIFT_NAMES order)."""
+        return self.offsets + np.fromiter(
+            (bisect.bisect_right(edges, value) for edges, value in zip(self._edge_lists, values)),
+            dtype=np.int64, count=len(values)
+        )
+
+    def bin_columns(self, columns: dict) -> np.ndarray:
+        """Histogram counts for a batch given one array per name in DRIFT_NAMES."""
+        counts = np.zeros(self.total_bins, dtype=np.int64)
+        for offset, name in zip(self.offsets, DRIFT_NAMES):
+            index = np.searchsorted(self.edges[name], np.asarray(columns[name], dtype=np.float64), side="right")
+            counts[offset:offset + len(self.edges[name]) + 1] += np.bincount(
+                index, minlength=len(self.edges[name]) + 1
+            )
+        return counts
+
+    def split(self, counts: np.ndarray) -> dict:
+        """{name: that feature's bins} of a flat histogram row."""
+        return {
+            name: counts[offset:offset + len(self.edges[name]) + 1]
+            for offset, name in zip(self.offsets, DRIFT_NAMES)
+        }
+
+
+class DriftMonitor:
+    """
+    Windowed histograms of live traffic for one worker.
+    counts[slot] holds window windows[slot] (window = epoch minutes //
+    DRIFT_WINDOW_MINUTES); a slot is cleared when its window comes round again.
+    """
+
+    def __init__(self, reference: DriftReference, window_minutes: int = None, windows: int = None,
+                 state_dir: str = None, flush_seconds: float = None):
+        self.reference = reference
+        self.window_seconds = (window_minutes or settings.DRIFT_WINDOW_MINUTES) * 60
+        self.windows = windows or settings.DRIFT_WINDOWS
+        self.state_dir = Path(state_dir or settings.DRIFT_DIR)
+        self.flush_seconds = settings.DRIFT_FLUSH_SECONDS if flush_seconds is None else flush_seconds
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}"
+        self._counts = np.zeros((self.windows, reference.total_bins), dtype=np.int64)
+        self._window_ids = np.full(self.windows, -1, dtype=np.int64)
+        self._lock = threading.Lock()
+        self._last_flush = time.time()
+
+    def _slot(self, now: float) -> int:
+        window = int(now // self.window_seconds)
+        slot = window % self.windows
+        if self._window_ids[slot] != window:
+            self._counts[slot] = 0
+            self._window_ids[slot] = window
+        return slot
+
+    # ------------------ UPDATES ------------------
+    def observe(self, features: dict, model_probability: float) -> None:
+        """Record one scored transaction (features as from derive_features_auto)."""
+        values = [features[name] for name in FEATURE_NAMES]
+        values.append(model_probability)
+        columns = self.reference.bin_row(values)
+        now = time.time()
+        with self._lock:
+            self._counts[self._slot(now), columns] += 1
+        self._maybe_flush(now)
+
+    def observe_batch(self, columns: dict) -> None:
+        """Record a batch: one array (or list) per name in DRIFT_NAMES, e.g. a score_frame result."""
+        counts = self.reference.bin_columns(columns)
+        now = time.time()
+        with self._lock:
+            self._counts[self._slot(now)] += counts
+        self._maybe_flush(now)
+
+    def observe_rows(self, rows: list) -> None:
+        """Record compact prediction rows (compact_rows / job chunks)."""
+        if not rows:
+            return
+        flags = np.fromiter((row["feature_flags"] for row in rows), dtype=np.int64, count=len(rows))
+        columns = {name: (flags >> bit) & 1 for bit, name in enumerate(BINARY_FEATURES)}
+        for name, key in (("transaction_amount", "transaction_amount"), ("account_age_days", "account_age_days"),
+                          ("channel_encoded", "channel"), ("hour_of_day", "hour_of_day"),
+                          ("day_of_week", "day_of_week"), ("model_probability", "model_probability")):
+            columns[name] = [row[key] for row in rows]
+        self.observe_batch(columns)
+
+    # ------------------ PERSISTENCE / MERGE ------------------
+    def _maybe_flush(self, now: float) -> None:
+        if now - self._last_flush >= self.flush_seconds:
+            self._last_flush = now
+            self.flush()
+
+    def _snapshot(self) -> tuple:
+        with self._lock:
+            return self._window_ids.copy(), self._counts.copy()
+
+    def flush(self) -> Path:
+        """Write this worker's ring to DRIFT_DIR for the other workers."""
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        window_ids, counts = self._snapshot()
+        path = self.state_dir / f"{self.worker_id}.npz"
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, fingerprint=np.array(self.reference.fingerprint), window_ids=window_ids, counts=counts)
+        os.replace(tmp, path)
+        return path
+
+    def merged(self, hours: float = None, now: float = None) -> tuple:
+        """
+        (counts summed over this worker and every flushed worker file for the
+        last `hours`, number of workers). Files of other references are ignored
+        and files with only expired windows are removed.
+        """
+        now = time.time() if now is None else now
+        span = self.windows if hours is None else max(1, int(np.ceil(hours * 3600 / self.window_seconds)))
+        current = int(now // self.window_seconds)
+        oldest = current - min(span, self.windows) + 1
+
+        def windowed(window_ids, counts):
+            keep = (window_ids >= oldest) & (window_ids <= current)
+            return counts[keep].sum(axis=0)
+
+        window_ids, counts = self._snapshot()
+        total = windowed(window_ids, counts)
+        workers = 1
+        for path in self.state_dir.glob("*.npz") if self.state_dir.exists() else []:
+            if path.stem == self.worker_id:
+                continue
+            try:
+                data = np.load(path)
+                if str(data["fingerprint"]) != self.reference.fingerprint:
+                    continue
+                if data["window_ids"].max() < current - self.windows:
+                    path.unlink(missing_ok=True)
+                    continue
+                total = total + windowed(data["window_ids"], data["counts"])
+                workers += 1
+            except (OSError, ValueError, KeyError):
+                continue  # being replaced or written by an older layout
+        return total, workers
+
+    def report(self, hours: float = None) -> dict:
+        """PSI / KS per feature for the merged histograms of the last `hours`."""
+        counts, workers = self.merged(hours)
+        observed = self.reference.split(counts)
+        rows = int(observed[DRIFT_NAMES[0]].sum())
+        features = {}
+        for name in DRIFT_NAMES:
+            expected = self.reference.counts[name]
+            entry = {
+                "psi": None, "ks": None, "status": "no_data",
+                "edges": self.reference.edges[name].tolist(),
+                "expected": np.round(expected / expected.sum(), 4).tolist(),
+                "observed": observed[name].tolist()
+            }
+            if rows:
+                psi, ks = drift_scores(expected, observed[name])
+                status = _severity(psi) if rows >= settings.DRIFT_MIN_ROWS else "insufficient_data"
+                entry.update(psi=round(psi, 4), ks=round(ks, 4), status=status)
+            features[name] = entry
+        drifted = sorted(
+            (name for name in DRIFT_NAMES if features[name]["status"] in ("moderate", "significant")),
+            key=lambda name: -features[name]["psi"]
+        )
+        return {
+            "window_hours": round((hours or self.windows * self.window_seconds / 3600), 2),
+            "rows": rows,
+            "workers": workers,
+            "reference_rows": self.reference.rows,
+            "reference_source": self.reference.source,
+            "drifted_features": drifted,
+            "features": features
+        }
+
+    def memory_bytes(self) -> int:
+        return self._counts.nbytes + self._window_ids.nbytes
+
+
+def load_reference(model) -> DriftReference:
+    """Cached reference, or one built (and cached) from the training CSV."""
+    path = Path(settings.DRIFT_REFERENCE_PATH)
+    if path.exists():
+        return DriftReference.load(path)
+    reference = DriftReference.from_training_csv(model)
+    reference.save(path)
+    return reference
+
+
+if __name__ == "__main__":
+    from utils.scoring import load_model
+
+    if len(sys.argv) < 2 or sys.argv[1] not in ("reference", "report"):
+        print("Usage: python -m utils.drift reference | report [hours]")
+        sys.exit(1)
+
+    if sys.argv[1] == "reference":
+        reference = DriftReference.from_training_csv(load_model())
+        path = reference.save()
+        print(f"✅ Reference built from {reference.rows} training rows "
+              f"({reference.total_bins} bins) -> {path}")
+    else:
+        monitor = DriftMonitor(DriftReference.load())
+        monitor.worker_id = ""  # read-only: merge every worker file
+        report = monitor.report(float(sys.argv[2]) if len(sys.argv) > 2 else None)
+        print(f"📈 {report['rows']} rows from {report['workers'] - 1} worker file(s), "
+              f"last {report['window_hours']}h")
+        for name, entry in report["features"].items():
+            if entry["psi"] is None:
+                print(f"   {name:<28} no data")
+            else:
+                print(f"   {name:<28} PSI {entry['psi']:7.4f}   KS {entry['ks']:.4f}   {entry['status']}")
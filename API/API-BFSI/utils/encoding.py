@@ -0,0 +1,171 @@
+"""
+Response encoding: fast JSON plus MessagePack / Arrow IPC negotiation
+Endpoints that return one of these Response objects skip FastAPI's
+response_model pass (validate + serialize of the whole payload again); the
+*Response schemas still document the shape in /docs.
+
+  * fast_json(content)                          - orjson, for every JSON response
+  * negotiated(content, media_type, rows_key)   - bulk/history, with media_type
+    from the response_media_type dependency (Accept header):
+      application/json                      (default)
+      application/msgpack                   same document as MessagePack
+      application/vnd.apache.arrow.stream   data[rows_key] as an Arrow IPC
+                                            stream; the rest of the document
+                                            is JSON in the schema metadata
+                                            under b"response"
+
+orjson, msgpack and pyarrow are optional: without orjson JSON falls back to
+the standard library, and a binary type whose package is missing is not
+offered (406 if the client accepts nothing else).
+"""
+
+import datetime
+import json
+from typing import Any, Optional
+
+import numpy as np
+from fastapi import HTTPException, Request
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+# Other names clients use for the same formats
+_ALIASES = {
+    "application/x-msgpack": MSGPACK_MEDIA_TYPE,
+    "application/vnd.msgpack": MSGPACK_MEDIA_TYPE,
+    "application/x-apache-arrow-stream": ARROW_MEDIA_TYPE,
+}
+_WILDCARDS = {"*/*", "application/*", ""}
+
+
+def _default(value: Any) -> Any:
+    """Types the encoders do not handle natively."""
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, BaseModel):
+        return dict(value)
+    raise TypeError(f"Cannot encode {type(value).__name__}")
+
+
+def _payload(content: Any) -> Any:
+    # Shallow: the nested data dicts are encoded as they are
+    return dict(content) if isinstance(content, BaseModel) else content
+
+
+def encode_json(content: Any) -> bytes:
+    content = _payload(content)
+    if orjson is not None:
+        return orjson.dumps(
+            content, default=_default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        )
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def encode_msgpack(content: Any) -> bytes:
+    return msgpack.packb(_payload(content), default=_default, use_bin_type=True, datetime=False)
+
+
+def encode_arrow(content: Any, rows_key: str) -> bytes:
+    """data[rows_key] (list of row dicts or dict of columns) as an Arrow IPC stream."""
+    payload = _payload(content)
+    data = dict(payload["data"])
+    rows = data.pop(rows_key)
+    table = pa.Table.from_pydict(rows) if isinstance(rows, dict) else pa.Table.from_pylist(rows)
+    header = dict(payload, data=data)
+    table = table.replace_schema_metadata({b"response": encode_json(header)})
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def available_media_types() -> list:
+    """Formats this process can produce, in server preference order."""
+    media_types = [JSON_MEDIA_TYPE]
+    if msgpack is not None:
+        media_types.append(MSGPACK_MEDIA_TYPE)
+    if pa is not None:
+        media_types.append(ARROW_MEDIA_TYPE)
+    return media_types
+
+
+def preferred_media_type(accept: Optional[str], supported: list) -> Optional[str]:
+    """Best supported media type for an Accept header (None if nothing fits)."""
+    if not accept:
+        return supported[0]
+    candidates = []
+    for position, part in enumerate(accept.split(",")):
+        media_type, _, params = part.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            candidates.append((-quality, position, media_type.strip().lower()))
+
+    for _, _, media_type in sorted(candidates):
+        if media_type in _WILDCARDS:
+            return supported[0]
+        media_type = _ALIASES.get(media_type, media_type)
+        if media_type in supported:
+            return media_type
+    return None
+
+
+def fast_json(content: Any, status_code: int = 200) -> Response:
+    """JSON response encoded with orjson, bypassing response_model serialization."""
+    return Response(encode_json(content), status_code=status_code, media_type=JSON_MEDIA_TYPE)
+
+
+def response_media_type(request: Request) -> str:
+    """
+    Dependency: the format to answer in, chosen from Accept. Resolved before
+    the endpoint runs, so an unacceptable request fails (406) without side effects.
+    """
+    supported = available_media_types()
+    media_type = preferred_media_type(request.headers.get("accept"), supported)
+    if media_type is None:
+        raise HTTPException(
+            status_code=406,
+            detail=f"Not acceptable. Supported media types: {', '.join(supported)}"
+        )
+    return media_type
+
+
+def negotiated(content: Any, media_type: str, rows_key: str) -> Response:
+    """Encode `content` in the media type picked by response_media_type."""
+    if media_type == MSGPACK_MEDIA_TYPE:
+        body = encode_msgpack(content)
+    elif media_type == ARROW_MEDIA_TYPE:
+        body = encode_arrow(content, rows_key)
+    else:
+        body = encode_json(content)
+    return Response(body, media_type=media_type, headers={"Vary": "Accept"})
@@ -0,0 +1,354 @@
+"""
+Asynchronous explanation generation
+Scoring never waits for an explanation. Endpoints hand the new prediction
+ids to ExplanationWorker.submit() (a non-blocking queue put) and return the
+template text inline; a background thread then:
+
+  1. collects up to EXPLANATION_BATCH_SIZE pending ids (waiting at most
+     EXPLANATION_BATCH_WAIT_MS for a batch to fill)
+  2. loads the rows that still have no stored explanation
+  3. reduces each row to its backend signature - the exact inputs the
+     backend's text depends on - and generates text once per distinct
+     signature not already in the LRU cache
+  4. writes the text to predictions.explanation (only where it is still NULL)
+
+Backends (EXPLANATION_BACKEND, or "hf" when ENABLE_HF_EXPLANATIONS is set):
+  * template - utils/hf_model.generate_explanation. Default; since template
+               text can be rendered on read the worker only runs with it when
+               EXPLANATION_WORKER_ENABLED is set (tests, benchmarks)
+  * hf       - a transformers text-generation pipeline (HF_EXPLANATION_MODEL),
+               batched; falls back to generate_explanation_simple if
+               generation fails
+
+Ids that do not fit in the queue are not lost: the worker goes back for
+unexplained rows from the oldest dropped id once the queue drains.
+"""
+
+import logging
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy import bindparam, update
+
+from config import settings
+from utils.features import unpack_features
+from utils.hf_model import generate_explanation, generate_explanation_simple
+from utils.rules import mask_to_rules
+
+logger = logging.getLogger(__name__)
+
+_ROW_COLUMNS = (
+    "id", "risk_score", "rule_score", "rule_mask", "feature_flags", "transaction_amount",
+    "account_age_days", "channel", "hour_of_day", "day_of_week"
+)
+
+
+def _row_features(row) -> dict:
+    return unpack_features(
+        row.feature_flags, row.transaction_amount, row.account_age_days,
+        row.channel, row.hour_of_day, row.day_of_week
+    )
+
+
+# ------------------ BACKENDS ------------------
+class ExplanationBackend(ABC):
+    """
+    Turns prediction rows into explanation text.
+    signature(row) must capture everything render() uses, so rows with equal
+    signatures can share one generated text.
+    """
+    name = "base"
+
+    @abstractmethod
+    def signature(self, row) -> tuple:
+        ...
+
+    @abstractmethod
+    def render(self, signatures: list) -> list:
+        """One text per signature, in order."""
+
+
+class TemplateBackend(ExplanationBackend):
+    """The rule-based template from utils/hf_model.py."""
+    name = "template"
+
+    def signature(self, row) -> tuple:
+        features = _row_features(row)
+        return (
+            row.risk_score, row.rule_score or 0.0, row.rule_mask or 0,
+            features["transaction_amount"], features["kyc_verified"], features["account_age_days"],
+            features["is_night_txn"], features["is_weekend_txn"], features["is_holiday_txn"]
+        )
+
+    def render(self, signatures: list) -> list:
+        return [self._render_one(signature) for signature in signatures]
+
+    @staticmethod
+    def _render_one(signature: tuple) -> str:
+        risk_score, rule_score, rule_mask, amount, kyc, age, night, weekend, holiday = signature
+        features = {
+            "transaction_amount": amount, "kyc_verified": kyc, "account_age_days": age,
+            "is_night_txn": night, "is_weekend_txn": weekend, "is_holiday_txn": holiday
+        }
+        return generate_explanation({}, features, risk_score, rule_score, mask_to_rules(rule_mask))
+
+
+class HFBackend(ExplanationBackend):
+    """
+    Text generation with a Hugging Face pipeline, one batched call per batch.
+    The prompt uses the bands the rules and template use (risk in 5% steps,
+    amount and account age in bands), so similar transactions share a
+    signature and a generation.
+    """
+    name = "hf"
+
+    def __init__(self, model_name: str = None, max_new_tokens: int = None, batch_size: int = 8):
+        self.model_name = model_name or settings.HF_EXPLANATION_MODEL
+        self.max_new_tokens = max_new_tokens or settings.HF_EXPLANATION_MAX_TOKENS
+        self.batch_size = batch_size
+        self._generator = None
+
+    def _pipeline(self):
+        if self._generator is None:
+            from transformers import pipeline
+            self._generator = pipeline("text-generation", model=self.model_name)
+            if self._generator.tokenizer.pad_token_id is None:
+                self._generator.tokenizer.pad_token_id = self._generator.tokenizer.eos_token_id
+            logger.info(f"✅ Explanation model loaded ({self.model_name})")
+        return self._generator
+
+    def signature(self, row) -> tuple:
+        features = _row_features(row)
+        amount, age = features["transaction_amount"], features["account_age_days"]
+        amount_band = "over ₹100,000" if amount > 100000 else "₹50,000-₹100,000" if amount > 50000 else \
+            "under ₹50,000"
+        age_band = "under 10 days" if age < 10 else "under 30 days" if age < 30 else \
+            "under a year" if age < 365 else "over a year"
+        return (
+            round(row.risk_score * 20) / 20, row.rule_mask or 0, amount_band, features["kyc_verified"],
+            age_band, features["is_night_txn"], features["is_weekend_txn"], features["is_holiday_txn"]
+        )
+
+    @staticmethod
+    def prompt(signature: tuple) -> str:
+        risk_score, rule_mask, amount_band, kyc, age_band, night, weekend, holiday = signature
+        rules = mask_to_rules(rule_mask)
+        timing = [label for flag, label in ((night, "night"), (weekend, "weekend"), (holiday, "holiday")) if flag]
+        return (
+            "Fraud Detection Analysis:\n"
+            f"- Risk Score: {risk_score:.0%}\n"
+            f"- Amount: {amount_band}\n"
+            f"- KYC Verified: {'Yes' if kyc == 1 else 'No'}\n"
+            f"- Account Age: {age_band}\n"
+            f"- Timing: {', '.join(timing) if timing else 'regular hours'}\n"
+            f"- Rules Triggered: {', '.join(rules) if rules else 'None'}\n\n"
+            f"Explain why this transaction is {'fraudulent' if risk_score >= 0.6 else 'legitimate'}:\n"
+        )
+
+    def render(self, signatures: list) -> list:
+        prompts = [self.prompt(signature) for signature in signatures]
+        try:
+            outputs = self._pipeline()(
+                prompts, max_new_tokens=self.max_new_tokens, do_sample=False,
+                batch_size=self.batch_size, return_full_text=False
+            )
+            return [output[0]["generated_text"].strip() or self._fallback(signature)
+                    for output, signature in zip(outputs, signatures)]
+        except Exception as e:
+            logger.error(f"LLM generation failed: {e}")
+            return [self._fallback(signature) for signature in signatures]
+
+    @staticmethod
+    def _fallback(signature: tuple) -> str:
+        risk_score, rule_mask = signature[0], signature[1]
+        return generate_explanation_simple(risk_score, int(risk_score >= 0.6), mask_to_rules(rule_mask))
+
+
+BACKENDS = {"template": TemplateBackend, "hf": HFBackend}
+
+
+def configured_backend_name() -> str:
+    return "hf" if settings.ENABLE_HF_EXPLANATIONS else settings.EXPLANATION_BACKEND
+
+
+def get_backend(name: str = None) -> ExplanationBackend:
+    name = name or configured_backend_name()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown explanation backend: {name}")
+    return BACKENDS[name]()
+
+
+# ------------------ WORKER ------------------
+class ExplanationWorker:
+    """Background thread that batches, deduplicates and stores explanations."""
+
+    def __init__(self, session_factory, backend: ExplanationBackend, batch_size: int = None,
+                 batch_wait: float = None, queue_size: int = None, cache_size: int = None):
+        self.session_factory = session_factory
+        self.backend = backend
+        self.batch_size = batch_size or settings.EXPLANATION_BATCH_SIZE
+        self.batch_wait = batch_wait if batch_wait is not None else settings.EXPLANATION_BATCH_WAIT_MS / 1000
+        self.cache_size = cache_size or settings.EXPLANATION_CACHE_SIZE
+        self._queue = queue.Queue(maxsize=queue_size or settings.EXPLANATION_QUEUE_SIZE)
+        self._cache = OrderedDict()
+        self._oldest_dropped: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.stats = {
+            "submitted": 0, "dropped": 0, "batches": 0, "stored": 0, "generated": 0,
+            "deduplicated": 0, "cache_hits": 0, "errors": 0, "last_batch_ms": 0.0
+        }
+
+    # ---------- request side ----------
+    def submit(self, prediction_ids) -> None:
+        """Queue ids for explanation; never blocks the caller."""
+        for prediction_id in prediction_ids:
+            try:
+                self._queue.put_nowait(prediction_id)
+                self._count("submitted")
+            except queue.Full:
+                with self._lock:
+                    self.stats["dropped"] += 1
+                    if self._oldest_dropped is None or prediction_id < self._oldest_dropped:
+                        self._oldest_dropped = prediction_id
+
+    # ---------- lifecycle ----------
+    def start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="explanation-worker", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            ids = self._next_batch()
+            if not ids:
+                ids = self._backlog()
+                if not ids:
+                    continue
+            try:
+                self.process(ids)
+            except Exception as e:
+                self._count("errors")
+                logger.error(f"Explanation batch failed: {e}")
+
+    def _next_batch(self) -> list:
+        try:
+            ids = [self._queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.batch_wait
+        while len(ids) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                ids.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return ids
+
+    def _backlog(self) -> list:
+        """Unexplained rows from the oldest id that did not fit in the queue."""
+        with self._lock:
+            start = self._oldest_dropped
+        if start is None:
+            return []
+        from models import Prediction
+
+        with self.session_factory() as db:
+            ids = [row.id for row in db.query(Prediction.id).filter(
+                Prediction.id >= start,
+                Prediction.explanation.is_(None),
+                Prediction.feature_flags.isnot(None)
+            ).order_by(Prediction.id).limit(self.batch_size)]
+        with self._lock:
+            if self._oldest_dropped == start:  # unless an older id was dropped meanwhile
+                self._oldest_dropped = ids[-1] + 1 if len(ids) == self.batch_size else None
+        return ids
+
+    # ---------- one batch ----------
+    def process(self, prediction_ids: list) -> int:
+        """Explain and store one batch of ids. Returns the number of rows stored."""
+        from models import Prediction
+
+        started = time.perf_counter()
+        with self.session_factory() as db:
+            columns = [getattr(Prediction, name) for name in _ROW_COLUMNS]
+            rows = db.query(*columns).filter(
+                Prediction.id.in_(set(prediction_ids)),
+                Prediction.explanation.is_(None),
+                Prediction.feature_flags.isnot(None)
+            ).all()
+            if not rows:
+                return 0
+
+            texts = self.explain(rows)
+            table = Prediction.__table__
+            db.execute(
+                update(table)
+                .where(table.c.id == bindparam("row_id"), table.c.explanation.is_(None))
+                .values(explanation=bindparam("text")),
+                [{"row_id": row.id, "text": texts[row.id]} for row in rows]
+            )
+            db.commit()
+
+        with self._lock:
+            self.stats["batches"] += 1
+            self.stats["stored"] += len(rows)
+            self.stats["last_batch_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        return len(rows)
+
+    def explain(self, rows: list) -> dict:
+        """{row id: text}, generating each distinct uncached signature once."""
+        signatures = {row.id: self.backend.signature(row) for row in rows}
+        distinct = list(dict.fromkeys(signatures.values()))
+
+        texts, missing = {}, []
+        for signature in distinct:
+            text = self._cache.get(signature)
+            if text is None:
+                missing.append(signature)
+            else:
+                self._cache.move_to_end(signature)
+                texts[signature] = text
+        if missing:
+            for signature, text in zip(missing, self.backend.render(missing)):
+                texts[signature] = text
+                self._cache[signature] = text
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        with self._lock:
+            self.stats["generated"] += len(missing)
+            self.stats["cache_hits"] += len(distinct) - len(missing)
+            self.stats["deduplicated"] += len(rows) - len(distinct)
+        return {row_id: texts[signature] for row_id, signature in signatures.items()}
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return dict(
+                self.stats,
+                backend=self.backend.name,
+                running=self._thread is not None and self._thread.is_alive(),
+                queued=self._queue.qsize(),
+                backlog=self._oldest_dropped is not None,
+                cached_signatures=len(self._cache)
+            )
+
+
+def worker_enabled() -> bool:
+    """The worker runs for any backend but the template (or when forced)."""
+    return configured_backend_name() != "template" or settings.EXPLANATION_WORKER_ENABLED
@@ -0,0 +1,307 @@
+"""
+Streaming export of a user's transaction history
+/api/transactions/{email}/export writes CSV, NDJSON or Parquet while it
+reads: the query runs with yield_per (a server-side cursor on PostgreSQL),
+each block of EXPORT_BATCH_ROWS predictions is encoded and sent before the
+next one is fetched, and nothing holds more than one block. Memory stays
+flat however many years are exported, and the first bytes leave as soon as
+the first block is read.
+
+Rows come out newest first: the live table, then archived months (with
+start_date/end_date), newest month first. Filters match the dashboard's
+(search text, prediction label, channel). Parquet is written one row group
+per block and needs pyarrow.
+"""
+
+import csv
+import io
+import threading
+from datetime import date, datetime, time
+from typing import Optional
+
+from sqlalchemy import or_, select
+
+from config import settings
+
+from utils.features import CHANNEL_NAMES, unpack_features
+from utils.hf_model import generate_explanation
+from utils.rules import mask_to_rules
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+    import json
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+PREDICTION_LABELS = ("fraud", "risky", "legitimate")
+
+# Columns read per prediction (plain rows: no ORM objects to build)
+_QUERY_COLUMNS = [
+    "id", "transaction_id", "customer_id", "timestamp", "risk_score", "is_fraud",
+    "transaction_amount", "account_age_days", "channel", "hour_of_day", "day_of_week",
+    "feature_flags", "model_probability", "rule_score", "rule_mask", "derived_features", "explanation"
+]
+
+EXPORT_COLUMNS = [
+    "prediction_id", "transaction_id", "customer_id", "timestamp", "transaction_amount",
+    "kyc_verified", "account_age_days", "channel", "risk_score", "model_risk_score",
+    "rule_score", "is_fraud", "prediction", "rules_triggered", "explanation"
+]
+
+# Limits concurrent exports (each holds a connection for its whole duration)
+_slots = threading.BoundedSemaphore(settings.EXPORT_MAX_CONCURRENT)
+
+
+def acquire_slot() -> bool:
+    return _slots.acquire(blocking=False)
+
+
+def release_slot() -> None:
+    _slots.release()
+
+
+def prediction_label(is_fraud: int, risk_score: float) -> str:
+    """Dashboard label: Fraud, Risky (score > 0.5) or Legitimate."""
+    if is_fraud == 1:
+        return "Fraud"
+    return "Risky" if risk_score > 0.5 else "Legitimate"
+
+
+def channel_code(channel: Optional[str]) -> Optional[int]:
+    """Channel filter (code or name, as the dashboard shows it) -> code. Raises ValueError."""
+    if channel is None:
+        return None
+    if channel.isdigit() and int(channel) in CHANNEL_NAMES:
+        return int(channel)
+    for code, name in CHANNEL_NAMES.items():
+        if name.lower() == channel.lower():
+            return code
+    raise ValueError(f"Unknown channel: {channel}")
+
+
+def export_query(email: str, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                 search: Optional[str] = None, prediction: Optional[str] = None,
+                 channel: Optional[int] = None):
+    """SELECT of one user's predictions, newest first, with the dashboard filters."""
+    from models import Prediction
+
+    query = select(*(getattr(Prediction, column) for column in _QUERY_COLUMNS)).where(Prediction.email == email)
+    if start is not None:
+        query = query.where(Prediction.timestamp >= start)
+    if end is not None:
+        query = query.where(Prediction.timestamp < end)
+    if search:
+        query = query.where(or_(Prediction.transaction_id.icontains(search, autoescape=True),
+                                Prediction.customer_id.icontains(search, autoescape=True)))
+    if prediction == "fraud":
+        query = query.where(Prediction.is_fraud == 1)
+    elif prediction == "risky":
+        query = query.where(Prediction.is_fraud != 1, Prediction.risk_score > 0.5)
+    elif prediction == "legitimate":
+        query = query.where(Prediction.is_fraud != 1, Prediction.risk_score <= 0.5)
+    if channel is not None:
+        query = query.where(Prediction.channel == channel)
+    return query.order_by(Prediction.timestamp.desc(), Prediction.id.desc())
+
+
+def _channel(row) -> int:
+    if row.feature_flags is not None:
+        return row.channel
+    return (row.derived_features or {}).get("channel_encoded")
+
+
+def _matches(row, search: Optional[str], prediction: Optional[str], channel: Optional[int]) -> bool:
+    """The export_query filters, for archived rows (start/end are applied on read)."""
+    if search and search.lower() not in row.transaction_id.lower() \
+            and search.lower() not in row.customer_id.lower():
+        return False
+    if prediction and prediction_label(row.is_fraud, row.risk_score).lower() != prediction:
+        return False
+    return channel is None or _channel(row) == channel
+
+
+def export_records(block, explanations: bool = True) -> list:
+    """
+    EXPORT_COLUMNS records for a block of rows (query rows or archived
+    Prediction objects); timestamp stays a datetime, rules_triggered a list.
+    Same values as Prediction.features / explanation_text, with each rule
+    mask decoded once per block.
+    """
+    records = []
+    decoded = {}
+    for row in block:
+        if row.feature_flags is None:
+            # Written before migrations/001: the JSON holds features and rules
+            features = row.derived_features or {}
+            rule_flags = features.get("rule_flags", [])
+            amount, age = features.get("transaction_amount"), features.get("account_age_days")
+            kyc, channel = features.get("kyc_verified"), features.get("channel_encoded")
+            explanation = row.explanation
+        else:
+            mask = row.rule_mask or 0
+            rule_flags = decoded.get(mask)
+            if rule_flags is None:
+                rule_flags = decoded[mask] = mask_to_rules(mask)
+            amount, age, channel = row.transaction_amount, row.account_age_days, row.channel
+            kyc = row.feature_flags & 1  # bit 0 of BINARY_FEATURES
+            explanation = row.explanation
+            if explanation is None and explanations:
+                features = unpack_features(row.feature_flags, amount, age, channel,
+                                           row.hour_of_day, row.day_of_week)
+                features["rule_flags"] = rule_flags
+                explanation = generate_explanation({}, features, row.risk_score, row.rule_score or 0.0, rule_flags)
+        records.append({
+            "prediction_id": row.id,
+            "transaction_id": row.transaction_id,
+            "customer_id": row.customer_id,
+            "timestamp": row.timestamp,
+            "transaction_amount": amount,
+            "kyc_verified": kyc,
+            "account_age_days": age,
+            "channel": CHANNEL_NAMES.get(channel, "Unknown"),
+            "risk_score": row.risk_score,
+            "model_risk_score": row.model_probability,
+            "rule_score": row.rule_score,
+            "is_fraud": row.is_fraud,
+            "prediction": prediction_label(row.is_fraud, row.risk_score),
+            "rules_triggered": list(rule_flags),
+            "explanation": explanation if explanations else None
+        })
+    return records
+
+
+def iter_predictions(session_factory, email: str, start: Optional[datetime] = None,
+                     end: Optional[datetime] = None, search: Optional[str] = None,
+                     prediction: Optional[str] = None, channel: Optional[int] = None,
+                     include_archive: bool = False, batch_rows: int = None):
+    """Blocks of prediction rows, read through yield_per (then archived months)."""
+    batch_rows = batch_rows or settings.EXPORT_BATCH_ROWS
+    db = session_factory()
+    try:
+        result = db.execute(
+            export_query(email, start, end, search, prediction, channel)
+            .execution_options(yield_per=batch_rows)
+        )
+        yield from result.partitions()
+    finally:
+        db.close()
+
+    if include_archive:
+        from utils.partitions import ARCHIVE_NAME, add_months, archived_months, archived_predictions
+
+        # One archived month at a time, newest first
+        for path in reversed(archived_months(start, end)):
+            match = ARCHIVE_NAME.match(path.name)
+            month = date(int(match[1]), int(match[2]), 1)
+            month_begin = datetime.combine(month, time.min)
+            month_end = datetime.combine(add_months(month, 1), time.min)
+            rows = archived_predictions(max(start or month_begin, month_begin),
+                                        min(end or month_end, month_end), email=email)
+            rows = [row for row in rows if _matches(row, search, prediction, channel)]
+            rows.sort(key=lambda row: (row.timestamp, row.id), reverse=True)
+            for i in range(0, len(rows), batch_rows):
+                yield rows[i:i + batch_rows]
+
+
+# ------------------ ENCODERS ------------------
+def _csv_block(records: list, header: bool) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    for record in records:
+        record["timestamp"] = record["timestamp"].isoformat()
+        record["rules_triggered"] = "; ".join(record["rules_triggered"])
+        writer.writerow([record[column] for column in EXPORT_COLUMNS])
+    return buffer.getvalue().encode("utf-8")
+
+
+def _ndjson_block(records: list) -> bytes:
+    if orjson is not None:
+        return b"".join(orjson.dumps(record) + b"\n" for record in records)
+    return "".join(
+        json.dumps(record, separators=(",", ":"), default=datetime.isoformat) + "\n" for record in records
+    ).encode()
+
+
+def _arrow_schema():
+    return pa.schema([
+        ("prediction_id", pa.int64()), ("transaction_id", pa.string()), ("customer_id", pa.string()),
+        ("timestamp", pa.timestamp("us")), ("transaction_amount", pa.float64()), ("kyc_verified", pa.int8()),
+        ("account_age_days", pa.int64()), ("channel", pa.string()), ("risk_score", pa.float64()),
+        ("model_risk_score", pa.float64()), ("rule_score", pa.float64()), ("is_fraud", pa.int8()),
+        ("prediction", pa.string()), ("rules_triggered", pa.list_(pa.string())), ("explanation", pa.string())
+    ])
+
+
+class _DrainableSink:
+    """Write-only file for ParquetWriter whose bytes are taken out after each row group."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def parquet_available() -> bool:
+    return pa is not None
+
+
+def stream_export(blocks, format: str, explanations: bool = True, on_close=None):
+    """Encoded chunks (one per block of predictions) in the requested format."""
+    try:
+        if format == "parquet":
+            schema = _arrow_schema()
+            sink = _DrainableSink()
+            writer = pq.ParquetWriter(sink, schema, compression="zstd")
+            for block in blocks:
+                records = export_records(block, explanations)
+                writer.write_table(pa.Table.from_pylist(records, schema=schema))
+                yield sink.drain()
+            writer.close()
+            yield sink.drain()
+            return
+
+        header = True
+        if format == "csv":
+            # Empty exports still get the header row
+            yield _csv_block([], header=True)
+            header = False
+        for block in blocks:
+            records = export_records(block, explanations)
+            yield _csv_block(records, header) if format == "csv" else _ndjson_block(records)
+    finally:
+        blocks.close()  # ends the cursor and returns the connection if the client left early
+        if on_close is not None:
+            on_close()
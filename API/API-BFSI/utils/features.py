@@ -1,18 +1,28 @@
-from datetime import datetime
+from datetime import date, datetime
+import numpy as np
 import pandas as pd
-import holidays  # 🇮🇳 Indian holidays library
+
+from utils.calendar_table import get_calendar, WEEKDAY_MASK, WEEKEND, NATIONAL_HOLIDAY
+
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+# datetime64[D] counts days from 1970-01-01; adding this gives date.toordinal()
+_UNIX_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
 
 def derive_features_auto(input_data: dict) -> pd.DataFrame:
     """
     Automatically derives all 13 model features from minimal input.
     Detects Indian national holidays automatically.
     """
-    txn_dt = datetime.strptime(input_data['transaction_datetime'], "%Y-%m-%d %H:%M:%S")
+    txn_dt = datetime.strptime(input_data['transaction_datetime'], DATETIME_FORMAT)
+
+    # Weekday, weekend and 🇮🇳 holiday flags from the precomputed calendar
+    calendar_flags = get_calendar().flags(txn_dt.toordinal())
 
     hour_of_day = txn_dt.hour
-    day_of_week = txn_dt.weekday()
+    day_of_week = calendar_flags & WEEKDAY_MASK
     is_night_txn = 1 if hour_of_day >= 22 or hour_of_day < 6 else 0
-    is_weekend_txn = 1 if day_of_week >= 5 else 0
+    is_weekend_txn = 1 if calendar_flags & WEEKEND else 0
 
     # High amount and combined conditions
     is_high_amount_transaction = 1 if input_data['transaction_amount'] > 50000 else 0
@@ -21,9 +31,7 @@ def derive_features_auto(input_data: dict) -> pd.DataFrame:
     # Low KYC + low age risky transactions
     kyc_low_age_txn = 1 if (input_data['kyc_verified'] == 0 and input_data['account_age_days'] < 30) else 0
 
-    # 🇮🇳 Detect if date is an Indian holiday
-    india_holidays = holidays.India(years=txn_dt.year)
-    is_holiday_txn = 1 if txn_dt.date() in india_holidays else 0
+    is_holiday_txn = 1 if calendar_flags & NATIONAL_HOLIDAY else 0
 
     features = {
         'kyc_verified': input_data['kyc_verified'],
@@ -41,3 +49,106 @@ def derive_features_auto(input_data: dict) -> pd.DataFrame:
     }
 
     return pd.DataFrame([features])
+
+
+def derive_features_batch(transactions) -> pd.DataFrame:
+    """
+    Vectorized derive_features_auto for many transactions.
+    Accepts a list of input dicts or a DataFrame with the same fields
+    (transaction_datetime as strings or already parsed) and returns one row
+    per transaction, columns in FEATURE_NAMES order.
+    """
+    frame = transactions if isinstance(transactions, pd.DataFrame) else pd.DataFrame(transactions)
+    txn_dt = frame['transaction_datetime']
+    if not pd.api.types.is_datetime64_any_dtype(txn_dt):
+        txn_dt = pd.to_datetime(txn_dt, format=DATETIME_FORMAT)
+
+    # Day ordinals (date.toordinal()) -> calendar bytes
+    ordinals = txn_dt.values.astype('datetime64[D]').astype(np.int64) + _UNIX_EPOCH_ORDINAL
+    calendar_flags = get_calendar().flags_batch(ordinals)
+
+    amount = frame['transaction_amount'].to_numpy(dtype=np.float64)
+    kyc = frame['kyc_verified'].to_numpy(dtype=np.int64)
+    age = frame['account_age_days'].to_numpy(dtype=np.int64)
+    hour = txn_dt.dt.hour.to_numpy(dtype=np.int64)
+
+    is_night = ((hour >= 22) | (hour < 6)).astype(np.int64)
+    is_high_amount = (amount > 50000).astype(np.int64)
+
+    return pd.DataFrame({
+        'kyc_verified': kyc,
+        'account_age_days': age,
+        'transaction_amount': amount,
+        'channel_encoded': frame['channel_encoded'].to_numpy(dtype=np.int64),
+        'hour_of_day': hour,
+        'day_of_week': (calendar_flags & WEEKDAY_MASK).astype(np.int64),
+        'is_night_txn': is_night,
+        'is_high_amount_transaction': is_high_amount,
+        'high_amount_night_txn': is_high_amount & is_night,
+        'kyc_low_age_txn': ((kyc == 0) & (age < 30)).astype(np.int64),
+        'is_weekend_txn': (calendar_flags & WEEKEND > 0).astype(np.int64),
+        'is_holiday_txn': (calendar_flags & NATIONAL_HOLIDAY > 0).astype(np.int64)
+    }, index=frame.index)
+
+
+# Column order of the feature dict returned by derive_features_auto
+FEATURE_NAMES = [
+    'kyc_verified',
+    'account_age_days',
+    'transaction_amount',
+    'channel_encoded',
+    'hour_of_day',
+    'day_of_week',
+    'is_night_txn',
+    'is_high_amount_transaction',
+    'high_amount_night_txn',
+    'kyc_low_age_txn',
+    'is_weekend_txn',
+    'is_holiday_txn'
+]
+
+# channel_encoded values as shown on the dashboards
+CHANNEL_NAMES = {0: "Online", 1: "ATM", 2: "POS", 3: "Mobile"}
+
+# Binary features stored as one bitmask (bit i = BINARY_FEATURES[i])
+BINARY_FEATURES = [
+    'kyc_verified',
+    'is_night_txn',
+    'is_high_amount_transaction',
+    'high_amount_night_txn',
+    'kyc_low_age_txn',
+    'is_weekend_txn',
+    'is_holiday_txn'
+]
+
+
+def pack_feature_flags(features: dict) -> int:
+    """Pack the binary features into an integer bitmask."""
+    flags = 0
+    for bit, name in enumerate(BINARY_FEATURES):
+        if features.get(name, 0):
+            flags |= 1 << bit
+    return flags
+
+
+def pack_feature_flags_batch(features: pd.DataFrame) -> np.ndarray:
+    """Vectorized pack_feature_flags over a feature DataFrame."""
+    flags = np.zeros(len(features), dtype=np.int64)
+    for bit, name in enumerate(BINARY_FEATURES):
+        flags |= (features[name].to_numpy() != 0).astype(np.int64) << bit
+    return flags
+
+
+def unpack_features(feature_flags: int, transaction_amount: float, account_age_days: int,
+                    channel_encoded: int, hour_of_day: int, day_of_week: int) -> dict:
+    """Rebuild the derive_features_auto dict from typed columns and the bitmask."""
+    values = {
+        'account_age_days': account_age_days,
+        'transaction_amount': transaction_amount,
+        'channel_encoded': channel_encoded,
+        'hour_of_day': hour_of_day,
+        'day_of_week': day_of_week,
+    }
+    for bit, name in enumerate(BINARY_FEATURES):
+        values[name] = (feature_flags >> bit) & 1
+    return {name: values[name] for name in FEATURE_NAMES}
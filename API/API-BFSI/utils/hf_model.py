@@ -120,63 +120,5 @@ def generate_explanation_simple(risk_score: float, is_fraud: int,
     return explanation
 
 
-# Optional: Advanced HuggingFace model integration
-# Uncomment and modify if you want to use actual LLM generation
-
-"""
-from transformers import pipeline
-import logging
-
-try:
-    # Load a small generative model
-    generator = pipeline(
-        "text-generation",
-        model="distilgpt2",
-        max_new_tokens=150,
-        temperature=0.7
-    )
-    HF_MODEL_AVAILABLE = True
-    logging.info("✅ HuggingFace model loaded successfully")
-except Exception as e:
-    HF_MODEL_AVAILABLE = False
-    logging.warning(f"⚠️ HuggingFace model not available: {e}")
-    generator = None
-
-
-def generate_explanation_with_llm(transaction_data: dict, derived_features: dict,
-                                  risk_score: float, rule_score: float,
-                                  rules_triggered: list) -> str:
-    '''
-    Generate explanation using LLM (if available)
-    '''
-    if not HF_MODEL_AVAILABLE or generator is None:
-        return generate_explanation(transaction_data, derived_features, 
-                                   risk_score, rule_score, rules_triggered)
-    
-    try:
-        prompt = f'''
-        Fraud Detection Analysis:
-        - Risk Score: {risk_score:.2%}
-        - Amount: ₹{derived_features.get("transaction_amount", 0):,.2f}
-        - KYC Verified: {"Yes" if derived_features.get("kyc_verified") == 1 else "No"}
-        - Account Age: {derived_features.get("account_age_days", 0)} days
-        - Rules Triggered: {", ".join(rules_triggered) if rules_triggered else "None"}
-        
-        Explain why this transaction is {"fraudulent" if risk_score >= 0.6 else "legitimate"}:
-        '''
-        
-        result = generator(prompt, max_new_tokens=150, do_sample=True)[0]["generated_text"]
-        
-        # Extract only the generated part (after the prompt)
-        if prompt in result:
-            explanation = result.split(prompt)[-1].strip()
-        else:
-            explanation = result.strip()
-        
-        return explanation
-        
-    except Exception as e:
-        logging.error(f"LLM generation failed: {e}")
-        return generate_explanation(transaction_data, derived_features,
-                                   risk_score, rule_score, rules_triggered)
-"""
\ No newline at end of file
+# LLM explanations: see HFBackend in utils/explanations.py, which runs them
+# off the request path (EXPLANATION_BACKEND="hf" or ENABLE_HF_EXPLANATIONS)
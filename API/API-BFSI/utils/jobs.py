@@ -0,0 +1,526 @@
+"""
+Background batch-scoring jobs
+A job scores a CSV or Parquet file (an upload, or a file under
+JOBS_LOCAL_ROOT) in chunks of JOB_CHUNK_ROWS rows:
+
+  * chunks are validated and scored in a process pool (JOB_WORKERS
+    processes, each loading the model once) with utils/scoring.py
+  * the API process stores each chunk's predictions in one transaction,
+    writes the chunk's results to chunks/NNNNN.parquet, then updates
+    manifest.json - the chunk file is the checkpoint
+  * queued/running jobs resume after their last checkpoint on startup, and
+    a job whose pool process dies is retried on a fresh pool. Before a
+    chunk commits, the transaction ids it inserts are written to
+    chunks/NNNNN.pending.json; if the run stops before the chunk file is
+    written, the resumed chunk links those rows to their stored prediction
+    id. Any other stored id (an earlier chunk, another job or endpoint) is
+    reported as "transaction_id already exists"
+
+Layout: JOBS_DIR/<job_id>/{manifest.json, input.csv|.parquet, chunks/, results.parquet}
+"""
+
+import asyncio
+import json
+import multiprocessing
+import os
+import threading
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import settings
+from utils.scoring import (
+    COLUMNS, compact_rows, insert_predictions, known_transaction_ids, load_model,
+    rules_for_masks, score_frame, validate_columns
+)
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Windows: no cross-worker job lock
+
+REQUIRED_COLUMNS = [name for name in COLUMNS if name != "transaction_id"]
+RESULT_COLUMNS = [
+    "row", "transaction_id", "customer_id", "transaction_datetime", "transaction_amount",
+    "kyc_verified", "account_age_days", "channel_encoded", "prediction_id", "risk_score",
+    "is_fraud", "model_risk_score", "rule_score", "rules_triggered", "status", "error_message"
+]
+TERMINAL_STATUSES = ("completed", "failed")
+MAX_POOL_RESTARTS = 2
+
+
+# ------------------ FILES ------------------
+def job_dir(job_id: str) -> Path:
+    return Path(settings.JOBS_DIR) / job_id
+
+
+def chunk_path(job_id: str, chunk_index: int) -> Path:
+    return job_dir(job_id) / "chunks" / f"{chunk_index:05d}.parquet"
+
+
+def pending_path(job_id: str, chunk_index: int) -> Path:
+    """Transaction ids a chunk is committing, until its chunk file exists."""
+    return job_dir(job_id) / "chunks" / f"{chunk_index:05d}.pending.json"
+
+
+def results_path(job_id: str) -> Path:
+    return job_dir(job_id) / "results.parquet"
+
+
+def _write_atomic(path: Path, write) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def read_manifest(job_id: str) -> Optional[dict]:
+    path = job_dir(job_id) / "manifest.json"
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def write_manifest(manifest: dict) -> None:
+    manifest["updated_at"] = datetime.utcnow().isoformat()
+    _write_atomic(job_dir(manifest["job_id"]) / "manifest.json",
+                  lambda tmp: tmp.write_text(json.dumps(manifest, indent=2)))
+
+
+def done_chunks(job_id: str) -> list:
+    return sorted(int(path.stem) for path in (job_dir(job_id) / "chunks").glob("*.parquet"))
+
+
+# ------------------ INPUT ------------------
+def input_format(path: Path) -> str:
+    suffix = Path(path).suffix.lower()
+    if suffix not in (".csv", ".parquet"):
+        raise ValueError("Only .csv and .parquet files are supported")
+    return suffix[1:]
+
+
+def input_columns(path: Path) -> list:
+    if input_format(path) == "parquet":
+        import pyarrow.parquet as pq
+        return pq.read_schema(path).names
+    return pd.read_csv(path, nrows=0).columns.str.strip().tolist()
+
+
+def count_rows(path: Path) -> int:
+    if input_format(path) == "parquet":
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(path).metadata.num_rows
+    return sum(len(chunk) for chunk in pd.read_csv(path, usecols=[0], chunksize=100_000))
+
+
+def iter_chunks(path: Path, chunk_rows: int):
+    """(chunk index, DataFrame) over the input file."""
+    if input_format(path) == "parquet":
+        import pyarrow.parquet as pq
+        batches = pq.ParquetFile(path).iter_batches(batch_size=chunk_rows)
+        for chunk_index, batch in enumerate(batches):
+            yield chunk_index, batch.to_pandas()
+    else:
+        id_columns = {"customer_id": str, "transaction_id": str, "transaction_datetime": str}
+        reader = pd.read_csv(path, chunksize=chunk_rows, dtype=id_columns, skipinitialspace=True)
+        for chunk_index, chunk in enumerate(reader):
+            chunk.columns = chunk.columns.str.strip()
+            yield chunk_index, chunk
+
+
+# ------------------ WORKER PROCESS ------------------
+_worker_model = None
+
+
+def _init_worker() -> None:
+    global _worker_model
+    _worker_model = load_model()
+
+
+def _text(values: pd.Series) -> list:
+    return values.fillna("").astype(str).str.strip().tolist()
+
+
+def _integers(values: pd.Series) -> np.ndarray:
+    # Missing or non-integer values become -1, which fails the range checks
+    numbers = pd.to_numeric(values, errors="coerce")
+    whole = numbers.notna() & (numbers == numbers.round())
+    return np.where(whole, numbers, -1).astype(np.int64)
+
+
+def score_chunk(job_id: str, email: str, chunk_index: int, first_row: int,
+                chunk: pd.DataFrame) -> dict:
+    """Validate and score one chunk (runs in a pool process)."""
+    rows = np.arange(first_row, first_row + len(chunk))
+    if "transaction_id" in chunk:
+        transaction_ids = _text(chunk["transaction_id"])
+    else:
+        transaction_ids = [f"{job_id[:12]}-{row}" for row in rows]
+
+    batch = SimpleNamespace(
+        customer_id=_text(chunk["customer_id"]),
+        transaction_id=transaction_ids,
+        transaction_datetime=_text(chunk["transaction_datetime"]),
+        transaction_amount=pd.to_numeric(chunk["transaction_amount"], errors="coerce").to_numpy(np.float64),
+        kyc_verified=_integers(chunk["kyc_verified"]),
+        account_age_days=_integers(chunk["account_age_days"]),
+        channel_encoded=_integers(chunk["channel_encoded"])
+    )
+    frame, errors = validate_columns(batch)
+
+    results = pd.DataFrame({
+        "row": rows,
+        "transaction_id": batch.transaction_id,
+        "customer_id": batch.customer_id,
+        "transaction_datetime": batch.transaction_datetime,
+        "transaction_amount": batch.transaction_amount,
+        "kyc_verified": batch.kyc_verified,
+        "account_age_days": batch.account_age_days,
+        "channel_encoded": batch.channel_encoded,
+        "prediction_id": pd.array([None] * len(rows), dtype="Int64"),
+        "risk_score": np.nan,
+        "is_fraud": pd.array([None] * len(rows), dtype="Int64"),
+        "model_risk_score": np.nan,
+        "rule_score": np.nan,
+        "rules_triggered": "",
+        "status": "error",
+        "error_message": pd.Series([errors.get(i) for i in range(len(rows))], dtype=object)
+    })
+
+    insert_rows = []
+    if len(frame):
+        scored = score_frame(_worker_model, frame)
+        position = frame.index.to_numpy()
+        results.loc[position, "risk_score"] = scored["risk_score"].to_numpy()
+        results.loc[position, "is_fraud"] = scored["is_fraud"].to_numpy()
+        results.loc[position, "model_risk_score"] = scored["model_probability"].round(4).to_numpy()
+        results.loc[position, "rule_score"] = scored["rule_score"].round(2).to_numpy()
+        results.loc[position, "rules_triggered"] = [
+            "; ".join(flags) for flags in rules_for_masks(scored["rule_mask"].tolist())
+        ]
+        results.loc[position, "status"] = "success"
+        insert_rows = compact_rows(frame, scored, email)
+        for row, index in zip(insert_rows, position):
+            row["_position"] = int(index)
+
+    return {"chunk_index": chunk_index, "results": results, "rows": insert_rows}
+
+
+# ------------------ JOB MANAGER ------------------
+class JobManager:
+    """Creates jobs, runs them on a shared process pool and resumes them."""
+
+    def __init__(self, session_factory, on_commit: Callable = None):
+        self.session_factory = session_factory
+        self.on_commit = on_commit  # (rows, prediction_ids, timestamp) after each chunk
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._running = {}
+
+    # ---------- creation ----------
+    def create(self, email: str, source: Path, filename: str, stored_input: bool) -> dict:
+        """Register a job for `source` (already in place) and start it."""
+        job_id = source.parent.name if stored_input else uuid.uuid4().hex
+        (job_dir(job_id) / "chunks").mkdir(parents=True, exist_ok=True)
+        manifest = {
+            "job_id": job_id,
+            "email": email,
+            "filename": filename,
+            "source": str(source),
+            "format": input_format(source),
+            "status": "queued",
+            "chunk_rows": settings.JOB_CHUNK_ROWS,
+            "total_rows": count_rows(source),
+            "total_chunks": 0,
+            "chunks_done": 0,
+            "rows_done": 0,
+            "successful": 0,
+            "failed": 0,
+            "fraud_detected": 0,
+            "error": None,
+            "created_at": datetime.utcnow().isoformat(),
+            "finished_at": None
+        }
+        manifest["total_chunks"] = -(-manifest["total_rows"] // manifest["chunk_rows"])
+        write_manifest(manifest)
+        self.start(job_id)
+        return manifest
+
+    @staticmethod
+    def new_upload_dir() -> Path:
+        path = job_dir(uuid.uuid4().hex)
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    # ---------- running ----------
+    def start(self, job_id: str) -> None:
+        thread = self._running.get(job_id)
+        if thread is not None and thread.is_alive():
+            return
+        thread = threading.Thread(target=self._run, args=(job_id,), name=f"job-{job_id[:8]}", daemon=True)
+        self._running[job_id] = thread
+        thread.start()
+
+    def resume_pending(self) -> list:
+        """Restart every job that was queued or running when the process stopped."""
+        root = Path(settings.JOBS_DIR)
+        resumed = []
+        for manifest_file in root.glob("*/manifest.json") if root.exists() else []:
+            manifest = json.loads(manifest_file.read_text())
+            if manifest["status"] not in TERMINAL_STATUSES:
+                self.start(manifest["job_id"])
+                resumed.append(manifest["job_id"])
+        return resumed
+
+    def shutdown(self) -> None:
+        # Unfinished jobs stay queued/running on disk and resume on the next start
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True, cancel_futures=True)
+                self._pool = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=settings.JOB_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker
+                )
+            return self._pool
+
+    def _reset_pool(self, broken: ProcessPoolExecutor) -> None:
+        with self._pool_lock:
+            if self._pool is broken:
+                self._pool = None
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job_id: str) -> None:
+        lock = _acquire_lock(job_id)
+        if lock is False:
+            return  # another API worker owns this job
+        try:
+            for attempt in range(MAX_POOL_RESTARTS + 1):
+                pool = self._get_pool()
+                try:
+                    self._process(job_id, pool)
+                    return
+                except BrokenProcessPool:
+                    # A pool process died: resume from the last checkpoint on a fresh pool
+                    self._reset_pool(pool)
+                    if attempt == MAX_POOL_RESTARTS:
+                        raise
+        except Exception as e:
+            manifest = read_manifest(job_id)
+            manifest.update(status="failed", error=str(e) or type(e).__name__,
+                            finished_at=datetime.utcnow().isoformat())
+            write_manifest(manifest)
+            print(f"❌ Job {job_id} failed: {e}")
+        finally:
+            if lock is not None:
+                lock.close()
+
+    def _process(self, job_id: str, pool: ProcessPoolExecutor) -> None:
+        manifest = read_manifest(job_id)
+        done = set(done_chunks(job_id))
+        _recount(manifest, done)
+        manifest["status"] = "running"
+        write_manifest(manifest)
+
+        email = manifest["email"]
+        chunk_rows = manifest["chunk_rows"]
+        window = deque()
+        for chunk_index, chunk in iter_chunks(Path(manifest["source"]), chunk_rows):
+            if chunk_index in done:
+                continue
+            missing = [name for name in REQUIRED_COLUMNS if name not in chunk]
+            if missing:
+                raise ValueError(f"Missing required columns: {', '.join(missing)}")
+            window.append(pool.submit(score_chunk, job_id, email, chunk_index,
+                                      chunk_index * chunk_rows, chunk))
+            # Keep every pool process busy, but commit chunks in order
+            while len(window) >= settings.JOB_WORKERS * 2:
+                self._checkpoint(manifest, window.popleft().result())
+        while window:
+            self._checkpoint(manifest, window.popleft().result())
+
+        merge_results(job_id)
+        manifest.update(status="completed", finished_at=datetime.utcnow().isoformat())
+        write_manifest(manifest)
+        print(f"✅ Job {job_id}: {manifest['successful']} scored, {manifest['failed']} failed")
+
+    def _checkpoint(self, manifest: dict, scored: dict) -> None:
+        """Store one scored chunk, then write its results file and the manifest."""
+        results, rows = scored["results"], scored["rows"]
+        job_id, chunk_index = manifest["job_id"], scored["chunk_index"]
+        committed, prediction_ids, timestamp = [], [], datetime.utcnow()
+
+        # Ids this chunk committed in an interrupted run (its chunk file was never written)
+        pending_file = pending_path(job_id, chunk_index)
+        resumed = set(json.loads(pending_file.read_text())) if pending_file.exists() else set()
+
+        with self.session_factory() as db:
+            known = known_transaction_ids(db, [row["transaction_id"] for row in rows])
+            new_rows = []
+            for row in rows:
+                stored = known.get(row["transaction_id"])
+                if stored is None:
+                    new_rows.append(row)
+                elif row["transaction_id"] in resumed and stored[1] == manifest["email"]:
+                    results.at[row["_position"], "prediction_id"] = stored[0]
+                else:
+                    # An earlier chunk, another job or another endpoint stored it
+                    results.at[row["_position"], "status"] = "error"
+                    results.at[row["_position"], "error_message"] = "transaction_id already exists"
+            if new_rows:
+                _write_atomic(pending_file, lambda tmp: tmp.write_text(
+                    json.dumps([row["transaction_id"] for row in new_rows])
+                ))
+                positions = [row.pop("_position") for row in new_rows]
+                prediction_ids = insert_predictions(db, new_rows, timestamp)
+                db.commit()
+                results.loc[positions, "prediction_id"] = prediction_ids
+                committed = new_rows
+
+        if committed and self.on_commit is not None:
+            self.on_commit(committed, prediction_ids, timestamp)
+
+        _write_atomic(chunk_path(job_id, chunk_index),
+                      lambda tmp: results.to_parquet(tmp, index=False))
+        pending_file.unlink(missing_ok=True)
+        _add_counts(manifest, results)
+        manifest["chunks_done"] += 1
+        write_manifest(manifest)
+
+
+def _acquire_lock(job_id: str):
+    """Exclusive per-job lock file (None where locking is unavailable, False if taken)."""
+    if fcntl is None:
+        return None
+    handle = open(job_dir(job_id) / "lock", "w")
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return False
+    return handle
+
+
+def _add_counts(manifest: dict, results: pd.DataFrame) -> None:
+    success = results["status"] == "success"
+    manifest["rows_done"] += len(results)
+    manifest["successful"] += int(success.sum())
+    manifest["failed"] += int((~success).sum())
+    manifest["fraud_detected"] += int((results["is_fraud"][success] == 1).sum())
+
+
+def _recount(manifest: dict, done: set) -> None:
+    """Progress from the checkpoint files (the manifest may lag by one chunk)."""
+    manifest.update(chunks_done=len(done), rows_done=0, successful=0, failed=0, fraud_detected=0)
+    for chunk_index in done:
+        results = pd.read_parquet(chunk_path(manifest["job_id"], chunk_index), columns=["status", "is_fraud"])
+        _add_counts(manifest, results)
+
+
+# ------------------ RESULTS ------------------
+def iter_results(job_id: str):
+    """Result DataFrames of the checkpointed chunks, in input order."""
+    for chunk_index in done_chunks(job_id):
+        yield pd.read_parquet(chunk_path(job_id, chunk_index))
+
+
+def merge_results(job_id: str) -> Path:
+    """Concatenate the chunk files into results.parquet."""
+    import pyarrow.parquet as pq
+
+    path = results_path(job_id)
+
+    def write(tmp):
+        writer = None
+        try:
+            for results in iter_results(job_id):
+                table = _result_table(results)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp, table.schema, compression="zstd")
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+            else:
+                pq.write_table(_result_table(pd.DataFrame(columns=RESULT_COLUMNS)), tmp)
+
+    _write_atomic(path, write)
+    return path
+
+
+def _result_table(results: pd.DataFrame):
+    import pyarrow as pa
+
+    schema = pa.schema([
+        ("row", pa.int64()), ("transaction_id", pa.string()), ("customer_id", pa.string()),
+        ("transaction_datetime", pa.string()), ("transaction_amount", pa.float64()),
+        ("kyc_verified", pa.int64()), ("account_age_days", pa.int64()),
+        ("channel_encoded", pa.int64()), ("prediction_id", pa.int64()),
+        ("risk_score", pa.float64()), ("is_fraud", pa.int64()),
+        ("model_risk_score", pa.float64()), ("rule_score", pa.float64()),
+        ("rules_triggered", pa.string()), ("status", pa.string()), ("error_message", pa.string())
+    ])
+    return pa.Table.from_pandas(results[RESULT_COLUMNS], schema=schema, preserve_index=False)
+
+
+def iter_results_csv(job_id: str):
+    """CSV bytes, one checkpointed chunk at a time (header once)."""
+    header = True
+    for results in iter_results(job_id):
+        yield results[RESULT_COLUMNS].to_csv(index=False, header=header).encode()
+        header = False
+    if header:
+        yield (",".join(RESULT_COLUMNS) + "\n").encode()
+
+
+# ------------------ PROGRESS ------------------
+def progress(manifest: dict) -> dict:
+    """Public view of a manifest."""
+    total = manifest["total_rows"]
+    return {
+        "job_id": manifest["job_id"],
+        "filename": manifest["filename"],
+        "status": manifest["status"],
+        "total_rows": total,
+        "rows_done": manifest["rows_done"],
+        "percent": round(manifest["rows_done"] / total * 100, 1) if total else 100.0,
+        "chunks_done": manifest["chunks_done"],
+        "total_chunks": manifest["total_chunks"],
+        "successful": manifest["successful"],
+        "failed": manifest["failed"],
+        "fraud_detected": manifest["fraud_detected"],
+        "error": manifest["error"],
+        "created_at": manifest["created_at"],
+        "updated_at": manifest["updated_at"],
+        "finished_at": manifest["finished_at"]
+    }
+
+
+async def progress_events(job_id: str, is_disconnected):
+    """SSE body: a `progress` event whenever the manifest changes, `done` at the end."""
+    last = None
+    yield b"retry: 3000\n\n"
+    while True:
+        manifest = await asyncio.to_thread(read_manifest, job_id)
+        if manifest["updated_at"] != last:
+            last = manifest["updated_at"]
+            event = "done" if manifest["status"] in TERMINAL_STATUSES else "progress"
+            data = json.dumps(progress(manifest), separators=(",", ":"))
+            yield f"event: {event}\ndata: {data}\n\n".encode()
+            if event == "done":
+                return
+        if await is_disconnected():
+            return
+        await asyncio.sleep(settings.JOB_PROGRESS_POLL_SECONDS)
@@ -0,0 +1,311 @@
+"""
+Live analytics push over Server-Sent Events
+One background tail per worker reads predictions written since the last
+tick (a single `id > cursor` query, whatever the number of open dashboards),
+coalesces them into one delta and fans the already-encoded event out to
+every subscriber.
+
+Events on /api/analytics/stream:
+  * delta        - KPI/bucket increments and newly flagged transactions
+                   (analytics page; patched onto the /api/analytics snapshot)
+  * transactions - new history rows for ?email=<user> (dashboard page)
+  * reset        - the client fell too far behind; refetch the snapshot
+
+Every event id is the highest prediction id it covers. Clients pass the
+`last_prediction_id` of their snapshot as ?since=, and EventSource sends
+Last-Event-ID on reconnect, so no prediction is missed or counted twice.
+
+Writers call notify() after committing; that only wakes the tail early.
+Predictions written by other workers are picked up on the next poll.
+"""
+
+import asyncio
+import json
+from collections import defaultdict
+from typing import Optional
+
+from sqlalchemy import func
+
+from config import settings
+from database import SessionLocal
+from models import Prediction
+from utils.features import CHANNEL_NAMES
+
+
+class _Subscriber:
+    __slots__ = ("queue", "email", "since")
+
+    def __init__(self, email: Optional[str], since: Optional[int]):
+        self.queue = asyncio.Queue(maxsize=settings.LIVE_STREAM_QUEUE_SIZE)
+        self.email = email
+        self.since = since
+
+
+def _encode(event: str, event_id: int, payload: dict) -> bytes:
+    data = json.dumps(payload, separators=(",", ":"), default=str)
+    return f"id: {event_id}\nevent: {event}\ndata: {data}\n\n".encode()
+
+
+def build_delta(rows: list) -> dict:
+    """Aggregate new predictions into the increments the analytics page applies."""
+    fraud = sum(1 for row in rows if row.is_fraud == 1)
+    months = defaultdict(lambda: {"total": 0, "fraud": 0})
+    channels = defaultdict(int)
+    flagged = []
+    amount = 0.0
+    for row in rows:
+        month = months[row.timestamp.strftime("%Y-%m")]
+        month["total"] += 1
+        if row.is_fraud == 1:
+            month["fraud"] += 1
+            amount += row.transaction_amount or 0
+            channels[CHANNEL_NAMES.get(row.channel or 0, "Unknown")] += 1
+            flagged.append({
+                "transaction_id": row.transaction_id,
+                "customer_id": row.customer_id,
+                "risk_score": row.risk_score,
+                "transaction_amount": row.transaction_amount or 0,
+                "timestamp": row.timestamp.isoformat()
+            })
+    return {
+        "from_id": rows[0].id,
+        "to_id": rows[-1].id,
+        "kpis": {
+            "total_transactions": len(rows),
+            "fraud_detected": fraud,
+            "amount_protected": round(amount, 2)
+        },
+        "fraud_vs_legitimate": {"fraud": fraud, "legitimate": len(rows) - fraud},
+        "months": dict(months),
+        "fraud_by_channel": dict(channels),
+        "amount_vs_risk_scatter": [
+            {"transaction_amount": row.transaction_amount or 0,
+             "risk_score": row.risk_score, "is_fraud": row.is_fraud}
+            for row in rows
+        ],
+        "flagged": flagged
+    }
+
+
+def history_item(pred: Prediction) -> dict:
+    """Same shape as an entry of /api/transactions/{email}."""
+    return {
+        "id": pred.id,
+        "customer_id": pred.customer_id,
+        "transaction_id": pred.transaction_id,
+        "risk_score": pred.risk_score,
+        "is_fraud": pred.is_fraud,
+        "derived_features": pred.features,
+        "explanation": pred.explanation_text,
+        "timestamp": pred.timestamp.isoformat()
+    }
+
+
+def _fetch_after(after_id: int, email: str = None, limit: int = None) -> list:
+    with SessionLocal() as db:
+        query = db.query(Prediction).filter(Prediction.id > after_id)
+        if email is not None:
+            query = query.filter(Prediction.email == email)
+        rows = query.order_by(Prediction.id).limit(limit or settings.LIVE_STREAM_BATCH_LIMIT).all()
+        db.expunge_all()
+        return rows
+
+
+def _fetch_ids(ids: list) -> list:
+    with SessionLocal() as db:
+        rows = db.query(Prediction).filter(Prediction.id.in_(ids)).all()
+        db.expunge_all()
+        return rows
+
+
+def _max_id() -> int:
+    with SessionLocal() as db:
+        return db.query(func.max(Prediction.id)).scalar() or 0
+
+
+class LiveAnalytics:
+    """
+    Per-worker prediction tail and SSE fan-out. Everything except notify()
+    runs on the event loop, so state is only touched between awaits.
+    """
+
+    def __init__(self):
+        self._subscribers = set()
+        self._start_lock = asyncio.Lock()
+        self._loop = None
+        self._wake = None
+        self._task = None
+        self._joining = 0  # subscribers still catching up
+        self._gaps = {}  # skipped ids -> loop time first seen
+        self.cursor = 0
+
+    # ---------- writer side (any thread) ----------
+    def notify(self) -> None:
+        """Wake the tail early; called after predictions are committed."""
+        loop, wake = self._loop, self._wake
+        if loop is None or wake is None:
+            return
+        try:
+            loop.call_soon_threadsafe(wake.set)
+        except RuntimeError:
+            pass  # event loop already closed
+
+    # ---------- subscriber side ----------
+    async def subscribe(self, email: str = None, since: int = None) -> _Subscriber:
+        self._joining += 1
+        try:
+            return await self._join(email, since)
+        finally:
+            self._joining -= 1
+
+    async def _join(self, email: str, since: int) -> _Subscriber:
+        async with self._start_lock:
+            if self._task is None or self._task.done():
+                self._loop = asyncio.get_running_loop()
+                self._wake = asyncio.Event()
+                self.cursor = await asyncio.to_thread(_max_id)
+                self._task = self._loop.create_task(self._run())
+
+        subscriber = _Subscriber(email, since)
+        if since is not None and since < self.cursor:
+            # Catch up on predictions between the client's snapshot and the
+            # tail; repeat if the tail moved on while we were querying
+            limit = settings.LIVE_STREAM_BATCH_LIMIT
+            rows, after = [], since
+            while after < self.cursor and len(rows) <= limit:
+                upto = self.cursor
+                batch = await asyncio.to_thread(_fetch_after, after, email, limit + 1)
+                rows.extend(row for row in batch if row.id <= upto)
+                after = upto
+            if len(rows) > limit:
+                subscriber.queue.put_nowait(_encode("reset", self.cursor, {"reason": "too far behind"}))
+            elif rows:
+                self._send(subscriber, self._event_for(subscriber, rows, self.cursor))
+            subscriber.since = None
+
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: _Subscriber) -> None:
+        self._subscribers.discard(subscriber)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def _event_for(self, subscriber: _Subscriber, rows: list, event_id: int) -> Optional[bytes]:
+        if subscriber.email is not None:
+            own = [history_item(row) for row in rows if row.email == subscriber.email]
+            return _encode("transactions", event_id, {"to_id": event_id, "transactions": own}) if own else None
+        return _encode("delta", event_id, build_delta(rows))
+
+    # ---------- background tail ----------
+    async def _run(self) -> None:
+        """Poll for new predictions while anyone is subscribed."""
+        idle_since = asyncio.get_running_loop().time()
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), settings.LIVE_STREAM_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+            if not self._subscribers and not self._joining:
+                self._task = None  # restarted (and cursor re-read) on next subscribe
+                self._gaps.clear()
+                return
+
+            rows = await asyncio.to_thread(_fetch_after, self.cursor)
+            rows = await self._with_late_commits(rows)
+            now = asyncio.get_running_loop().time()
+            subscribers = list(self._subscribers)
+            if rows:
+                self._publish(subscribers, rows)
+                self.cursor = max(self.cursor, rows[-1].id)
+                idle_since = now
+            elif now - idle_since >= settings.LIVE_STREAM_HEARTBEAT_SECONDS:
+                self._broadcast(subscribers, b": keepalive\n\n")
+                idle_since = now
+
+            # Coalesce bursts: at most one delta per tick
+            await asyncio.sleep(settings.LIVE_STREAM_TICK_SECONDS)
+
+    async def _with_late_commits(self, rows: list) -> list:
+        """
+        Ids are assigned at insert but become visible at commit, so a slow
+        transaction can surface below the cursor. Remember the ids skipped
+        by each batch and re-check them for LIVE_STREAM_GAP_SECONDS.
+        """
+        now = asyncio.get_running_loop().time()
+        late = []
+        if self._gaps:
+            late = await asyncio.to_thread(_fetch_ids, list(self._gaps))
+            for row in late:
+                self._gaps.pop(row.id, None)
+            for gap_id, seen in list(self._gaps.items()):
+                if now - seen > settings.LIVE_STREAM_GAP_SECONDS:
+                    del self._gaps[gap_id]  # rolled back or never committed
+
+        if rows:
+            seen_ids = {row.id for row in rows}
+            skipped = range(self.cursor + 1, rows[-1].id)
+            if len(skipped) - len(seen_ids) < settings.LIVE_STREAM_BATCH_LIMIT:
+                for gap_id in skipped:
+                    if gap_id not in seen_ids:
+                        self._gaps.setdefault(gap_id, now)
+        return sorted(late + rows, key=lambda row: row.id) if late else rows
+
+    def _publish(self, subscribers: list, rows: list) -> None:
+        to_id = rows[-1].id
+        shared = {}  # one encoding per audience, not per subscriber
+        for subscriber in subscribers:
+            if subscriber.since is not None:
+                if subscriber.since >= to_id:
+                    continue
+                if subscriber.since >= rows[0].id:
+                    # Snapshot taken mid-batch: only the part it has not seen
+                    event = self._event_for(subscriber, [r for r in rows if r.id > subscriber.since], to_id)
+                    subscriber.since = None
+                    self._send(subscriber, event)
+                    continue
+                subscriber.since = None
+
+            key = subscriber.email
+            if key not in shared:
+                shared[key] = self._event_for(subscriber, rows, to_id)
+            self._send(subscriber, shared[key])
+
+    def _broadcast(self, subscribers: list, message: bytes) -> None:
+        for subscriber in subscribers:
+            self._send(subscriber, message)
+
+    def _send(self, subscriber: _Subscriber, message: Optional[bytes]) -> None:
+        if message is None:
+            return
+        try:
+            subscriber.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Slow client: close its stream; it reconnects with Last-Event-ID
+            self.unsubscribe(subscriber)
+            subscriber.queue = None
+
+    async def stream(self, subscriber: _Subscriber, is_disconnected):
+        """Async generator body for the StreamingResponse."""
+        try:
+            yield b"retry: 3000\n\n"
+            while True:
+                queue = subscriber.queue
+                if queue is None:
+                    return
+                try:
+                    message = await asyncio.wait_for(queue.get(), settings.LIVE_STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await is_disconnected():
+                        return
+                    continue
+                yield message
+        finally:
+            self.unsubscribe(subscriber)
+
+
+live_analytics = LiveAnalytics()
@@ -0,0 +1,381 @@
+"""
+Monthly range partitions and Parquet archival for the predictions table
+On PostgreSQL, after migrations/002_partition_predictions.py, `predictions` is
+partitioned by RANGE (timestamp) into one table per month
+(predictions_y2025m01, ...). Queries that filter on timestamp (the velocity
+rule, ranged analytics/history) only touch the matching partitions.
+
+There is no DEFAULT partition: a row outside every month partition fails to
+insert, so upcoming months must exist ahead of time. The API creates them at
+startup and then every PARTITION_CHECK_HOURS (PartitionMaintainer), keeping
+PARTITION_MONTHS_AHEAD months ready; the `ensure` command below does the same
+for deployments without a long-running API. (A DEFAULT partition was not used:
+once it holds rows for a month, creating that month's partition fails until
+the rows are moved out by hand.)
+
+The retention job exports partitions older than RETENTION_MONTHS to
+zstd-compressed Parquet files in ARCHIVE_DIR and detaches them. Analytics and
+history read those files back through load_archived() when a request asks
+for a historical range.
+
+Usage (cron, e.g. daily):
+    python -m utils.partitions ensure     # create upcoming month partitions
+    python -m utils.partitions archive    # export + detach expired months
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+from sqlalchemy import text
+
+from config import settings
+from models import Prediction
+
+TABLE = Prediction.__table__.name
+PARTITION_NAME = re.compile(rf"^{TABLE}_y(\d{{4}})m(\d{{2}})$")
+ARCHIVE_NAME = re.compile(rf"^{TABLE}_(\d{{4}})-(\d{{2}})\.parquet$")
+EXPORT_CHUNK_ROWS = 50_000
+
+
+# ------------------ MONTH HELPERS ------------------
+def month_start(day: date) -> date:
+    return date(day.year, day.month, 1)
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{TABLE}_y{month.year}m{month.month:02d}"
+
+
+def archive_path(month: date) -> Path:
+    return Path(settings.ARCHIVE_DIR) / f"{TABLE}_{month.year}-{month.month:02d}.parquet"
+
+
+def day_bounds(start_date: Optional[date], end_date: Optional[date]):
+    """Inclusive calendar dates -> half-open datetime bounds (None = open)."""
+    start = datetime.combine(start_date, time.min) if start_date else None
+    end = datetime.combine(end_date + timedelta(days=1), time.min) if end_date else None
+    return start, end
+
+
+# ------------------ PARTITION MANAGEMENT ------------------
+def is_partitioned(engine) -> bool:
+    if engine.dialect.name != "postgresql":
+        return False
+    with engine.connect() as conn:
+        return conn.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table pt "
+            "JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = :table)"
+        ), {"table": TABLE}).scalar()
+
+
+def live_partitions(conn) -> dict:
+    """{month: partition table} for partitions attached to predictions."""
+    names = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = :table"
+    ), {"table": TABLE}).scalars()
+    partitions = {}
+    for name in names:
+        match = PARTITION_NAME.match(name)
+        if match:
+            partitions[date(int(match[1]), int(match[2]), 1)] = name
+    return partitions
+
+
+def create_partition(conn, month: date) -> str:
+    name = partition_name(month)
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {TABLE} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    ))
+    return name
+
+
+def ensure_partitions(engine, months_ahead: int = None, since: date = None) -> list:
+    """
+    Create monthly partitions from `since` (default: this month) through
+    `months_ahead` months from now. No-op unless predictions is partitioned.
+    """
+    if not is_partitioned(engine):
+        return []
+    months_ahead = settings.PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    current = month_start(datetime.utcnow().date())
+    month = month_start(since) if since else current
+    created = []
+    with engine.begin() as conn:
+        existing = live_partitions(conn)
+        while month <= add_months(current, months_ahead):
+            if month not in existing:
+                created.append(create_partition(conn, month))
+            month = add_months(month, 1)
+    return created
+
+
+class PartitionMaintainer:
+    """Background thread running ensure_partitions every PARTITION_CHECK_HOURS."""
+
+    def __init__(self, engine, interval_hours: float = None):
+        self.engine = engine
+        self.interval_hours = settings.PARTITION_CHECK_HOURS if interval_hours is None else interval_hours
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        if self.interval_hours <= 0:
+            return
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="partition-maintainer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_hours * 3600):
+            try:
+                created = ensure_partitions(self.engine)
+                if created:
+                    print(f"✅ Created partitions: {', '.join(created)}")
+            except Exception as e:
+                # Another API worker may have created the same month; retried next round
+                print(f"⚠️ Warning: Could not ensure partitions - {e}")
+
+
+# ------------------ TRANSACTION ID REGISTRY ------------------
+# Unique keys on a partitioned table must include the partition key, so
+# predictions can only enforce (transaction_id, timestamp). A plain table keyed
+# by transaction_id, filled by a row trigger, keeps ids unique table-wide for
+# every insert path (ORM, executemany, COPY): a repeat fails with a unique
+# violation (IntegrityError) even when two requests race. Ids of archived
+# (detached) months stay registered.
+REGISTRY_TABLE = f"{TABLE[:-1]}_transaction_ids"
+REGISTRY_TRIGGER = f"{TABLE}_transaction_id_registry"
+
+
+def install_transaction_id_registry(conn) -> int:
+    """Create the registry, its trigger and backfill it; returns ids registered by the backfill."""
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {REGISTRY_TABLE} (transaction_id VARCHAR(50) PRIMARY KEY)"
+    ))
+    conn.execute(text(f"""
+        CREATE OR REPLACE FUNCTION register_transaction_id() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO {REGISTRY_TABLE} (transaction_id) VALUES (NEW.transaction_id);
+                RETURN NEW;
+            END IF;
+            DELETE FROM {REGISTRY_TABLE} WHERE transaction_id = OLD.transaction_id;
+            RETURN OLD;
+        END $$
+    """))
+    conn.execute(text(f"DROP TRIGGER IF EXISTS {REGISTRY_TRIGGER} ON {TABLE}"))
+    conn.execute(text(
+        f"CREATE TRIGGER {REGISTRY_TRIGGER} AFTER INSERT OR DELETE ON {TABLE} "
+        f"FOR EACH ROW EXECUTE FUNCTION register_transaction_id()"
+    ))
+    return conn.execute(text(
+        f"INSERT INTO {REGISTRY_TABLE} (transaction_id) SELECT DISTINCT transaction_id FROM {TABLE} "
+        f"ON CONFLICT DO NOTHING"
+    )).rowcount
+
+
+def has_transaction_id_registry(engine) -> bool:
+    with engine.connect() as conn:
+        return conn.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = :name)"
+        ), {"name": REGISTRY_TRIGGER}).scalar()
+
+
+# ------------------ ARCHIVAL ------------------
+def _arrow_schema():
+    import pyarrow as pa
+    from sqlalchemy import DateTime, Float, Integer, SmallInteger
+
+    fields = []
+    for column in Prediction.__table__.columns:
+        if isinstance(column.type, SmallInteger):
+            arrow_type = pa.int16()
+        elif isinstance(column.type, Integer):
+            arrow_type = pa.int64()
+        elif isinstance(column.type, Float):
+            arrow_type = pa.float64()
+        elif isinstance(column.type, DateTime):
+            arrow_type = pa.timestamp("us")
+        else:
+            # String / Text, and derived_features JSON stored as text
+            arrow_type = pa.string()
+        fields.append(pa.field(column.name, arrow_type))
+    return pa.schema(fields)
+
+
+def export_partition(engine, name: str, path: Path) -> int:
+    """Stream one partition into a zstd Parquet file. Returns rows written."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema()
+    columns = schema.names
+    rows_written = 0
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with engine.connect() as conn, pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        result = conn.execution_options(stream_results=True).execute(
+            text(f"SELECT {', '.join(columns)} FROM {name} ORDER BY id")
+        )
+        for chunk in result.partitions(EXPORT_CHUNK_ROWS):
+            frame = pd.DataFrame(chunk, columns=columns)
+            frame["derived_features"] = frame["derived_features"].map(
+                lambda value: value if value is None or isinstance(value, str) else json.dumps(value)
+            )
+            writer.write_table(pa.Table.from_pandas(frame, schema=schema, preserve_index=False))
+            rows_written += len(frame)
+    return rows_written
+
+
+def _finish_interrupted(engine) -> None:
+    """Resolve .tmp exports left by a job that died before renaming them."""
+    archive_dir = Path(settings.ARCHIVE_DIR)
+    if not archive_dir.exists():
+        return
+    with engine.connect() as conn:
+        attached = set(live_partitions(conn).values())
+    for tmp in archive_dir.glob(f"{TABLE}_*.parquet.tmp"):
+        final = tmp.with_suffix("")
+        match = ARCHIVE_NAME.match(final.name)
+        month = date(int(match[1]), int(match[2]), 1) if match else None
+        if month and partition_name(month) not in attached:
+            os.replace(tmp, final)  # partition already detached: export is complete
+        else:
+            tmp.unlink()  # partition still live: export again
+
+
+def archive_partitions(engine, retention_months: int = None, keep_detached: bool = False) -> list:
+    """
+    Export every partition older than `retention_months` to Parquet, then
+    detach it (and drop it unless keep_detached). Returns archived months.
+    """
+    if not is_partitioned(engine):
+        return []
+    retention_months = settings.RETENTION_MONTHS if retention_months is None else retention_months
+    cutoff = add_months(month_start(datetime.utcnow().date()), -retention_months)
+    _finish_interrupted(engine)
+
+    with engine.connect() as conn:
+        expired = sorted((m, n) for m, n in live_partitions(conn).items() if m < cutoff)
+
+    archived = []
+    for month, name in expired:
+        final = archive_path(month)
+        tmp = final.with_name(final.name + ".tmp")
+        exported = export_partition(engine, name, tmp)
+
+        with engine.begin() as conn:
+            count = conn.execute(text(f"SELECT count(*) FROM {name}")).scalar()
+            if count != exported:
+                tmp.unlink()
+                raise RuntimeError(f"{name}: exported {exported} rows but partition has {count}")
+            conn.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {name}"))
+            if not keep_detached:
+                conn.execute(text(f"DROP TABLE {name}"))
+
+        # Only visible to readers once the rows have left the live table
+        os.replace(tmp, final)
+        archived.append(month)
+        print(f"   📦 {name}: {exported} rows -> {final}")
+    return archived
+
+
+# ------------------ ARCHIVE READS ------------------
+def archived_months(start: Optional[datetime] = None, end: Optional[datetime] = None) -> list:
+    """Archive files whose month overlaps [start, end)."""
+    archive_dir = Path(settings.ARCHIVE_DIR)
+    if not archive_dir.exists():
+        return []
+    files = []
+    for path in sorted(archive_dir.glob(f"{TABLE}_*.parquet")):
+        match = ARCHIVE_NAME.match(path.name)
+        if not match:
+            continue
+        month = date(int(match[1]), int(match[2]), 1)
+        month_begin = datetime.combine(month, time.min)
+        month_end = datetime.combine(add_months(month, 1), time.min)
+        if (start is None or month_end > start) and (end is None or month_begin < end):
+            files.append(path)
+    return files
+
+
+def load_archived(start: Optional[datetime] = None, end: Optional[datetime] = None,
+                  columns: list = None, email: str = None) -> pd.DataFrame:
+    """
+    Archived predictions in [start, end) as a DataFrame, optionally for one
+    user. Missing values come back as None, like rows read from the database.
+    """
+    columns = columns or [column.name for column in Prediction.__table__.columns]
+    paths = archived_months(start, end)
+    if not paths:
+        return pd.DataFrame(columns=columns)
+
+    filters = []
+    if start is not None:
+        filters.append(("timestamp", ">=", pd.Timestamp(start)))
+    if end is not None:
+        filters.append(("timestamp", "<", pd.Timestamp(end)))
+    if email is not None:
+        filters.append(("email", "==", email))
+
+    frame = pd.concat(
+        [pd.read_parquet(path, columns=columns, filters=filters or None) for path in paths],
+        ignore_index=True
+    )
+    frame = frame.astype(object).where(frame.notna(), None)
+    if "derived_features" in frame:
+        frame["derived_features"] = frame["derived_features"].map(
+            lambda value: None if value is None else json.loads(value)
+        )
+    return frame
+
+
+def archived_predictions(start: Optional[datetime] = None, end: Optional[datetime] = None,
+                         email: str = None) -> list:
+    """Archived rows as detached Prediction objects (for the history endpoint)."""
+    frame = load_archived(start, end, email=email)
+    predictions = []
+    for record in frame.to_dict(orient="records"):
+        record["timestamp"] = record["timestamp"].to_pydatetime()
+        predictions.append(Prediction(**record))
+    return predictions
+
+
+if __name__ == "__main__":
+    from database import engine
+
+    if len(sys.argv) < 2 or sys.argv[1] not in ("ensure", "archive"):
+        print("Usage: python -m utils.partitions ensure|archive [--keep-detached]")
+        sys.exit(1)
+
+    if not is_partitioned(engine):
+        print("⚠️ predictions is not partitioned - run migrations/002_partition_predictions.py first")
+        sys.exit(1)
+
+    if sys.argv[1] == "ensure":
+        created = ensure_partitions(engine)
+        print(f"✅ Created {len(created)} partition(s): {', '.join(created) or '-'}")
+    else:
+        ensure_partitions(engine)
+        archived = archive_partitions(engine, keep_detached="--keep-detached" in sys.argv)
+        print(f"✅ Archived {len(archived)} month(s)")
@@ -0,0 +1,307 @@
+"""
+On-demand per-request profiling
+Breaks a single request down into feature derivation, model inference, SQL,
+JSON encoding and explanation time, plus allocation counts.
+
+Two modes:
+  * trace  - admin-only, one request. Send `X-Profile: trace` (or ?profile=1)
+             together with `X-Profile-Token: <PROFILING_ADMIN_TOKEN>`. The
+             breakdown comes back in the Server-Timing and X-Profile headers.
+  * sample - PROFILE_SAMPLE_RATE of requests record their stage timings to
+             PROFILE_OUTPUT_FILE (JSON lines). No allocation tracking.
+
+When neither mode applies a request only pays one header lookup and one
+random() call; stage() and the SQL hooks return immediately.
+
+stage() blocks and SQL statements also become spans of the request's trace
+when utils/tracing.py records it.
+"""
+
+import contextvars
+import functools
+import hmac
+import json
+import queue
+import random
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Optional
+from urllib.parse import parse_qs
+
+from sqlalchemy import event
+
+from utils.tracing import current_trace, span, sql_span_end, sql_span_start
+
+_current_profile = contextvars.ContextVar("request_profile", default=None)
+
+# Sampled reports waiting for the writer thread; more are dropped
+_SAMPLE_QUEUE_SIZE = 1000
+
+
+class RequestProfile:
+    """Timings collected for one request (seconds, inclusive per stage)."""
+
+    __slots__ = ("mode", "path", "started", "stages", "sql_time", "sql_statements",
+                 "endpoint_started", "endpoint_finished", "_sql_started")
+
+    def __init__(self, mode: str, path: str):
+        self.mode = mode
+        self.path = path
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.sql_time = 0.0
+        self.sql_statements = 0
+        self.endpoint_started = None
+        self.endpoint_finished = None
+        self._sql_started = threading.local()
+
+    def add(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def breakdown(self, finished: float) -> dict:
+        """Stage timings in milliseconds, including the time FastAPI spent
+        before the endpoint (body parsing/validation) and after it (response
+        validation and JSON encoding)."""
+        timings = {name: seconds * 1000 for name, seconds in self.stages.items()}
+        timings["sql"] = self.sql_time * 1000
+        if self.endpoint_started is not None and self.endpoint_finished is not None:
+            timings["request_parsing"] = (self.endpoint_started - self.started) * 1000
+            timings["endpoint"] = (self.endpoint_finished - self.endpoint_started) * 1000
+            timings["json_encoding"] = (finished - self.endpoint_finished) * 1000
+        timings["total"] = (finished - self.started) * 1000
+        return {name: round(ms, 3) for name, ms in timings.items()}
+
+
+class _Stage:
+    """Context manager that adds its elapsed time to the active profile and/or opens a trace span."""
+
+    __slots__ = ("profile", "name", "start", "span")
+
+    def __init__(self, profile: Optional[RequestProfile], name: str, traced: bool):
+        self.profile = profile
+        self.name = name
+        self.span = span(name) if traced else None
+
+    def __enter__(self):
+        if self.span is not None:
+            self.span.__enter__()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.profile is not None:
+            self.profile.add(self.name, time.perf_counter() - self.start)
+        if self.span is not None:
+            self.span.__exit__(*exc)
+        return False
+
+
+class _NoopStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_STAGE = _NoopStage()
+
+
+def stage(name: str):
+    """
+    Time a block as a named stage of the current request:
+
+        with stage("model_inference"):
+            proba = model.predict_proba(features_df)
+    """
+    profile = _current_profile.get()
+    traced = current_trace() is not None
+    if profile is None and not traced:
+        return _NOOP_STAGE
+    return _Stage(profile, name, traced)
+
+
+def profile_endpoint(func):
+    """
+    Mark where the endpoint body starts and ends, so the time FastAPI spends
+    parsing the request and encoding the response can be reported separately.
+    Keeps the signature (FastAPI reads it through __wrapped__) and stays sync.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profile = _current_profile.get()
+        if profile is None:
+            return func(*args, **kwargs)
+        profile.endpoint_started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.endpoint_finished = time.perf_counter()
+
+    return wrapper
+
+
+# ------------------ SQL HOOKS ------------------
+def install_sql_hooks(engine) -> None:
+    """
+    Count statements and time spent in cursor.execute for profiled requests,
+    and record one span per statement (text only, never parameters) for traced ones.
+    """
+    dialect = engine.dialect.name
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        profile = _current_profile.get()
+        if profile is not None:
+            profile._sql_started.value = time.perf_counter()
+        sql_span_start(context, statement, dialect, executemany)
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        profile = _current_profile.get()
+        if profile is not None:
+            started = getattr(profile._sql_started, "value", None)
+            if started is not None:
+                profile.sql_time += time.perf_counter() - started
+                profile.sql_statements += 1
+        sql_span_end(context, rowcount=cursor.rowcount)
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        sql_span_end(exception_context.execution_context, error=True)
+
+
+# ------------------ ASGI MIDDLEWARE ------------------
+class ProfilingMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware overhead on unprofiled requests)
+    that activates a RequestProfile for traced or sampled requests.
+    """
+
+    def __init__(self, app, admin_token: str = "", sample_rate: float = 0.0,
+                 output_file: str = "logs/profiles.jsonl", top_allocations: int = 5):
+        self.app = app
+        self.admin_token = admin_token
+        self.sample_rate = sample_rate
+        self.output_file = Path(output_file)
+        self._sample_writer = _SampleWriter(self.output_file)
+        self.top_allocations = top_allocations
+
+    def _requested_mode(self, scope) -> Optional[str]:
+        headers = dict(scope.get("headers") or [])
+        query_string = scope.get("query_string", b"")
+        wants_trace = (
+            headers.get(b"x-profile", b"").lower() == b"trace"
+            or (bool(query_string) and parse_qs(query_string.decode("latin-1")).get("profile") == ["1"])
+        )
+        if wants_trace and self.admin_token:
+            token = headers.get(b"x-profile-token", b"").decode("latin-1")
+            if hmac.compare_digest(token, self.admin_token):
+                return "trace"
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return "sample"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        mode = self._requested_mode(scope)
+        if mode is None:
+            return await self.app(scope, receive, send)
+
+        profile = RequestProfile(mode, scope["path"])
+        token = _current_profile.set(profile)
+        tracing_memory = mode == "trace" and not tracemalloc.is_tracing()
+        if tracing_memory:
+            tracemalloc.start()
+            snapshot_before = tracemalloc.take_snapshot()
+
+        async def send_with_profile(message):
+            if message["type"] == "http.response.start":
+                report = {"mode": mode, "path": profile.path,
+                          "stages_ms": profile.breakdown(time.perf_counter()),
+                          "sql_statements": profile.sql_statements}
+                if tracing_memory:
+                    report["allocations"] = self._allocation_report(snapshot_before)
+                    tracemalloc.stop()
+                if mode == "trace":
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", _server_timing(report["stages_ms"]).encode()))
+                    headers.append((b"x-profile", json.dumps(report, separators=(",", ":")).encode()))
+                    message = {**message, "headers": headers}
+                else:
+                    self._write_sample(report)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            _current_profile.reset(token)
+            if tracing_memory and tracemalloc.is_tracing():
+                tracemalloc.stop()
+
+    def _allocation_report(self, snapshot_before) -> dict:
+        """
+        Allocation counts while the request ran. tracemalloc is process-wide,
+        so concurrent requests are included; profile on a quiet worker.
+        """
+        current, peak = tracemalloc.get_traced_memory()
+        diff = tracemalloc.take_snapshot().compare_to(snapshot_before, "lineno")
+        new_blocks = sum(stat.count_diff for stat in diff if stat.count_diff > 0)
+        top = [
+            {"site": str(stat.traceback[0]), "blocks": stat.count_diff, "bytes": stat.size_diff}
+            for stat in sorted(diff, key=lambda s: s.count_diff, reverse=True)[:self.top_allocations]
+        ]
+        return {"new_blocks": new_blocks, "peak_bytes": peak, "top_sites": top}
+
+    def _write_sample(self, report: dict) -> None:
+        report["timestamp"] = time.time()
+        self._sample_writer.submit(report)
+
+
+class _SampleWriter:
+    """Appends sampled reports to the output file from a background thread (no file I/O on the event loop)."""
+
+    def __init__(self, output_file: Path):
+        self.output_file = output_file
+        self._queue = queue.Queue(maxsize=_SAMPLE_QUEUE_SIZE)
+        self._thread = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def submit(self, report: dict) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="profile-writer", daemon=True)
+                    self._thread.start()
+        try:
+            self._queue.put_nowait(report)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            reports = [self._queue.get()]
+            while True:
+                try:
+                    reports.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.output_file.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.output_file, "a", encoding="utf-8") as f:
+                    f.write("".join(json.dumps(report, separators=(",", ":")) + "\n" for report in reports))
+            except OSError as e:
+                print(f"⚠️ Could not write {len(reports)} profile sample(s): {e}")
+
+
+def _server_timing(stages_ms: dict) -> str:
+    """Format stages as a Server-Timing header (shown in browser devtools)."""
+    return ", ".join(f"{name};dur={ms}" for name, ms in stages_ms.items())
@@ -0,0 +1,91 @@
+"""
+Rule-based fraud checks used alongside the ML model
+Shared by single and bulk prediction so both apply identical rules.
+Checks combine conditions with & so they work on one feature dict and on
+a whole feature DataFrame (evaluate_rules_batch).
+"""
+
+import numpy as np
+
+# (flag, weight, check) in evaluation order
+RULES = [
+    # Rule 1: High amount transaction
+    ("High amount transaction (>₹100K)", 0.2,
+     lambda f: f["transaction_amount"] > 100000),
+    # Rule 2: Large night-time transaction
+    ("Large night-time transaction", 0.2,
+     lambda f: (f["is_night_txn"] == 1) & (f["transaction_amount"] > 50000)),
+    # Rule 3: New unverified account
+    ("New unverified account", 0.25,
+     lambda f: (f["account_age_days"] < 10) & (f["kyc_verified"] == 0)),
+    # Rule 4: Weekend high-value transaction
+    ("Weekend high-value transaction", 0.15,
+     lambda f: (f["is_weekend_txn"] == 1) & (f["transaction_amount"] > 80000)),
+    # Rule 5: Holiday transaction risk
+    ("High-value holiday transaction", 0.1,
+     lambda f: (f.get("is_holiday_txn", 0) == 1) & (f["transaction_amount"] > 70000)),
+]
+
+# Rule 6: Historical pattern - needs the customer's recent predictions from the DB
+VELOCITY_RULE_FLAG = "Multiple high-risk transactions in last hour"
+VELOCITY_RULE_WEIGHT = 0.3
+VELOCITY_WINDOW_HOURS = 1
+VELOCITY_RISK_SCORE = 0.7
+VELOCITY_MIN_COUNT = 3
+
+
+def evaluate_rules(features: dict):
+    """
+    Apply the stateless rules (1-5) to derived features.
+    Returns (rule_flags, rule_score).
+    """
+    rule_flags = []
+    rule_score = 0.0
+    for flag, weight, check in RULES:
+        if check(features):
+            rule_flags.append(flag)
+            rule_score += weight
+    return rule_flags, rule_score
+
+
+def evaluate_rules_batch(features):
+    """
+    Vectorized evaluate_rules over a feature DataFrame.
+    Returns (rule_mask, rule_score) arrays; bits follow RULE_FLAGS and the
+    scores are summed in the same order as evaluate_rules.
+    """
+    rule_mask = np.zeros(len(features), dtype=np.int64)
+    rule_score = np.zeros(len(features), dtype=np.float64)
+    for bit, (_, weight, check) in enumerate(RULES):
+        hit = np.asarray(check(features), dtype=bool)
+        rule_mask |= hit.astype(np.int64) << bit
+        rule_score += np.where(hit, weight, 0.0)
+    return rule_mask, rule_score
+
+
+# Bit positions used for Prediction.rule_mask: rules 1-5 in order, then rule 6
+RULE_FLAGS = [flag for flag, _, _ in RULES] + [VELOCITY_RULE_FLAG]
+RULE_WEIGHTS = [weight for _, weight, _ in RULES] + [VELOCITY_RULE_WEIGHT]
+_RULE_BITS = {flag: bit for bit, flag in enumerate(RULE_FLAGS)}
+
+
+def rules_to_mask(rule_flags: list) -> int:
+    """Pack triggered rule flags into an integer bitmask."""
+    mask = 0
+    for flag in rule_flags:
+        mask |= 1 << _RULE_BITS[flag]
+    return mask
+
+
+def mask_to_rules(rule_mask: int) -> list:
+    """Unpack a rule bitmask into the flag strings, in evaluation order."""
+    return [flag for bit, flag in enumerate(RULE_FLAGS) if rule_mask >> bit & 1]
+
+
+def mask_to_score(rule_mask: int) -> float:
+    """Rule score for a bitmask, summed in the same order as evaluation."""
+    score = 0.0
+    for bit, weight in enumerate(RULE_WEIGHTS):
+        if rule_mask >> bit & 1:
+            score += weight
+    return score
@@ -0,0 +1,240 @@
+"""
+Vectorized scoring for column-oriented bulk requests and batch jobs
+A columnar batch carries one typed array per field. It is validated in one
+pass over those arrays (invalid rows reported by index), featurized with
+derive_features_batch, scored with a single predict_proba call and packed
+straight into compact prediction rows.
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import insert
+
+from config import settings
+
+from utils.features import FEATURE_NAMES, derive_features_batch, pack_feature_flags_batch
+from utils.rules import evaluate_rules_batch, mask_to_rules
+
+# Same limits as PredictRequest
+ID_MAX_LENGTH = 50
+FRAUD_THRESHOLD = 0.6
+
+COLUMNS = [
+    "customer_id",
+    "transaction_id",
+    "transaction_datetime",
+    "transaction_amount",
+    "kyc_verified",
+    "account_age_days",
+    "channel_encoded"
+]
+
+# "YYYY-MM-DD HH:MM:SS": digit positions and separators
+_DATETIME_LENGTH = 19
+_DIGIT_POSITIONS = [0, 1, 2, 3, 5, 6, 8, 9, 11, 12, 14, 15, 17, 18]
+_SEPARATORS = {4: "-", 7: "-", 10: " ", 13: ":", 16: ":"}
+
+
+def _digits(chars: np.ndarray, start: int, count: int) -> np.ndarray:
+    value = np.zeros(len(chars), dtype=np.int64)
+    for position in range(start, start + count):
+        value = value * 10 + (chars[:, position].astype(np.int64) - ord("0"))
+    return value
+
+
+def parse_datetimes(values: list):
+    """
+    Parse 'YYYY-MM-DD HH:MM:SS' strings without a per-element Python loop.
+    Returns (datetime64[s] array, invalid mask); invalid entries are NaT.
+    """
+    # One extra character so longer strings show up as a non-empty last column
+    text = np.asarray(values, dtype=f"U{_DATETIME_LENGTH + 1}")
+    chars = text.view(np.uint32).reshape(len(text), _DATETIME_LENGTH + 1)
+
+    is_digit = (chars >= ord("0")) & (chars <= ord("9"))
+    valid = is_digit[:, _DIGIT_POSITIONS].all(axis=1) & (chars[:, _DATETIME_LENGTH] == 0)
+    for position, separator in _SEPARATORS.items():
+        valid &= chars[:, position] == ord(separator)
+
+    year, month, day = _digits(chars, 0, 4), _digits(chars, 5, 2), _digits(chars, 8, 2)
+    hour, minute, second = _digits(chars, 11, 2), _digits(chars, 14, 2), _digits(chars, 17, 2)
+    # Year 0000 has no date (date.fromordinal / the calendar lookup would raise)
+    valid &= (year >= 1) & (month >= 1) & (month <= 12) & (hour < 24) & (minute < 60) & (second < 60)
+
+    months = ((year - 1970) * 12 + np.clip(month, 1, 12) - 1).astype("datetime64[M]")
+    first_day = months.astype("datetime64[D]")
+    days_in_month = ((months + 1).astype("datetime64[D]") - first_day).astype(np.int64)
+    valid &= (day >= 1) & (day <= days_in_month)
+
+    seconds = (day - 1) * 86400 + hour * 3600 + minute * 60 + second
+    parsed = first_day.astype("datetime64[s]") + seconds.astype("timedelta64[s]")
+    parsed[~valid] = np.datetime64("NaT")
+    return parsed, ~valid
+
+
+def load_model():
+    """
+    Load the fraud model for the configured backend.
+    Both backends expose predict_proba(features_df) -> (n_rows, 2).
+    """
+    if settings.MODEL_BACKEND == "numpy":
+        from utils.tree_model import ObliviousTreeModel
+        return ObliviousTreeModel.load(settings.NUMPY_MODEL_PATH)
+
+    from catboost import CatBoostClassifier
+    model = CatBoostClassifier()
+    model.load_model(settings.MODEL_PATH)
+    return model
+
+
+def validate_columns(batch):
+    """
+    Check every row of a columnar batch (ColumnarBulkPredictRequest) at once.
+    Returns (frame of the valid rows, {row index: error message}); the frame
+    keeps the original row positions as its index and holds the parsed
+    transaction_datetime.
+    """
+    customer_id = np.asarray(batch.customer_id, dtype=object)
+    transaction_id = np.asarray(batch.transaction_id, dtype=object)
+    transaction_datetime, bad_datetime = parse_datetimes(batch.transaction_datetime)
+    amount = np.asarray(batch.transaction_amount, dtype=np.float64)
+    kyc = np.asarray(batch.kyc_verified, dtype=np.int64)
+    age = np.asarray(batch.account_age_days, dtype=np.int64)
+    channel = np.asarray(batch.channel_encoded, dtype=np.int64)
+
+    checks = []
+    for name, ids in (("customer_id", customer_id), ("transaction_id", transaction_id)):
+        length = np.fromiter(map(len, ids), dtype=np.int64, count=len(ids))
+        checks.append((f"{name} must be 1-{ID_MAX_LENGTH} characters",
+                       (length < 1) | (length > ID_MAX_LENGTH)))
+    checks.append(("transaction_datetime must be a valid 'YYYY-MM-DD HH:MM:SS'", bad_datetime))
+    checks.append(("transaction_amount must be > 0", ~(np.isfinite(amount) & (amount > 0))))
+    checks.append(("kyc_verified must be 0 or 1", (kyc < 0) | (kyc > 1)))
+    checks.append(("account_age_days must be >= 0", age < 0))
+    checks.append(("channel_encoded must be 0-3", (channel < 0) | (channel > 3)))
+
+    invalid = np.logical_or.reduce([failed for _, failed in checks])
+    if len(set(batch.transaction_id)) < len(transaction_id):
+        # Later copies of an id are rejected; the first valid one is kept
+        ids = pd.Series(transaction_id).where(~invalid)
+        duplicated = ids.duplicated(keep="first").to_numpy() & ~invalid
+        checks.append(("duplicate transaction_id in batch", duplicated))
+        invalid |= duplicated
+
+    errors = {}
+    for index in np.flatnonzero(invalid):
+        errors[int(index)] = "; ".join(message for message, failed in checks if failed[index])
+
+    keep = ~invalid
+    frame = pd.DataFrame({
+        "customer_id": customer_id[keep],
+        "transaction_id": transaction_id[keep],
+        "transaction_datetime": transaction_datetime[keep],
+        "transaction_amount": amount[keep],
+        "kyc_verified": kyc[keep],
+        "account_age_days": age[keep],
+        "channel_encoded": channel[keep]
+    }, index=np.flatnonzero(keep))
+    return frame, errors
+
+
+def score_frame(model, frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Features, model probability and rule breakdown for validated rows.
+    Same arithmetic as /api/predict, minus the velocity rule (as in bulk).
+    """
+    features = derive_features_batch(frame)
+    model_probability = model.predict_proba(features[FEATURE_NAMES])[:, 1].astype(np.float64)
+    rule_mask, rule_score = evaluate_rules_batch(features)
+    risk_score = np.round(np.minimum(1.0, model_probability + rule_score), 4)
+
+    scored = features.copy()
+    scored["model_probability"] = model_probability
+    scored["rule_mask"] = rule_mask
+    scored["rule_score"] = rule_score
+    scored["risk_score"] = risk_score
+    scored["is_fraud"] = (risk_score >= FRAUD_THRESHOLD).astype(np.int64)
+    return scored
+
+
+def compact_rows(frame: pd.DataFrame, scored: pd.DataFrame, email: str) -> list:
+    """Insert parameters in the Prediction.compact_values layout."""
+    columns = {
+        "customer_id": frame["customer_id"].tolist(),
+        "transaction_id": frame["transaction_id"].tolist(),
+        "risk_score": scored["risk_score"].tolist(),
+        "is_fraud": scored["is_fraud"].tolist(),
+        "transaction_amount": scored["transaction_amount"].tolist(),
+        "account_age_days": scored["account_age_days"].tolist(),
+        "channel": scored["channel_encoded"].tolist(),
+        "hour_of_day": scored["hour_of_day"].tolist(),
+        "day_of_week": scored["day_of_week"].tolist(),
+        "feature_flags": pack_feature_flags_batch(scored).tolist(),
+        "model_probability": scored["model_probability"].tolist(),
+        "rule_score": scored["rule_score"].tolist(),
+        "rule_mask": scored["rule_mask"].tolist()
+    }
+    names = list(columns)
+    return [
+        dict(zip(names, values), email=email, explanation=None)
+        for values in zip(*columns.values())
+    ]
+
+
+def known_transaction_ids(db, transaction_ids: list, batch_size: int = 1000) -> dict:
+    """{transaction_id: (prediction id, email, timestamp)} for ids already stored."""
+    from models import Prediction
+
+    known = {}
+    for i in range(0, len(transaction_ids), batch_size):
+        rows = db.query(
+            Prediction.transaction_id, Prediction.id, Prediction.email, Prediction.timestamp
+        ).filter(Prediction.transaction_id.in_(transaction_ids[i:i + batch_size]))
+        for row in rows:
+            known[row.transaction_id] = (row.id, row.email, row.timestamp)
+    return known
+
+
+def is_duplicate_transaction(error) -> bool:
+    """True when an IntegrityError comes from transaction_id uniqueness (unique index or registry)."""
+    return "transaction_id" in str(getattr(error, "orig", error))
+
+
+def insert_predictions(db, rows: list, timestamp: datetime = None) -> list:
+    """Multi-row INSERT ... RETURNING of compact_rows; ids in row order (not committed)."""
+    from models import Prediction
+
+    timestamp = timestamp or datetime.utcnow()
+    for row in rows:
+        row["timestamp"] = timestamp
+    return db.scalars(
+        insert(Prediction).returning(Prediction.id, sort_by_parameter_order=True), rows
+    ).all()
+
+
+def rules_for_masks(rule_masks) -> list:
+    """Triggered rule flags per row, decoding each distinct mask once."""
+    decoded = {mask: mask_to_rules(mask) for mask in set(rule_masks)}
+    return [decoded[mask] for mask in rule_masks]
+
+
+def result_columns(frame: pd.DataFrame, scored, prediction_ids: list) -> dict:
+    """Columnar results for the stored rows; `index` is the row position in the request."""
+    if scored is None:
+        return {name: [] for name in (
+            "index", "prediction_id", "transaction_id", "customer_id", "risk_score",
+            "is_fraud", "model_risk_score", "rule_score", "rules_triggered"
+        )}
+    return {
+        "index": frame.index.tolist(),
+        "prediction_id": list(prediction_ids),
+        "transaction_id": frame["transaction_id"].tolist(),
+        "customer_id": frame["customer_id"].tolist(),
+        "risk_score": scored["risk_score"].tolist(),
+        "is_fraud": scored["is_fraud"].tolist(),
+        "model_risk_score": scored["model_probability"].round(4).tolist(),
+        "rule_score": scored["rule_score"].round(2).tolist(),
+        "rules_triggered": rules_for_masks(scored["rule_mask"].tolist())
+    }
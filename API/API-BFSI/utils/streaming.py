@@ -0,0 +1,327 @@
+"""
+Micro-batched scoring for the /ws/score WebSocket channel
+Payment gateways keep one connection open and pipeline single transactions
+over it. Every connection feeds one shared StreamScorer, which gathers what
+has arrived into a micro-batch (up to STREAM_MAX_BATCH rows, waiting at most
+STREAM_MAX_WAIT_MS after the first) and scores it like the columnar bulk
+endpoint: one vectorized validation, one predict_proba call and one
+multi-row INSERT. Results go back to each connection tagged with their
+transaction_id as soon as their batch is stored, so they may arrive out of
+order.
+
+Messages (JSON text frames):
+
+  client -> server   one transaction {"customer_id", "transaction_id",
+                     "transaction_datetime", "transaction_amount",
+                     "kyc_verified", "account_age_days", "channel_encoded"}
+                     or a JSON array of them; the email comes from the token
+  server -> client   {"type": "ready", "max_in_flight": N, ...} on connect
+                     {"type": "result", "transaction_id", "prediction_id",
+                      "risk_score", "is_fraud", ...} per scored transaction
+                     {"type": "error", "transaction_id", "error_message"}
+
+Flow control: a connection may have STREAM_MAX_IN_FLIGHT transactions
+without a result. At that limit - or when the shared queue of
+STREAM_QUEUE_ROWS is full because the scorer is behind - the server stops
+reading the socket, so TCP pushes back on the client rather than the server
+buffering without bound. A client that does not read its results stops
+getting its own frames read the same way. While every stream worker is busy,
+new rows keep queueing and form larger batches, which is where batching
+pays most.
+"""
+
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+from typing import Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from config import settings
+
+from utils.scoring import (
+    COLUMNS, compact_rows, insert_predictions, is_duplicate_transaction, known_transaction_ids,
+    rules_for_masks, score_frame, validate_columns
+)
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+    import json
+
+_NUMBER_FIELDS = ("transaction_amount", "kyc_verified", "account_age_days", "channel_encoded")
+_TEXT_FIELDS = ("customer_id", "transaction_id", "transaction_datetime")
+_INT_LIMIT = 2 ** 53  # integer fields become int64 arrays
+
+
+def decode_message(text) -> list:
+    """Transactions in one client frame. Raises ValueError for anything else."""
+    payload = orjson.loads(text) if orjson is not None else json.loads(text)
+    transactions = payload if isinstance(payload, list) else [payload]
+    if not all(isinstance(transaction, dict) for transaction in transactions):
+        raise ValueError("expected a transaction object or an array of them")
+    return transactions
+
+
+def check_transaction(transaction: dict) -> Optional[str]:
+    """Type errors that would break the vectorized validation; None if the row can be batched."""
+    missing = [column for column in COLUMNS if column not in transaction]
+    if missing:
+        return f"missing field(s): {', '.join(missing)}"
+    for name in _TEXT_FIELDS:
+        if not isinstance(transaction[name], str):
+            return f"{name} must be a string"
+    for name in _NUMBER_FIELDS:
+        value = transaction[name]
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return f"{name} must be a number"
+    for name in ("kyc_verified", "account_age_days", "channel_encoded"):
+        value = float(transaction[name])
+        if not value.is_integer() or abs(value) > _INT_LIMIT:
+            return f"{name} must be an integer"
+    return None
+
+
+def score_items(db, model, items: list) -> tuple:
+    """
+    Validate, score and insert one micro-batch of (transaction, email) items.
+    Returns (message per item, stored rows, prediction ids); not committed.
+    """
+    batch = SimpleNamespace(**{
+        column: [transaction[column] for transaction, _ in items] for column in COLUMNS
+    })
+    frame, errors = validate_columns(batch)
+    frame = drop_known_ids(db, frame, errors)
+
+    rows, prediction_ids = [], []
+    scored = score_frame(model, frame) if len(frame) else None
+    while len(frame):
+        rows = compact_rows(frame, scored, None)
+        for row, index in zip(rows, frame.index):
+            row["email"] = items[index][1]
+        try:
+            prediction_ids = insert_predictions(db, rows)
+            break
+        except IntegrityError as e:
+            # A concurrent batch stored some of these ids after the check above.
+            # Nothing else is pending in this session, so roll back, report
+            # only those ids and insert the rest again
+            db.rollback()
+            if not is_duplicate_transaction(e):
+                raise
+            remaining = drop_known_ids(db, frame, errors)
+            if len(remaining) == len(frame):
+                raise
+            scored = scored[frame.index.isin(remaining.index)]
+            frame, rows = remaining, []
+
+    messages = [None] * len(items)
+    for index, message in errors.items():
+        messages[index] = error_message(items[index][0]["transaction_id"], message)
+
+    if rows:
+        rules = rules_for_masks(scored["rule_mask"].tolist())
+        for position, (index, prediction_id) in enumerate(zip(frame.index, prediction_ids)):
+            row = rows[position]
+            messages[index] = {
+                "type": "result",
+                "transaction_id": row["transaction_id"],
+                "prediction_id": prediction_id,
+                "customer_id": row["customer_id"],
+                "risk_score": row["risk_score"],
+                "is_fraud": row["is_fraud"],
+                "model_risk_score": round(row["model_probability"], 4),
+                "rule_score": round(row["rule_score"], 2),
+                "rules_triggered": rules[position]
+            }
+    return messages, rows, prediction_ids
+
+
+def drop_known_ids(db, frame, errors: dict):
+    """Rows of frame whose transaction_id is not stored yet; the others go to errors."""
+    existing = known_transaction_ids(db, frame["transaction_id"].tolist())
+    if not existing:
+        return frame
+    duplicate = frame["transaction_id"].isin(list(existing))
+    for index in frame.index[duplicate]:
+        errors[int(index)] = "transaction_id already exists"
+    return frame[~duplicate]
+
+
+def error_message(transaction_id, message: str) -> dict:
+    return {"type": "error", "transaction_id": transaction_id, "error_message": message}
+
+
+class StreamConnection:
+    """One client's in-flight limit and outgoing messages."""
+
+    def __init__(self, email: str, max_in_flight: int = None):
+        self.email = email
+        self.max_in_flight = max_in_flight or settings.STREAM_MAX_IN_FLIGHT
+        self.credits = asyncio.Semaphore(self.max_in_flight)
+        self.outbox = asyncio.Queue()
+
+    async def reply(self, message: dict) -> None:
+        """Answer one transaction (frees its in-flight slot once sent)."""
+        await self.outbox.put(message)
+
+
+class StreamScorer:
+    """Shared micro-batcher: connections submit, one task batches, a bulkhead scores."""
+
+    def __init__(self, score_batch, run_batch, max_batch: int = None, max_wait_ms: float = None,
+                 queue_rows: int = None, workers: int = None):
+        # score_batch(items) -> message per item, run on the executor via run_batch
+        self.score_batch = score_batch
+        self.run_batch = run_batch
+        self.max_batch = max_batch or settings.STREAM_MAX_BATCH
+        self.max_wait = (settings.STREAM_MAX_WAIT_MS if max_wait_ms is None else max_wait_ms) / 1000
+        self.queue_rows = queue_rows or settings.STREAM_QUEUE_ROWS
+        self.workers = workers or settings.BULKHEAD_STREAM_WORKERS
+        self._queue = None
+        self._task = None
+        self._lock = threading.Lock()
+        self.stats = {
+            "connections": 0, "transactions": 0, "batches": 0, "batched_rows": 0,
+            "largest_batch": 0, "blocked_reads": 0, "failed_batches": 0, "batch_ms_total": 0.0
+        }
+
+    def start(self) -> None:
+        if self._task is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_rows)
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _count(self, name: str, value=1) -> None:
+        with self._lock:
+            self.stats[name] += value
+
+    async def submit(self, connection: StreamConnection, transaction: dict) -> None:
+        """Queue one transaction; waits (and stops the caller reading) while the scorer is behind."""
+        if self._queue is None:
+            raise RuntimeError("StreamScorer is not started")
+        self._count("transactions")
+        item = (transaction, connection)
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self._count("blocked_reads")
+            await self._queue.put(item)
+
+    async def _run(self) -> None:
+        slots = asyncio.Semaphore(self.workers)
+        pending = set()
+        while True:
+            # Only gather a batch once a worker is free: while all are busy,
+            # arrivals accumulate and the next batch is bigger
+            await slots.acquire()
+            batch = [await self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            task = asyncio.get_running_loop().create_task(self._score(batch, slots))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+
+    async def _score(self, batch: list, slots: asyncio.Semaphore) -> None:
+        start = time.perf_counter()
+        items = [(transaction, connection.email) for transaction, connection in batch]
+        try:
+            messages = await self.run_batch(self.score_batch, items)
+        except Exception as e:
+            self._count("failed_batches")
+            messages = [error_message(transaction.get("transaction_id"), f"Scoring failed: {e}")
+                        for transaction, _ in items]
+        finally:
+            slots.release()
+        with self._lock:
+            self.stats["batches"] += 1
+            self.stats["batched_rows"] += len(batch)
+            self.stats["largest_batch"] = max(self.stats["largest_batch"], len(batch))
+            self.stats["batch_ms_total"] += (time.perf_counter() - start) * 1000
+        for (_, connection), message in zip(batch, messages):
+            await connection.reply(message)
+
+    async def serve(self, websocket, email: str) -> None:
+        """Run one accepted WebSocket until the client disconnects."""
+        connection = StreamConnection(email)
+        self._count("connections")
+        await websocket.send_text(self.encode({
+            "type": "ready",
+            "max_in_flight": connection.max_in_flight,
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000
+        }))
+        sender = asyncio.get_running_loop().create_task(self._send(websocket, connection))
+        try:
+            while True:
+                # At the in-flight limit this waits before reading the next frame
+                await connection.credits.acquire()
+                connection.credits.release()
+                frame = await websocket.receive()
+                if frame["type"] == "websocket.disconnect":
+                    break
+                try:
+                    transactions = decode_message(frame.get("text") or frame.get("bytes") or b"")
+                except ValueError as e:
+                    await connection.credits.acquire()
+                    await connection.reply(error_message(None, f"Invalid message: {e}"))
+                    continue
+                for transaction in transactions:
+                    await connection.credits.acquire()
+                    problem = check_transaction(transaction)
+                    if problem:
+                        await connection.reply(error_message(transaction.get("transaction_id"), problem))
+                    else:
+                        await self.submit(connection, transaction)
+        finally:
+            self._count("connections", -1)
+            sender.cancel()
+
+    async def _send(self, websocket, connection: StreamConnection) -> None:
+        while True:
+            message = await connection.outbox.get()
+            try:
+                await websocket.send_text(self.encode(message))
+            except Exception:
+                return  # client gone; serve() ends on the disconnect frame
+            connection.credits.release()
+
+    @staticmethod
+    def encode(message: dict) -> str:
+        if orjson is not None:
+            return orjson.dumps(message).decode()
+        return json.dumps(message, separators=(",", ":"))
+
+    def metrics(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+        batches = stats.pop("batches")
+        batch_ms_total = stats.pop("batch_ms_total")
+        return {
+            **stats,
+            "batches": batches,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "queue_capacity": self.queue_rows,
+            "avg_batch_rows": round(stats["batched_rows"] / batches, 1) if batches else 0.0,
+            "avg_batch_ms": round(batch_ms_total / batches, 3) if batches else 0.0
+        }
@@ -0,0 +1,215 @@
+"""
+Synthetic transactions for scale tests
+A SyntheticProfile is fitted once from a labelled sample
+(SYNTHETIC_SOURCE_CSV, data/raw/fraud_dataset.csv by default): the fraud
+rate and, per class, the KYC rate, channel mix, hour-of-day mix and the
+quantiles of amount and account age. TransactionGenerator then draws any
+number of rows from it with NumPy, one chunk at a time, so 10M+ rows never
+sit in memory at once.
+
+On top of the fitted marginals:
+  * customer skew - customers are picked with weight 1 / rank**skew
+    (0: uniform, 1: Zipf), so a few customers carry much of the volume
+  * bursts - activity comes in sessions of on average burst_mean
+    transactions from one customer, burst_gap seconds apart on average;
+    a session is fraudulent or legitimate as a whole, which is what the
+    velocity rule looks for
+
+Chunks cover consecutive slices of [start, end) and are sorted by time, so
+rows come out in timestamp order like live traffic. Channels the API does
+not know (e.g. "Web") are counted as Online.
+
+    generator = TransactionGenerator(SyntheticProfile.fit(), customers=100_000, seed=7)
+    for chunk in generator.chunks(10_000_000, chunk_rows=100_000):
+        ...   # DataFrame in the utils.scoring COLUMNS layout, plus is_fraud
+"""
+
+from datetime import datetime, timedelta
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from config import settings
+
+from utils.features import CHANNEL_NAMES
+
+# Quantiles kept per numeric column (inverse-CDF sampling between them)
+PROFILE_QUANTILES = 101
+
+_CHANNEL_CODES = {name.lower(): code for code, name in CHANNEL_NAMES.items()}
+
+
+class SyntheticProfile:
+    """Fraud rate and per-class marginals of a labelled transaction sample."""
+
+    def __init__(self, fraud_rate: float, classes: dict, source: str = ""):
+        # classes[is_fraud] = {"kyc_rate", "channel_p", "hour_p", "amount_q", "age_q"}
+        self.fraud_rate = fraud_rate
+        self.classes = {
+            label: {name: np.asarray(value, dtype=np.float64) for name, value in values.items()}
+            for label, values in classes.items()
+        }
+        self.source = source
+
+    @classmethod
+    def fit(cls, path: str = None) -> "SyntheticProfile":
+        """Fit the marginals of a raw CSV (kyc_verified Yes/No, channel names, timestamp, is_fraud)."""
+        path = path or settings.SYNTHETIC_SOURCE_CSV
+        frame = pd.read_csv(path)
+        kyc = frame["kyc_verified"].astype(str).str.strip().str.lower().isin(["yes", "1", "true"])
+        channel = frame["channel"].astype(str).str.strip().str.lower().map(_CHANNEL_CODES).fillna(0)
+        hour = pd.to_datetime(frame["timestamp"]).dt.hour
+        probabilities = np.linspace(0, 1, PROFILE_QUANTILES)
+
+        classes = {}
+        for label in (0, 1):
+            rows = (frame["is_fraud"] == label).to_numpy()
+            classes[label] = {
+                "kyc_rate": kyc[rows].mean(),
+                "channel_p": np.bincount(channel[rows].astype(int), minlength=len(CHANNEL_NAMES)) / rows.sum(),
+                "hour_p": np.bincount(hour[rows], minlength=24) / rows.sum(),
+                "amount_q": np.quantile(frame["transaction_amount"][rows], probabilities),
+                "age_q": np.quantile(frame["account_age_days"][rows], probabilities)
+            }
+        return cls(float(frame["is_fraud"].mean()), classes, source=str(path))
+
+    def summary(self) -> dict:
+        return {
+            "source": self.source,
+            "fraud_rate": round(self.fraud_rate, 4),
+            **{
+                f"class_{label}": {
+                    "kyc_rate": round(float(values["kyc_rate"]), 4),
+                    "amount_median": float(values["amount_q"][PROFILE_QUANTILES // 2]),
+                    "age_median": float(values["age_q"][PROFILE_QUANTILES // 2])
+                }
+                for label, values in self.classes.items()
+            }
+        }
+
+
+class TransactionGenerator:
+    """Vectorized sampler of synthetic transactions from a SyntheticProfile."""
+
+    def __init__(self, profile: SyntheticProfile, customers: int = 100_000, customer_skew: float = 0.8,
+                 burst_mean: float = 3.0, burst_gap: float = 120.0, start: datetime = None,
+                 end: datetime = None, fraud_rate: float = None, id_prefix: str = "SYN",
+                 seed: Optional[int] = None):
+        self.profile = profile
+        self.customers = customers
+        self.burst_mean = max(burst_mean, 1.0)
+        self.burst_gap = burst_gap
+        self.end = end or datetime.utcnow().replace(microsecond=0)
+        self.start = start or self.end - timedelta(days=365)
+        if self.start >= self.end:
+            raise ValueError("start must be before end")
+        self.fraud_rate = profile.fraud_rate if fraud_rate is None else fraud_rate
+        self.id_prefix = id_prefix
+        self.rng = np.random.default_rng(seed)
+
+        # Customer k has weight 1 / (k + 1) ** skew
+        weights = 1.0 / np.arange(1, customers + 1, dtype=np.float64) ** customer_skew
+        self._customer_cdf = np.cumsum(weights / weights.sum())
+        self._customer_ids = np.array([f"{id_prefix}C{k:07d}" for k in range(customers)], dtype=object)
+        self._hour_cdf = {label: np.cumsum(values["hour_p"]) for label, values in profile.classes.items()}
+        self._channel_cdf = {label: np.cumsum(values["channel_p"]) for label, values in profile.classes.items()}
+
+    def _pick(self, cdf: np.ndarray, size: int) -> np.ndarray:
+        return np.minimum(np.searchsorted(cdf, self.rng.random(size), side="right"), len(cdf) - 1)
+
+    def _quantile_sample(self, quantiles: np.ndarray, size: int) -> np.ndarray:
+        # Inverse CDF, linear between the fitted quantiles
+        return np.interp(self.rng.random(size), np.linspace(0, 1, len(quantiles)), quantiles)
+
+    def _sessions(self, rows: int) -> np.ndarray:
+        """Session sizes summing to rows (geometric, mean burst_mean)."""
+        sizes = self.rng.geometric(1.0 / self.burst_mean, size=int(rows / self.burst_mean * 1.2) + 16)
+        while sizes.sum() < rows:
+            sizes = np.concatenate([sizes, self.rng.geometric(1.0 / self.burst_mean, size=len(sizes))])
+        cut = int(np.searchsorted(np.cumsum(sizes), rows))
+        sizes = sizes[:cut + 1].copy()
+        sizes[-1] -= sizes.sum() - rows
+        return sizes[sizes > 0]
+
+    def _session_starts(self, fraud: np.ndarray, start: datetime, end: datetime) -> np.ndarray:
+        """
+        Seconds after start: a uniform day, an hour from the class's hour mix
+        (wall-clock, from midnight) and a uniform second within the hour.
+        Draws outside [start, end) are redrawn.
+        """
+        midnight = datetime.combine(start.date(), datetime.min.time())
+        offset = (start - midnight).total_seconds()
+        span = (end - start).total_seconds()
+        days = int(np.ceil((offset + span) / 86400))
+        seconds = np.full(len(fraud), -1.0)
+        pending = np.arange(len(fraud))
+        for _ in range(20):
+            hour = np.empty(len(pending), dtype=np.int64)
+            for label in (0, 1):
+                members = fraud[pending] == label
+                hour[members] = self._pick(self._hour_cdf[label], int(members.sum()))
+            drawn = (self.rng.integers(0, days, len(pending)) * 86400 + hour * 3600
+                     + self.rng.random(len(pending)) * 3600 - offset)
+            inside = (drawn >= 0) & (drawn < span)
+            seconds[pending[inside]] = drawn[inside]
+            pending = pending[~inside]
+            if not len(pending):
+                break
+        # Slices much shorter than a day may not fit the hour mix: spread the rest uniformly
+        seconds[pending] = self.rng.random(len(pending)) * span
+        return seconds
+
+    def generate(self, rows: int, start: datetime, end: datetime, first_id: int = 0) -> pd.DataFrame:
+        """rows transactions timed within [start, end), sorted by time; ids from first_id."""
+        sizes = self._sessions(rows)
+        sessions = len(sizes)
+        fraud = (self.rng.random(sessions) < self.fraud_rate).astype(np.int64)
+        customer = self._pick(self._customer_cdf, sessions)
+
+        seconds = self._session_starts(fraud, start, end)
+
+        # Gaps inside a session: exponential, 0 for each session's first row
+        session = np.repeat(np.arange(sessions), sizes)
+        gaps = self.rng.exponential(self.burst_gap, size=rows)
+        first = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        gaps[first] = 0.0
+        offsets = np.cumsum(gaps)
+        offsets -= np.repeat(offsets[first], sizes)
+        span = (end - start).total_seconds()
+        seconds = np.minimum(seconds[session] + offsets, span - 1).astype(np.int64)
+
+        is_fraud = fraud[session]
+        kyc = np.empty(rows, dtype=np.int64)
+        channel = np.empty(rows, dtype=np.int64)
+        amount = np.empty(rows, dtype=np.float64)
+        age = np.empty(rows, dtype=np.int64)
+        for label, values in self.profile.classes.items():
+            members = is_fraud == label
+            count = int(members.sum())
+            kyc[members] = self.rng.random(count) < values["kyc_rate"]
+            channel[members] = self._pick(self._channel_cdf[label], count)
+            amount[members] = np.round(self._quantile_sample(values["amount_q"], count), 2)
+            age[members] = np.round(self._quantile_sample(values["age_q"], count))
+
+        order = np.argsort(seconds, kind="stable")
+        timestamps = np.datetime64(start, "s") + seconds[order].astype("timedelta64[s]")
+        return pd.DataFrame({
+            "customer_id": self._customer_ids[customer[session][order]],
+            "transaction_id": [f"{self.id_prefix}{i:010d}" for i in range(first_id, first_id + rows)],
+            "transaction_datetime": timestamps,
+            "transaction_amount": amount[order],
+            "kyc_verified": kyc[order],
+            "account_age_days": age[order],
+            "channel_encoded": channel[order],
+            "is_fraud": is_fraud[order]
+        })
+
+    def chunks(self, rows: int, chunk_rows: int = 100_000):
+        """DataFrames of up to chunk_rows, each covering the next slice of [start, end)."""
+        count = -(-rows // chunk_rows)
+        span = (self.end - self.start) / count
+        for index in range(count):
+            size = min(chunk_rows, rows - index * chunk_rows)
+            yield self.generate(size, self.start + span * index, self.start + span * (index + 1),
+                                first_id=index * chunk_rows)
@@ -0,0 +1,494 @@
+"""
+Span-based request tracing with head and tail sampling
+Each traced request gets a root span, one child span per stage() block
+(feature derivation, inference, rules, velocity query, explanation, DB
+write, ...) and one span per SQL statement, so a slow /api/predict shows
+where its time went. Work handed to the bulkhead and breaker executors runs
+in a copy of the request's context, so its spans keep their parent.
+
+Propagation: a W3C `traceparent` header is continued (same trace id, our
+root span as its child) and every traced response carries `traceparent` and
+X-Trace-Id.
+
+Sampling:
+  * head - TRACE_SAMPLE_RATE of requests are recorded and kept; with
+           TRACE_FOLLOW_PARENT an incoming traceparent with the sampled flag
+           is always kept
+  * tail - with TRACE_TAIL_SAMPLING every request is recorded and the
+           decision is made at the end: kept if slower than TRACE_SLOW_MS,
+           failed (5xx or an exception) or marked by the endpoint
+           (keep_trace("fraud"), keep_trace("degraded"))
+
+Kept traces go to a background exporter (no I/O on the request path):
+TRACE_EXPORTER "jsonl" appends one line per trace to TRACE_OUTPUT_FILE,
+"otlp" POSTs OTLP/JSON batches to TRACE_OTLP_ENDPOINT (an OpenTelemetry
+collector, or tests/trace_collector.py locally). When nothing is sampled a
+request costs one header lookup; stage() and the SQL hooks return at once.
+"""
+
+import contextvars
+import json
+import queue
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from config import settings
+
+_current_trace = contextvars.ContextVar("request_trace", default=None)
+_current_span = contextvars.ContextVar("request_span", default=None)
+
+EXPORTERS = ("jsonl", "otlp")
+
+# OTLP span kinds and status codes
+KIND_INTERNAL, KIND_SERVER, KIND_CLIENT = 1, 2, 3
+STATUS_OK, STATUS_ERROR = 1, 2
+
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits) or 1:0{bits // 4}x}"
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[tuple]:
+    """(trace_id, parent span id, sampled) from a W3C traceparent, or None if invalid."""
+    if not header:
+        return None
+    parts = header.strip().lower().split("-")
+    if len(parts) < 4 or len(parts[0]) != 2 or parts[0] == "ff":
+        return None
+    trace_id, span_id, flags = parts[1], parts[2], parts[3]
+    if len(trace_id) != 32 or len(span_id) != 16 or len(flags) != 2:
+        return None
+    try:
+        if int(trace_id, 16) == 0 or int(span_id, 16) == 0:
+            return None
+        sampled = bool(int(flags, 16) & 1)
+    except ValueError:
+        return None
+    return trace_id, span_id, sampled
+
+
+class Span:
+    """One timed operation; times are perf_counter_ns, converted on export."""
+
+    __slots__ = ("name", "span_id", "parent_id", "kind", "start_ns", "end_ns", "attributes", "status")
+
+    def __init__(self, name: str, parent_id: Optional[str], kind: int = KIND_INTERNAL, attributes: dict = None):
+        self.name = name
+        self.span_id = _new_id(64)
+        self.parent_id = parent_id
+        self.kind = kind
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns = None
+        self.attributes = attributes or {}
+        self.status = STATUS_OK
+
+    def end(self, error: bool = False) -> None:
+        self.end_ns = time.perf_counter_ns()
+        if error:
+            self.status = STATUS_ERROR
+
+
+class Trace:
+    """Spans recorded for one request and the reasons to keep it."""
+
+    __slots__ = ("trace_id", "remote_parent_id", "root", "spans", "keep_reasons", "wall_start_ns", "perf_start_ns")
+
+    def __init__(self, name: str, trace_id: str = None, remote_parent_id: str = None, attributes: dict = None):
+        self.trace_id = trace_id or _new_id(128)
+        self.remote_parent_id = remote_parent_id
+        self.wall_start_ns = time.time_ns()
+        self.perf_start_ns = time.perf_counter_ns()
+        self.root = Span(name, remote_parent_id, KIND_SERVER, attributes)
+        self.spans = [self.root]  # appended from executor threads too (list.append is atomic)
+        self.keep_reasons = []
+
+    def start_span(self, name: str, kind: int = KIND_INTERNAL, attributes: dict = None) -> Span:
+        parent = _current_span.get()
+        span = Span(name, parent.span_id if parent is not None else self.root.span_id, kind, attributes)
+        self.spans.append(span)
+        return span
+
+    def duration_ms(self) -> float:
+        end = self.root.end_ns or time.perf_counter_ns()
+        return (end - self.root.start_ns) / 1e6
+
+    def traceparent(self, sampled: bool) -> str:
+        return f"00-{self.trace_id}-{self.root.span_id}-{'01' if sampled else '00'}"
+
+    def unix_ns(self, perf_ns: int) -> int:
+        return self.wall_start_ns + (perf_ns - self.perf_start_ns)
+
+
+class _SpanScope:
+    """Context manager: a child of the current span, current while the block runs."""
+
+    __slots__ = ("trace", "name", "attributes", "span", "token")
+
+    def __init__(self, trace: Trace, name: str, attributes: dict = None):
+        self.trace = trace
+        self.name = name
+        self.attributes = attributes
+
+    def __enter__(self):
+        self.span = self.trace.start_span(self.name, attributes=self.attributes)
+        self.token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        self.span.end(error=exc_type is not None)
+        _current_span.reset(self.token)
+        return False
+
+
+class _NoopScope:
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_SCOPE = _NoopScope()
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def span(name: str, **attributes):
+    """
+    Trace a block as a child span (no-op when the request is not traced):
+
+        with span("customer_lookup", customer_id=customer_id):
+            ...
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        return _NOOP_SCOPE
+    return _SpanScope(trace, name, attributes or None)
+
+
+def annotate(**attributes) -> None:
+    """Set attributes on the current span (the root outside any stage)."""
+    trace = _current_trace.get()
+    if trace is not None:
+        (_current_span.get() or trace.root).attributes.update(attributes)
+
+
+def keep_trace(reason: str) -> None:
+    """Ask tail sampling to keep this request's trace (e.g. "fraud", "degraded")."""
+    trace = _current_trace.get()
+    if trace is not None and reason not in trace.keep_reasons:
+        trace.keep_reasons.append(reason)
+
+
+# ------------------ SQL SPANS ------------------
+def sql_span_start(context, statement: str, dialect: str, executemany: bool) -> None:
+    """Called from the before_cursor_execute hook (utils/profiling.py)."""
+    trace = _current_trace.get()
+    if trace is None or context is None:
+        return
+    context._trace_span = trace.start_span("sql", KIND_CLIENT, {
+        "db.system": dialect,
+        "db.statement": statement[:settings.TRACE_SQL_MAX_CHARS],
+        **({"db.executemany": True} if executemany else {})
+    })
+
+
+def sql_span_end(context, error: bool = False, rowcount: int = None) -> None:
+    span = getattr(context, "_trace_span", None) if context is not None else None
+    if span is None or span.end_ns is not None:
+        return
+    if rowcount is not None and rowcount >= 0:
+        span.attributes["db.rowcount"] = rowcount
+    span.end(error=error)
+
+
+# ------------------ EXPORT ------------------
+def trace_record(trace: Trace) -> dict:
+    """One JSON line per trace: spans with offsets from the request start."""
+    origin = trace.root.start_ns
+    return {
+        "trace_id": trace.trace_id,
+        "name": trace.root.name,
+        "timestamp": trace.unix_ns(origin) / 1e9,
+        "duration_ms": round(trace.duration_ms(), 3),
+        "status": "error" if trace.root.status == STATUS_ERROR else "ok",
+        "kept": trace.keep_reasons,
+        "spans": [
+            {
+                "span_id": span.span_id,
+                "parent_id": span.parent_id,
+                "name": span.name,
+                "start_ms": round((span.start_ns - origin) / 1e6, 3),
+                "duration_ms": round(((span.end_ns or trace.root.end_ns) - span.start_ns) / 1e6, 3),
+                **({"status": "error"} if span.status == STATUS_ERROR else {}),
+                **({"attributes": span.attributes} if span.attributes else {})
+            }
+            for span in trace.spans
+        ]
+    }
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def otlp_payload(traces: list, service_name: str) -> dict:
+    """OTLP/JSON ExportTraceServiceRequest for a batch of traces."""
+    spans = []
+    for trace in traces:
+        for span in trace.spans:
+            spans.append({
+                "traceId": trace.trace_id,
+                "spanId": span.span_id,
+                "parentSpanId": span.parent_id or "",
+                "name": span.name,
+                "kind": span.kind,
+                "startTimeUnixNano": str(trace.unix_ns(span.start_ns)),
+                "endTimeUnixNano": str(trace.unix_ns(span.end_ns or trace.root.end_ns)),
+                "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in span.attributes.items()],
+                "status": {"code": span.status}
+            })
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+        "scopeSpans": [{"scope": {"name": "riskshield.tracing"}, "spans": spans}]
+    }]}
+
+
+class TraceExporter:
+    """Background thread writing kept traces in batches (JSON lines or OTLP/HTTP)."""
+
+    def __init__(self, kind: str = None, output_file: str = None, endpoint: str = None,
+                 queue_size: int = None, batch_size: int = None, service_name: str = None):
+        self.kind = kind or settings.TRACE_EXPORTER
+        if self.kind not in EXPORTERS:
+            raise ValueError(f"Unknown trace exporter: {self.kind}")
+        self.output_file = Path(output_file or settings.TRACE_OUTPUT_FILE)
+        self.endpoint = endpoint or settings.TRACE_OTLP_ENDPOINT
+        self.batch_size = batch_size or settings.TRACE_EXPORT_BATCH
+        self.service_name = service_name or settings.TRACE_SERVICE_NAME
+        self._queue = queue.Queue(maxsize=queue_size or settings.TRACE_EXPORT_QUEUE)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._client = None
+        self.stats = {"exported": 0, "dropped": 0, "export_errors": 0, "batches": 0}
+
+    def submit(self, trace: Trace) -> None:
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self._count("dropped")
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._thread.start()
+
+    def _count(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self.stats[name] += value
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            traces = [trace for trace in batch if trace is not None]
+            if traces:
+                try:
+                    self._write(traces)
+                    self._count("exported", len(traces))
+                    self._count("batches")
+                except Exception as e:
+                    self._count("export_errors")
+                    print(f"⚠️ Trace export failed ({len(traces)} traces): {e}")
+            for _ in batch:
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, traces: list) -> None:
+        if self.kind == "jsonl":
+            lines = "".join(json.dumps(trace_record(trace), separators=(",", ":"), default=str) + "\n"
+                            for trace in traces)
+            self.output_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.output_file, "a", encoding="utf-8") as f:
+                f.write(lines)
+            return
+        if self._client is None:
+            import httpx
+            self._client = httpx.Client(timeout=5.0)
+        response = self._client.post(self.endpoint, json=otlp_payload(traces, self.service_name))
+        response.raise_for_status()
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Wait (up to timeout) until queued traces are written."""
+        deadline = time.monotonic() + timeout
+        while self._thread is not None and self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        if self._thread is not None:
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                return
+            self._thread.join(timeout)
+        if self._client is not None:
+            self._client.close()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {**self.stats, "kind": self.kind, "queued": self._queue.qsize(),
+                    "target": str(self.output_file) if self.kind == "jsonl" else self.endpoint}
+
+
+# ------------------ SAMPLING ------------------
+class Tracer:
+    """Sampling decisions (head at the start, tail at the end) and counters."""
+
+    def __init__(self, exporter: TraceExporter = None, sample_rate: float = None, tail_sampling: bool = None,
+                 slow_ms: float = None, follow_parent: bool = None):
+        self.sample_rate = settings.TRACE_SAMPLE_RATE if sample_rate is None else sample_rate
+        self.tail_sampling = settings.TRACE_TAIL_SAMPLING if tail_sampling is None else tail_sampling
+        self.slow_ms = settings.TRACE_SLOW_MS if slow_ms is None else slow_ms
+        self.follow_parent = settings.TRACE_FOLLOW_PARENT if follow_parent is None else follow_parent
+        self.exporter = exporter or TraceExporter()
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "recorded": 0, "kept": 0, "discarded": 0}
+        self.kept_reasons = {}
+
+    @property
+    def enabled(self) -> bool:
+        """This service samples on its own (head or tail); follow_parent only continues sampled callers."""
+        return self.sample_rate > 0 or self.tail_sampling
+
+    def begin(self, name: str, traceparent: Optional[str], attributes: dict = None) -> Optional[Trace]:
+        """A Trace when this request is recorded (head-sampled or tail sampling on), else None."""
+        parent = parse_traceparent(traceparent) if traceparent else None
+        reasons = []
+        if parent is not None and parent[2] and self.follow_parent:
+            reasons.append("parent")
+        elif self.sample_rate > 0 and random.random() < self.sample_rate:
+            reasons.append("head")
+        with self._lock:
+            self.stats["requests"] += 1
+            if not reasons and not self.tail_sampling:
+                return None
+            self.stats["recorded"] += 1
+        trace = Trace(name, parent[0] if parent else None, parent[1] if parent else None, attributes)
+        trace.keep_reasons.extend(reasons)
+        return trace
+
+    def finish(self, trace: Trace, status_code: int = None, error: bool = False) -> bool:
+        """End the root span, apply the tail rules and export a kept trace."""
+        trace.root.end(error=error or (status_code or 0) >= 500)
+        if status_code is not None:
+            trace.root.attributes["http.status_code"] = status_code
+        if trace.root.status == STATUS_ERROR:
+            trace.keep_reasons.append("error")
+        if self.tail_sampling and trace.duration_ms() >= self.slow_ms:
+            trace.keep_reasons.append("slow")
+        keep = bool(trace.keep_reasons) if self.tail_sampling else any(
+            reason in ("head", "parent") for reason in trace.keep_reasons
+        )
+        with self._lock:
+            self.stats["kept" if keep else "discarded"] += 1
+            if keep:
+                for reason in trace.keep_reasons:
+                    self.kept_reasons[reason] = self.kept_reasons.get(reason, 0) + 1
+        if keep:
+            self.exporter.submit(trace)
+        return keep
+
+    def metrics(self) -> dict:
+        with self._lock:
+            stats = {**self.stats, "kept_reasons": dict(self.kept_reasons)}
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "tail_sampling": self.tail_sampling,
+            "slow_ms": self.slow_ms,
+            "follow_parent": self.follow_parent,
+            **stats,
+            "exporter": self.exporter.metrics()
+        }
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Flush queued traces and stop the exporter thread."""
+        self.exporter.shutdown(timeout)
+
+
+# ------------------ ASGI MIDDLEWARE ------------------
+class TracingMiddleware:
+    """
+    Pure ASGI middleware: starts the root span of a recorded request, adds
+    traceparent / X-Trace-Id to its response and hands it to the tracer at the end.
+    """
+
+    def __init__(self, app, tracer: Tracer):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not (self.tracer.enabled or self.tracer.follow_parent):
+            return await self.app(scope, receive, send)
+
+        traceparent = None
+        for name, value in scope.get("headers") or ():
+            if name == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+        trace = self.tracer.begin(f"{scope['method']} {scope['path']}", traceparent, {
+            "http.method": scope["method"], "http.target": scope["path"]
+        })
+        if trace is None:
+            return await self.app(scope, receive, send)
+
+        trace_token = _current_trace.set(trace)
+        span_token = _current_span.set(trace.root)
+        status = {}
+        sampled = bool(trace.keep_reasons)
+
+        async def send_with_trace(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"traceparent", trace.traceparent(sampled).encode()))
+                headers.append((b"x-trace-id", trace.trace_id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        error = False
+        try:
+            await self.app(scope, receive, send_with_trace)
+        except Exception:
+            error = True
+            raise
+        finally:
+            route = scope.get("route")
+            if route is not None and getattr(route, "path", None):
+                trace.root.name = f"{scope['method']} {route.path}"
+                trace.root.attributes["http.route"] = route.path
+            _current_span.reset(span_token)
+            _current_trace.reset(trace_token)
+            self.tracer.finish(trace, status.get("code"), error)
@@ -0,0 +1,199 @@
+"""
+Pure-NumPy evaluator for the CatBoost oblivious-tree model
+Lets scoring workers run predict_proba without importing the catboost package
+
+The .cbm model is exported once (this step needs catboost) to a compact .npz:
+  * split_features / split_borders : every distinct (feature, border) split
+  * tree_splits                    : per tree, the split used at each depth
+  * leaf_values                    : per tree, 2**depth leaf values
+  * scale / bias                   : raw score = scale * sum(leaves) + bias
+
+Usage:
+    python -m utils.tree_model export model/catboost_fraud_model_balanced_tuned.cbm
+    python -m utils.tree_model verify model/catboost_fraud_model_balanced_tuned.cbm
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+
+class ObliviousTreeModel:
+    """
+    Evaluates CatBoost symmetric (oblivious) trees on batches with NumPy.
+    Exposes predict_proba() with the same output shape as CatBoostClassifier.
+    """
+
+    def __init__(self, feature_names, split_features, split_borders,
+                 tree_splits, tree_depths, leaf_values, scale=1.0, bias=0.0):
+        self.feature_names = list(feature_names)
+        self.split_features = np.asarray(split_features, dtype=np.int32)
+        self.split_borders = np.asarray(split_borders, dtype=np.float64)
+        self.tree_splits = np.asarray(tree_splits, dtype=np.int32)
+        self.tree_depths = np.asarray(tree_depths, dtype=np.int32)
+        self.leaf_values = np.asarray(leaf_values, dtype=np.float64)
+        self.scale = float(scale)
+        self.bias = float(bias)
+
+        self.tree_count_ = len(self.tree_depths)
+        self._max_depth = self.tree_splits.shape[1]
+        # Offset of each tree's leaves in the flattened leaf table
+        self._leaf_offsets = (np.arange(self.tree_count_) << self._max_depth).astype(np.int32)
+        self._flat_leaves = self.leaf_values.ravel()
+
+    # ------------------ LOADING ------------------
+    @classmethod
+    def load(cls, path: str) -> "ObliviousTreeModel":
+        """Load a model written by export_catboost_model()."""
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                feature_names=[str(name) for name in data["feature_names"]],
+                split_features=data["split_features"],
+                split_borders=data["split_borders"],
+                tree_splits=data["tree_splits"],
+                tree_depths=data["tree_depths"],
+                leaf_values=data["leaf_values"],
+                scale=float(data["scale"]),
+                bias=float(data["bias"]),
+            )
+
+    @classmethod
+    def from_catboost_json(cls, model_json: dict) -> "ObliviousTreeModel":
+        """Build the array representation from CatBoost's JSON model dump."""
+        float_features = model_json["features_info"]["float_features"]
+        feature_names = [
+            f.get("feature_id") or f"feature_{f['feature_index']}" for f in float_features
+        ]
+        trees = model_json["oblivious_trees"]
+        max_depth = max(len(tree["splits"]) for tree in trees)
+
+        # Index 0 is a padding split that is never true (x > +inf), so shallower
+        # trees can share the max_depth layout without changing their leaf index
+        split_index = {}
+        split_features = [0]
+        split_borders = [np.inf]
+
+        tree_splits = np.zeros((len(trees), max_depth), dtype=np.int32)
+        tree_depths = np.zeros(len(trees), dtype=np.int32)
+        leaf_values = np.zeros((len(trees), 1 << max_depth), dtype=np.float64)
+
+        for t, tree in enumerate(trees):
+            for d, split in enumerate(tree["splits"]):
+                if split.get("split_type", "FloatFeature") != "FloatFeature":
+                    raise ValueError(f"Unsupported split type: {split.get('split_type')}")
+                key = (split["float_feature_index"], split["border"])
+                if key not in split_index:
+                    split_index[key] = len(split_features)
+                    split_features.append(split["float_feature_index"])
+                    split_borders.append(split["border"])
+                tree_splits[t, d] = split_index[key]
+            tree_depths[t] = len(tree["splits"])
+            values = tree["leaf_values"]
+            leaf_values[t, :len(values)] = values
+
+        scale, bias = model_json.get("scale_and_bias", [1.0, [0.0]])
+        if isinstance(bias, list):
+            bias = bias[0] if bias else 0.0
+
+        return cls(feature_names, split_features, split_borders,
+                   tree_splits, tree_depths, leaf_values, scale, bias)
+
+    def save(self, path: str) -> None:
+        """Write the compact .npz representation."""
+        np.savez_compressed(
+            path,
+            feature_names=np.array(self.feature_names),
+            split_features=self.split_features,
+            split_borders=self.split_borders,
+            tree_splits=self.tree_splits,
+            tree_depths=self.tree_depths,
+            leaf_values=self.leaf_values,
+            scale=np.float64(self.scale),
+            bias=np.float64(self.bias),
+        )
+
+    # ------------------ PREDICTION ------------------
+    def _to_matrix(self, X) -> np.ndarray:
+        """
+        Accept a DataFrame (columns matched by name, like CatBoost) or a 2D array
+        in feature_names order. Features that are absent from a DataFrame are
+        filled with 0; CatBoost allows this only for features the trees never use.
+        """
+        if hasattr(X, "columns"):
+            return X.reindex(columns=self.feature_names, fill_value=0).to_numpy(dtype=np.float64)
+        matrix = np.asarray(X, dtype=np.float64)
+        if matrix.ndim == 1:
+            matrix = matrix.reshape(1, -1)
+        return matrix
+
+    def predict_raw(self, X) -> np.ndarray:
+        """Raw log-odds for every row."""
+        matrix = self._to_matrix(X)
+        # (n_splits, n_rows) binary split results, computed once for all trees
+        bits = (matrix[:, self.split_features] > self.split_borders).T.astype(np.int32)
+        # Pack the split bit of each depth into a per-tree leaf index (n_trees, n_rows)
+        leaf_index = np.empty((self.tree_count_, len(matrix)), dtype=np.int32)
+        leaf_index[:] = self._leaf_offsets[:, None]
+        for depth in range(self._max_depth):
+            leaf_index |= bits[self.tree_splits[:, depth]] << depth
+        leaf_sum = self._flat_leaves[leaf_index].sum(axis=0)
+        return self.scale * leaf_sum + self.bias
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Class probabilities, shape (n_rows, 2), same as CatBoostClassifier."""
+        positive = 1.0 / (1.0 + np.exp(-self.predict_raw(X)))
+        return np.column_stack((1.0 - positive, positive))
+
+
+def export_catboost_model(cbm_path: str, out_path: str = None) -> str:
+    """Convert a .cbm file to the .npz format (requires the catboost package)."""
+    from catboost import CatBoostClassifier
+
+    out_path = out_path or os.path.splitext(cbm_path)[0] + ".npz"
+    model = CatBoostClassifier()
+    model.load_model(cbm_path)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_path = os.path.join(tmp_dir, "model.json")
+        model.save_model(json_path, format="json")
+        with open(json_path, encoding="utf-8") as f:
+            model_json = json.load(f)
+
+    tree_model = ObliviousTreeModel.from_catboost_json(model_json)
+    # The JSON dump does not always carry names; take them from the model itself
+    tree_model.feature_names = list(model.feature_names_)
+    tree_model.save(out_path)
+    return out_path
+
+
+def verify_against_catboost(cbm_path: str, X, atol: float = 1e-9) -> float:
+    """Return the max absolute probability difference vs. native CatBoost."""
+    from catboost import CatBoostClassifier
+
+    native = CatBoostClassifier()
+    native.load_model(cbm_path)
+    npz_path = os.path.splitext(cbm_path)[0] + ".npz"
+    tree_model = ObliviousTreeModel.load(npz_path)
+
+    diff = np.abs(native.predict_proba(X)[:, 1] - tree_model.predict_proba(X)[:, 1]).max()
+    if diff > atol:
+        raise AssertionError(f"NumPy evaluator differs from CatBoost by {diff:.3e}")
+    return float(diff)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in ("export", "verify"):
+        print("Usage: python -m utils.tree_model export|verify <model.cbm> [test_features.csv]")
+        sys.exit(1)
+
+    command, cbm = sys.argv[1], sys.argv[2]
+    if command == "export":
+        print(f"✅ Exported to {export_catboost_model(cbm)}")
+    else:
+        import pandas as pd
+        test_csv = sys.argv[3] if len(sys.argv) > 3 else "../../data/processed/test_data/test_features.csv"
+        X_test = pd.read_csv(test_csv).drop(columns=["customer_id"], errors="ignore")
+        print(f"✅ Max abs difference: {verify_against_catboost(cbm, X_test):.3e}")
@@ -2,6 +2,7 @@
 const API_BASE_URL = 'https://pylord-api-bfsi.hf.space';
 let charts = {};
 let analyticsData = null;
+let liveStream = null;
 
 document.addEventListener('DOMContentLoaded', () => {
   loadAnalytics();
@@ -22,6 +23,9 @@ async function loadAnalytics() {
       updateKPIs(analyticsData.kpis);
       initCharts(analyticsData.graphs);
 
+      // ✅ Keep the snapshot current with pushed deltas (no refetching)
+      startLiveUpdates(analyticsData.last_prediction_id);
+
       // ✅ Load Model Metrics (Accuracy / Precision / Recall / F1)
       loadModelMetrics();
 
@@ -65,6 +69,88 @@ function updateKPIs(kpis) {
   document.getElementById('kpi-amount-protected').innerText = '₹' + (kpis.amount_protected || 0).toLocaleString();
 }
 
+// ✅ Live updates via Server-Sent Events
+function startLiveUpdates(sinceId) {
+  if (liveStream) liveStream.close();
+  if (typeof EventSource === 'undefined') return;
+
+  const params = new URLSearchParams({ since: sinceId || 0, token: getAccessToken() || '' });
+  liveStream = new EventSource(`${API_BASE_URL}/api/analytics/stream?${params}`);
+
+  liveStream.addEventListener('delta', event => {
+    applyAnalyticsDelta(JSON.parse(event.data));
+  });
+
+  // Server could not catch us up - take a fresh snapshot
+  liveStream.addEventListener('reset', () => {
+    liveStream.close();
+    liveStream = null;
+    loadAnalytics();
+  });
+}
+
+function applyAnalyticsDelta(delta) {
+  if (!analyticsData) return;
+  const kpis = analyticsData.kpis;
+  const graphs = analyticsData.graphs;
+
+  kpis.total_transactions += delta.kpis.total_transactions;
+  kpis.fraud_detected += delta.kpis.fraud_detected;
+  kpis.amount_protected = Math.round((kpis.amount_protected + delta.kpis.amount_protected) * 100) / 100;
+
+  graphs.fraud_vs_legitimate.fraud = (graphs.fraud_vs_legitimate.fraud || 0) + delta.fraud_vs_legitimate.fraud;
+  graphs.fraud_vs_legitimate.legitimate = (graphs.fraud_vs_legitimate.legitimate || 0) + delta.fraud_vs_legitimate.legitimate;
+
+  Object.entries(delta.months).forEach(([month, bucket]) => {
+    let entry = graphs.fraud_rate_trend.find(d => d.month === month);
+    if (!entry) {
+      entry = { month, fraud_rate: 0, total_transactions: 0, fraud_count: 0 };
+      graphs.fraud_rate_trend.push(entry);
+      graphs.fraud_rate_trend.sort((a, b) => a.month.localeCompare(b.month));
+    }
+    entry.total_transactions += bucket.total;
+    entry.fraud_count += bucket.fraud;
+    entry.fraud_rate = Math.round(entry.fraud_count / entry.total_transactions * 10000) / 100;
+  });
+
+  Object.entries(delta.fraud_by_channel).forEach(([channel, count]) => {
+    graphs.fraud_by_channel[channel] = (graphs.fraud_by_channel[channel] || 0) + count;
+  });
+
+  graphs.amount_vs_risk_scatter.push(...delta.amount_vs_risk_scatter);
+  analyticsData.last_prediction_id = delta.to_id;
+
+  updateKPIs(kpis);
+  refreshCharts(graphs);
+
+  if (delta.flagged.length > 0) {
+    const first = delta.flagged[0];
+    const more = delta.flagged.length > 1 ? ` (+${delta.flagged.length - 1} more)` : '';
+    showNotification(`🚨 Fraud flagged: ${first.transaction_id}${more}`, 'warning');
+  }
+}
+
+// Update existing charts in place instead of rebuilding them
+function refreshCharts(graphsData) {
+  if (!charts.trend || !charts.channel || !charts.risk) {
+    initCharts(graphsData);
+    return;
+  }
+
+  charts.trend.data.labels = graphsData.fraud_rate_trend.map(d => d.month);
+  charts.trend.data.datasets[0].data = graphsData.fraud_rate_trend.map(d => d.fraud_rate);
+  charts.trend.update();
+
+  charts.channel.data.labels = Object.keys(graphsData.fraud_by_channel);
+  charts.channel.data.datasets[0].data = Object.values(graphsData.fraud_by_channel);
+  charts.channel.update();
+
+  charts.risk.data.datasets[0].data = [graphsData.fraud_vs_legitimate.fraud, graphsData.fraud_vs_legitimate.legitimate];
+  charts.risk.update();
+
+  initVolumeChart(graphsData.amount_vs_risk_scatter);
+}
+
 // Theme Colors
 function getChartColors() {
   const isDark = document.documentElement.classList.contains('dark');
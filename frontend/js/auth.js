@@ -52,8 +52,7 @@ function initLoginForm() {
         }
 
         showNotification(data.message, 'success');
-        localStorage.setItem('userEmail', email);
-        localStorage.setItem('userName', data.user || '');
+        saveSession(data.data);
         setTimeout(() => window.location.href = '/dashboard.html', 1000);
       } catch (err) {
         showNotification('Server error. Try again later.', 'error');
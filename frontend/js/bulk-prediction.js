@@ -38,10 +38,10 @@ function initUploadArea() {
     uploadArea.style.background = 'var(--muted)';
     
     const file = e.dataTransfer.files[0];
-    if (file && file.name.endsWith('.csv')) {
+    if (file && isSupportedFile(file)) {
       handleFileUpload(file);
     } else {
-      showNotification('Please upload a valid CSV file', 'error');
+      showNotification('Please upload a CSV or Parquet file', 'error');
     }
   });
 
@@ -59,6 +59,11 @@ function initUploadArea() {
   });
 }
 
+const MAX_UPLOAD_MB = 200;
+const RESULTS_PREVIEW_LIMIT = 1000;
+let jobEvents = null;
+let currentJobId = null;
+
 async function handleFileUpload(file) {
   const userEmail = getCurrentUserEmail();
   
@@ -68,9 +73,14 @@ async function handleFileUpload(file) {
     return;
   }
 
-  // Validate file size (10MB max)
-  if (file.size > 10 * 1024 * 1024) {
-    showNotification('File size exceeds 10MB limit', 'error');
+  if (!isSupportedFile(file)) {
+    showNotification('Please upload a CSV or Parquet file', 'error');
+    return;
+  }
+
+  // Validate file size
+  if (file.size > MAX_UPLOAD_MB * 1024 * 1024) {
+    showNotification(`File size exceeds ${MAX_UPLOAD_MB}MB limit`, 'error');
     return;
   }
 
@@ -84,156 +94,110 @@ async function handleFileUpload(file) {
     <p style="font-size: 0.875rem; color: var(--muted-foreground);">${(file.size / 1024).toFixed(2)} KB</p>
   `;
 
-  // Read and process CSV
   try {
-    const csvText = await file.text();
-    const transactions = parseCSV(csvText);
-    
-    if (transactions.length === 0) {
-      showNotification('No valid transactions found in CSV', 'error');
-      return;
-    }
-
-    // Check maximum limit (1000 transactions)
-    if (transactions.length > 1000) {
-      showNotification('Maximum 1000 transactions allowed per request', 'error');
-      return;
-    }
-
-    showNotification(`Found ${transactions.length} transactions. Processing...`, 'info');
-    await processBulkPredictions(transactions, userEmail);
-    
+    await submitBulkJob(file, userEmail);
   } catch (error) {
-    console.error('Error processing CSV:', error);
-    showNotification(error.message || 'Failed to process CSV file', 'error');
+    console.error('Bulk job error:', error);
+    showNotification(error.message || 'Failed to process file', 'error');
+    document.getElementById('processing-status').style.display = 'none';
   }
 }
 
-function parseCSV(csvText) {
-  const lines = csvText.trim().split('\n');
-  if (lines.length < 2) {
-    throw new Error('CSV file is empty or invalid');
-  }
+function isSupportedFile(file) {
+  const name = file.name.toLowerCase();
+  return name.endsWith('.csv') || name.endsWith('.parquet');
+}
 
-  const headers = lines[0].split(',').map(h => h.trim());
-  const transactions = [];
+async function submitBulkJob(file, userEmail) {
+  // The server validates and scores the file in the background (see /api/jobs)
+  const formData = new FormData();
+  formData.append('email', userEmail);
+  formData.append('file', file);
 
-  // Required columns
-  const requiredColumns = ['customer_id', 'transaction_amount', 'kyc_verified', 'account_age_days', 'channel_encoded', 'transaction_datetime'];
-  
-  // Check if all required columns exist
-  const missingColumns = requiredColumns.filter(col => !headers.includes(col));
-  if (missingColumns.length > 0) {
-    throw new Error(`Missing required columns: ${missingColumns.join(', ')}`);
+  const response = await fetch(`${API_BASE_URL}/api/jobs`, {
+    method: 'POST',
+    headers: authHeaders(),
+    body: formData
+  });
+  if (handleUnauthorized(response)) return;
+  const result = await response.json();
+
+  if (!response.ok) {
+    throw new Error(result.detail || result.message || 'Could not start bulk prediction');
   }
 
-  for (let i = 1; i < lines.length; i++) {
-    const line = lines[i].trim();
-    if (!line) continue; // Skip empty lines
-    
-    const values = line.split(',').map(v => v.trim());
-    if (values.length !== headers.length) {
-      console.warn(`Skipping invalid row ${i}: column count mismatch`);
-      continue;
-    }
+  const job = result.data;
+  currentJobId = job.job_id;
+  showNotification(`Found ${job.total_rows} transactions. Processing...`, 'info');
 
-    const transaction = {};
-    headers.forEach((header, index) => {
-      transaction[header] = values[index];
-    });
+  document.getElementById('processing-status').style.display = 'block';
+  updateJobProgress(job);
+  followJob(job.job_id);
+}
 
-    // Validate and format transaction
-    try {
-      const formattedTransaction = {
-        customer_id: transaction.customer_id,
-        transaction_id: transaction.transaction_id || 'TXN' + Date.now() + '_' + i + '_' + Math.random().toString(36).substr(2, 5).toUpperCase(),
-        transaction_datetime: transaction.transaction_datetime,
-        transaction_amount: parseFloat(transaction.transaction_amount),
-        kyc_verified: parseInt(transaction.kyc_verified),
-        account_age_days: parseInt(transaction.account_age_days),
-        channel_encoded: parseInt(transaction.channel_encoded)
-      };
-
-      // Validate values
-      if (isNaN(formattedTransaction.transaction_amount) || 
-          isNaN(formattedTransaction.kyc_verified) || 
-          isNaN(formattedTransaction.account_age_days) || 
-          isNaN(formattedTransaction.channel_encoded)) {
-        throw new Error('Invalid numeric values');
-      }
+function updateJobProgress(job) {
+  document.getElementById('total-count').textContent = job.total_rows;
+  document.getElementById('processed-count').textContent = job.rows_done;
+  document.getElementById('progress-bar').style.width = job.percent + '%';
+}
 
-      if (formattedTransaction.kyc_verified !== 0 && formattedTransaction.kyc_verified !== 1) {
-        throw new Error('kyc_verified must be 0 or 1');
-      }
+function followJob(jobId) {
+  // Progress is pushed after every checkpointed chunk
+  closeJobEvents();
+  const params = new URLSearchParams({ token: getAccessToken() || '' });
+  jobEvents = new EventSource(`${API_BASE_URL}/api/jobs/${jobId}/events?${params}`);
 
-      if (formattedTransaction.channel_encoded < 0 || formattedTransaction.channel_encoded > 3) {
-        throw new Error('channel_encoded must be between 0 and 3');
-      }
+  jobEvents.addEventListener('progress', (event) => {
+    updateJobProgress(JSON.parse(event.data));
+  });
 
-      transactions.push(formattedTransaction);
-    } catch (err) {
-      console.warn(`Skipping invalid row ${i}:`, err.message);
-    }
-  }
+  jobEvents.addEventListener('done', async (event) => {
+    closeJobEvents();
+    const job = JSON.parse(event.data);
+    updateJobProgress(job);
 
-  if (transactions.length === 0) {
-    throw new Error('No valid transactions found after parsing');
-  }
+    if (job.status !== 'completed') {
+      showNotification(job.error || 'Bulk prediction failed', 'error');
+      document.getElementById('processing-status').style.display = 'none';
+      return;
+    }
 
-  return transactions;
+    try {
+      await loadJobResults(jobId);
+    } catch (error) {
+      console.error('Bulk results error:', error);
+      showNotification(error.message || 'Failed to load results', 'error');
+      document.getElementById('processing-status').style.display = 'none';
+    }
+  });
+  // On connection errors EventSource reconnects by itself
 }
 
-async function processBulkPredictions(transactions, userEmail) {
-  // Show processing UI
-  document.getElementById('processing-status').style.display = 'block';
-  document.getElementById('total-count').textContent = transactions.length;
-  document.getElementById('processed-count').textContent = '0';
-  document.getElementById('progress-bar').style.width = '0%';
+function closeJobEvents() {
+  if (jobEvents) {
+    jobEvents.close();
+    jobEvents = null;
+  }
+}
 
-  try {
-    // Call bulk predict API
-    const response = await fetch(`${API_BASE_URL}/api/bulk-predict`, {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-      },
-      body: JSON.stringify({
-        email: userEmail,
-        transactions: transactions
-      })
-    });
+async function loadJobResults(jobId) {
+  const response = await fetch(
+    `${API_BASE_URL}/api/jobs/${jobId}/results?format=json&limit=${RESULTS_PREVIEW_LIMIT}`,
+    { headers: authHeaders() }
+  );
+  if (handleUnauthorized(response)) return;
+  const result = await response.json();
 
-    const result = await response.json();
-    console.log('Bulk prediction response:', result);
+  if (!response.ok) {
+    throw new Error(result.detail || result.message || 'Failed to load results');
+  }
 
-    if (!response.ok) {
-      throw new Error(result.detail || result.message || 'Bulk prediction failed');
-    }
-    
-    if (result.status === 'success') {
-      // Animate progress to 100%
-      let progress = 0;
-      const interval = setInterval(() => {
-        progress += 10;
-        document.getElementById('processed-count').textContent = Math.floor((progress / 100) * transactions.length);
-        document.getElementById('progress-bar').style.width = progress + '%';
-        
-        if (progress >= 100) {
-          clearInterval(interval);
-          // Process results after animation
-          setTimeout(() => {
-            processResults(result.data);
-          }, 300);
-        }
-      }, 50);
-    } else {
-      throw new Error(result.message || 'Bulk prediction failed');
-    }
-    
-  } catch (error) {
-    console.error('Bulk prediction error:', error);
-    showNotification(error.message || 'Failed to process bulk predictions. Please try again.', 'error');
-    document.getElementById('processing-status').style.display = 'none';
+  processResults(result.data);
+  if (result.data.truncated) {
+    showNotification(
+      `Showing the first ${RESULTS_PREVIEW_LIMIT} of ${result.data.total_rows} results. Export downloads all of them.`,
+      'info'
+    );
   }
 }
 
@@ -297,7 +261,7 @@ function displayResults(data) {
   document.getElementById('summary-total').textContent = data.total_processed || bulkResults.length;
   document.getElementById('summary-legitimate').textContent = legitimate;
   document.getElementById('summary-risky').textContent = risky;
-  document.getElementById('summary-fraud').textContent = fraud;
+  document.getElementById('summary-fraud').textContent = data.fraud_detected ?? fraud;
   
   // Display table
   filteredResults = [...bulkResults];
@@ -502,6 +466,14 @@ function initFilters() {
 
 function initExport() {
   document.getElementById('export-results-btn')?.addEventListener('click', () => {
+    const statusFilter = document.getElementById('filter-status').value;
+    if (currentJobId && !statusFilter && filteredResults.length < Number(document.getElementById('summary-total').textContent)) {
+      // Only a preview is loaded: download every row from the server
+      const params = new URLSearchParams({ format: 'csv', token: getAccessToken() || '' });
+      window.location.href = `${API_BASE_URL}/api/jobs/${currentJobId}/results?${params}`;
+      return;
+    }
+
     if (filteredResults.length === 0) {
       showNotification('No results to export', 'warning');
       return;
@@ -585,7 +557,7 @@ function resetUpload() {
       <line x1="12" y1="3" x2="12" y2="15"></line>
     </svg>
     <h3 style="margin-bottom: 0.5rem;">Click to upload or drag and drop</h3>
-    <p style="color: var(--muted-foreground); font-size: 0.875rem; margin-bottom: 1rem;">CSV files only (Max 10MB)</p>
+    <p style="color: var(--muted-foreground); font-size: 0.875rem; margin-bottom: 1rem;">CSV or Parquet files (Max 200MB)</p>
     <button class="btn btn-outline" type="button">Browse Files</button>
   `;
   
@@ -597,6 +569,8 @@ function resetUpload() {
   document.getElementById('processing-status').style.display = 'none';
   
   // Clear results
+  closeJobEvents();
+  currentJobId = null;
   bulkResults = [];
   filteredResults = [];
   
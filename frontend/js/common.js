@@ -6,9 +6,14 @@
 // AUTHENTICATION MANAGEMENT
 // ============================================
 
-// Check if user is logged in
+const AUTH_API_URL = 'https://pylord-api-bfsi.hf.space';
+
+// Check if user is logged in (with an access token that has not expired)
 function isLoggedIn() {
-  return localStorage.getItem("userEmail") !== null;
+  const expiresAt = Number(localStorage.getItem("tokenExpiresAt") || 0);
+  return localStorage.getItem("userEmail") !== null &&
+    getAccessToken() !== null &&
+    Date.now() < expiresAt;
 }
 
 // Get current user email
@@ -21,10 +26,51 @@ function getCurrentUserName() {
   return localStorage.getItem("userName") || getCurrentUserEmail();
 }
 
-// Log out user
-function logout() {
+// Get the access token issued by /api/login
+function getAccessToken() {
+  return localStorage.getItem("accessToken");
+}
+
+// Store the session returned by /api/login
+function saveSession(loginData) {
+  localStorage.setItem("userEmail", loginData.email);
+  localStorage.setItem("userName", loginData.full_name || "");
+  localStorage.setItem("accessToken", loginData.access_token);
+  localStorage.setItem("tokenExpiresAt", String(Date.now() + loginData.expires_in * 1000));
+}
+
+function clearSession() {
   localStorage.removeItem("userEmail");
   localStorage.removeItem("userName");
+  localStorage.removeItem("accessToken");
+  localStorage.removeItem("tokenExpiresAt");
+}
+
+// Headers for API calls that need the signed-in user
+function authHeaders(headers = {}) {
+  const token = getAccessToken();
+  return token ? { ...headers, 'Authorization': `Bearer ${token}` } : headers;
+}
+
+// Send the user back to login when the API rejects the token
+function handleUnauthorized(response) {
+  if (response.status !== 401) return false;
+  clearSession();
+  showNotification('Your session has expired. Please login again.', 'warning');
+  setTimeout(() => {
+    window.location.href = '/auth.html';
+  }, 1000);
+  return true;
+}
+
+// Log out user
+function logout() {
+  // Revoke the token server-side; the local session is cleared either way
+  const token = getAccessToken();
+  if (token) {
+    fetch(`${AUTH_API_URL}/api/logout`, { method: 'POST', headers: authHeaders() }).catch(() => {});
+  }
+  clearSession();
   showNotification('Logged out successfully', 'success');
   setTimeout(() => {
     window.location.href = "/";
@@ -4,6 +4,7 @@ let currentPage = 1;
 const itemsPerPage = 10;
 let allTransactions = [];
 let filteredTransactions = [];
+let liveStream = null;
 
 document.addEventListener('DOMContentLoaded', () => {
   loadUserTransactions();
@@ -27,8 +28,11 @@ async function loadUserTransactions() {
     tbody.innerHTML = '<tr><td colspan="6" style="text-align: center; padding: 2rem;">Loading transactions...</td></tr>';
 
     // Fetch transactions from API
-    const response = await fetch(`${API_BASE_URL}/api/transactions/${encodeURIComponent(userEmail)}`);
+    const response = await fetch(`${API_BASE_URL}/api/transactions/${encodeURIComponent(userEmail)}`, {
+      headers: authHeaders()
+    });
     
+    if (handleUnauthorized(response)) return;
     if (!response.ok) {
       throw new Error('Failed to fetch transactions');
     }
@@ -36,22 +40,14 @@ async function loadUserTransactions() {
     const result = await response.json();
     
     if (result.status === 'success') {
-      allTransactions = result.data.transactions.map(txn => ({
-        id: txn.transaction_id,
-        customerId: txn.customer_id,
-        kycVerified: txn.derived_features.kyc_verified === 1,
-        accountAge: txn.derived_features.account_age_days + ' days',
-        amount: txn.derived_features.transaction_amount,
-        channel: getChannelName(txn.derived_features.channel_encoded),
-        timestamp: txn.timestamp,
-        prediction: txn.is_fraud === 1 ? 'Fraud' : (txn.risk_score > 0.5 ? 'Risky' : 'Legitimate'),
-        riskScore: txn.risk_score,
-        explanation: txn.explanation
-      }));
+      allTransactions = result.data.transactions.map(toTableRow);
       
       filteredTransactions = [...allTransactions];
       updateStats();
       renderTable();
+
+      // New predictions are pushed instead of refetching the history
+      startLiveUpdates(userEmail, result.data.last_prediction_id);
     } else {
       tbody.innerHTML = '<tr><td colspan="6" style="text-align: center; padding: 2rem;">No transactions found</td></tr>';
     }
@@ -63,6 +59,49 @@ async function loadUserTransactions() {
   }
 }
 
+function toTableRow(txn) {
+  return {
+    id: txn.transaction_id,
+    customerId: txn.customer_id,
+    kycVerified: txn.derived_features.kyc_verified === 1,
+    accountAge: txn.derived_features.account_age_days + ' days',
+    amount: txn.derived_features.transaction_amount,
+    channel: getChannelName(txn.derived_features.channel_encoded),
+    timestamp: txn.timestamp,
+    prediction: txn.is_fraud === 1 ? 'Fraud' : (txn.risk_score > 0.5 ? 'Risky' : 'Legitimate'),
+    riskScore: txn.risk_score,
+    explanation: txn.explanation
+  };
+}
+
+function startLiveUpdates(userEmail, sinceId) {
+  if (liveStream) liveStream.close();
+  if (typeof EventSource === 'undefined') return;
+
+  const params = new URLSearchParams({ email: userEmail, since: sinceId || 0, token: getAccessToken() || '' });
+  liveStream = new EventSource(`${API_BASE_URL}/api/analytics/stream?${params}`);
+
+  liveStream.addEventListener('transactions', event => {
+    const payload = JSON.parse(event.data);
+    const known = new Set(allTransactions.map(t => t.id));
+    const fresh = payload.transactions
+      .map(toTableRow)
+      .filter(t => !known.has(t.id))
+      .reverse();  // newest first, like the history endpoint
+    if (fresh.length === 0) return;
+
+    allTransactions = [...fresh, ...allTransactions];
+    applyFilters();
+    updateStats();
+  });
+
+  liveStream.addEventListener('reset', () => {
+    liveStream.close();
+    liveStream = null;
+    loadUserTransactions();
+  });
+}
+
 function getChannelName(channelCode) {
   const channels = {
     0: 'Online',
@@ -213,26 +252,30 @@ window.closeTransactionModal = function() {
   }
 };
 
+function applyFilters() {
+  const searchTerm = document.getElementById('search-input').value.toLowerCase();
+  const prediction = document.getElementById('filter-prediction').value;
+  const channel = document.getElementById('filter-channel').value;
+
+  filteredTransactions = allTransactions.filter(txn => {
+    const matchesSearch = txn.id.toLowerCase().includes(searchTerm) || 
+                         txn.customerId.toLowerCase().includes(searchTerm);
+    const matchesPrediction = !prediction || txn.prediction === prediction;
+    const matchesChannel = !channel || txn.channel === channel;
+    return matchesSearch && matchesPrediction && matchesChannel;
+  });
+
+  renderTable();
+}
+
 function initFilters() {
   const searchInput = document.getElementById('search-input');
   const filterPrediction = document.getElementById('filter-prediction');
   const filterChannel = document.getElementById('filter-channel');
   
   const updateFilters = debounce(() => {
-    const searchTerm = searchInput.value.toLowerCase();
-    const prediction = filterPrediction.value;
-    const channel = filterChannel.value;
-    
-    filteredTransactions = allTransactions.filter(txn => {
-      const matchesSearch = txn.id.toLowerCase().includes(searchTerm) || 
-                           txn.customerId.toLowerCase().includes(searchTerm);
-      const matchesPrediction = !prediction || txn.prediction === prediction;
-      const matchesChannel = !channel || txn.channel === channel;
-      return matchesSearch && matchesPrediction && matchesChannel;
-    });
-    
     currentPage = 1;
-    renderTable();
+    applyFilters();
   }, 300);
   
   searchInput.addEventListener('input', updateFilters);
@@ -301,21 +344,21 @@ function initExport() {
       showNotification('No transactions to export', 'warning');
       return;
     }
-    
-    const data = filteredTransactions.map(txn => ({
-      'Transaction ID': txn.id,
-      'Customer ID': txn.customerId,
-      'KYC Verified': txn.kycVerified ? 'Yes' : 'No',
-      'Account Age': txn.accountAge,
-      'Amount': txn.amount,
-      'Channel': txn.channel,
-      'Timestamp': txn.timestamp,
-      'Prediction': txn.prediction,
-      'Risk Score': (txn.riskScore * 100).toFixed(2) + '%',
-      'Explanation': txn.explanation,
-    }));
-    
-    exportToCSV(data, `transactions_${new Date().toISOString().split('T')[0]}.csv`);
-    showNotification('Transactions exported successfully!', 'success');
+
+    // The server streams the file with the same filters; a plain link lets the
+    // browser download it to disk instead of building it in memory
+    const params = new URLSearchParams({ format: 'csv', token: getAccessToken() || '' });
+    const searchTerm = document.getElementById('search-input').value.trim();
+    const prediction = document.getElementById('filter-prediction').value;
+    const channel = document.getElementById('filter-channel').value;
+    if (searchTerm) params.set('q', searchTerm);
+    if (prediction) params.set('prediction', prediction.toLowerCase());
+    if (channel) params.set('channel', channel);
+
+    const link = document.createElement('a');
+    link.href = `${API_BASE_URL}/api/transactions/${encodeURIComponent(getCurrentUserEmail())}/export?${params}`;
+    link.download = '';
+    link.click();
+    showNotification('Export started', 'success');
   });
 }
\ No newline at end of file
@@ -100,11 +100,15 @@ async function handleSubmit(e) {
     // Call prediction API
     const response = await fetch(`${API_BASE_URL}/api/predict`, {
       method: 'POST',
-      headers: {
+      headers: authHeaders({
         'Content-Type': 'application/json',
-      },
+      }),
       body: JSON.stringify(data)
     });
+    if (handleUnauthorized(response)) {
+      hideLoading();
+      return;
+    }
 
     const result = await response.json();
     console.log('Prediction response:', result);
@@ -191,7 +195,8 @@ function displayResults(result, inputData) {
   }
 
   riskScore.textContent = (result.combined_score * 100).toFixed(1) + '%';
-  confidence.textContent = (result.model_risk_score * 100).toFixed(1) + '%';
+  // Degraded predictions (model skipped to meet the latency budget) have no model score
+  confidence.textContent = result.model_risk_score === null ? 'N/A (rule-only)' : (result.model_risk_score * 100).toFixed(1) + '%';
 
   // Display risk factors
   displayRiskFactors(result);
@@ -464,7 +469,8 @@ function saveResult() {
     timestamp: result.timestamp || new Date().toISOString(),
     status: result.is_fraud === 1 ? 'FRAUD' : 'LEGITIMATE',
     riskScore: (result.combined_score * 100).toFixed(2) + '%',
-    modelScore: (result.model_risk_score * 100).toFixed(2) + '%',
+    modelScore: result.model_risk_score === null ? 'N/A (rule-only)' : (result.model_risk_score * 100).toFixed(2) + '%',
+    degraded: result.degraded || false,
     ruleScore: (result.rule_score * 100).toFixed(2) + '%',
     rulesTriggered: result.rules_triggered,
     explanation: result.explanation,
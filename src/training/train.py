@@ -0,0 +1,389 @@
+"""
+Reproducible CatBoost training command for the RiskShield fraud model.
+
+Replaces the hand-run cells in notebooks/model_training.ipynb:
+  * train/validation data is quantized once into CatBoost Pools and cached on disk
+  * a stratified validation split is carved out of the train data
+  * hyperparameter trials run in a process pool, each with its own thread_count
+  * every trial uses early stopping on the validation split, which also picks
+    the best trial; the test split is only used for the final metrics
+  * the best model is written as a versioned .cbm plus a JSON metadata file
+
+Usage:
+    python src/training/train.py --trials 12 --parallel 4 --threads-per-trial 2
+    python src/training/train.py --trials 12 --promote   # also replace the API model
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from catboost import CatBoostClassifier, Pool
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+DEFAULT_DATA_DIR = ROOT_DIR / "data" / "processed"
+DEFAULT_OUTPUT_DIR = ROOT_DIR / "model"
+DEFAULT_CACHE_DIR = ROOT_DIR / "catboost_info" / "pool_cache"
+API_MODEL_DIR = ROOT_DIR / "API" / "API-BFSI" / "model"
+API_MODEL_NAME = "catboost_fraud_model_balanced_tuned"
+
+# Same column order as the balanced model in notebooks/model_training.ipynb
+FEATURE_COLS = [
+    'kyc_verified',
+    'account_age_days',
+    'transaction_amount',
+    'channel_encoded',
+    'hour_of_day',
+    'day_of_week',
+    'is_night_txn',
+    'is_high_amount_transaction',
+    'high_amount_night_txn',
+    'new_customer_high_amount',
+    'kyc_low_age_txn',
+    'is_weekend_txn',
+    'is_holiday_txn'
+]
+TARGET_COL = 'is_fraud'
+
+# Search space for random hyperparameter trials
+SEARCH_SPACE = {
+    'depth': [4, 5, 6, 7, 8],
+    'learning_rate': [0.02, 0.03, 0.05, 0.08, 0.1],
+    'l2_leaf_reg': [1, 3, 5, 7, 10],
+    'random_strength': [0.5, 1, 2],
+    'bagging_temperature': [0, 0.5, 1],
+}
+
+# Parameters of the currently deployed model, always evaluated as trial 0
+BASELINE_PARAMS = {
+    'depth': 6,
+    'learning_rate': 0.05,
+    'l2_leaf_reg': 3,
+    'random_strength': 1,
+    'bagging_temperature': 1,
+}
+
+
+# ------------------ DATA & POOL CACHE ------------------
+def load_split(data_dir: Path, split: str):
+    """Load features and labels for 'train' or 'test' from data/processed."""
+    split_dir = data_dir / f"{split}_data"
+    X = pd.read_csv(split_dir / f"{split}_features.csv")
+    y = pd.read_csv(split_dir / f"{split}_labels.csv").squeeze("columns")
+    return X[FEATURE_COLS], y.astype(int)
+
+
+def split_validation(X: pd.DataFrame, y: pd.Series, fraction: float, seed: int):
+    """
+    Stratified train/validation split of the train data (same fraud rate in both).
+    Returns (X_train, y_train, X_valid, y_valid).
+    """
+    rng = np.random.default_rng(seed)
+    labels = y.to_numpy()
+    is_valid = np.zeros(len(y), dtype=bool)
+    for label in np.unique(labels):
+        rows = np.flatnonzero(labels == label)
+        is_valid[rng.choice(rows, size=int(round(len(rows) * fraction)), replace=False)] = True
+    return X[~is_valid], y[~is_valid], X[is_valid], y[is_valid]
+
+
+def load_training_data(data_dir: Path, valid_fraction: float, seed: int):
+    """Train split of data/processed minus the validation rows, and the validation rows."""
+    X, y = load_split(data_dir, "train")
+    return split_validation(X, y, valid_fraction, seed)
+
+
+def _data_fingerprint(data_dir: Path, border_count: int, valid_fraction: float,
+                      seed: int) -> str:
+    """Hash of the train CSVs, split and quantization settings, used as cache key."""
+    digest = hashlib.sha256()
+    for kind in ("features", "labels"):
+        digest.update((data_dir / "train_data" / f"train_{kind}.csv").read_bytes())
+    digest.update(f"{border_count}|{valid_fraction}|{seed}|{','.join(FEATURE_COLS)}".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def build_quantized_pools(data_dir: Path, cache_dir: Path, border_count: int,
+                          valid_fraction: float, seed: int) -> dict:
+    """
+    Quantize the train/validation pools once and save them to disk.
+    The validation pool reuses the train borders so both share the same bins.
+    The test split gets no pool: trials never see it.
+    Returns the paths of the cached pools (reused on later runs).
+    """
+    fingerprint = _data_fingerprint(data_dir, border_count, valid_fraction, seed)
+    pool_dir = cache_dir / fingerprint
+    paths = {
+        "fingerprint": fingerprint,
+        "train": pool_dir / "train.qpool",
+        "valid": pool_dir / "valid.qpool",
+        "borders": pool_dir / "borders.tsv",
+    }
+
+    if paths["train"].exists() and paths["valid"].exists():
+        print(f"♻️  Reusing quantized pools from {pool_dir}")
+        return paths
+
+    pool_dir.mkdir(parents=True, exist_ok=True)
+    X_train, y_train, X_valid, y_valid = load_training_data(data_dir, valid_fraction, seed)
+
+    train_pool = Pool(data=X_train, label=y_train)
+    train_pool.quantize(border_count=border_count)
+    train_pool.save(str(paths["train"]))
+    train_pool.save_quantization_borders(str(paths["borders"]))
+
+    valid_pool = Pool(data=X_valid, label=y_valid)
+    valid_pool.quantize(input_borders=str(paths["borders"]))
+    valid_pool.save(str(paths["valid"]))
+
+    print(f"✅ Quantized pools saved to {pool_dir}")
+    return paths
+
+
+def balanced_class_weights(y: pd.Series) -> list:
+    """Same result as sklearn's compute_class_weight('balanced') for labels 0/1."""
+    counts = np.bincount(y.to_numpy(), minlength=2)
+    return (len(y) / (2 * counts)).tolist()
+
+
+# ------------------ TRIALS ------------------
+def sample_trials(n_trials: int, seed: int) -> list:
+    """Baseline parameters followed by random draws from SEARCH_SPACE."""
+    rng = random.Random(seed)
+    trials = [dict(BASELINE_PARAMS)]
+    seen = {tuple(sorted(BASELINE_PARAMS.items()))}
+    attempts = 0
+    while len(trials) < n_trials and attempts < n_trials * 20:
+        attempts += 1
+        params = {name: rng.choice(values) for name, values in SEARCH_SPACE.items()}
+        key = tuple(sorted(params.items()))
+        if key not in seen:
+            seen.add(key)
+            trials.append(params)
+    return trials
+
+
+def run_trial(trial_id: int, params: dict, pool_paths: dict, class_weights: list,
+              settings: dict) -> dict:
+    """
+    Train one model on the cached pools. Runs inside a worker process, so the
+    pools are loaded from disk here instead of being pickled from the parent.
+    """
+    start = time.time()
+    train_pool = Pool(f"quantized://{pool_paths['train']}")
+    valid_pool = Pool(f"quantized://{pool_paths['valid']}")
+
+    model = CatBoostClassifier(
+        iterations=settings["iterations"],
+        loss_function='Logloss',
+        eval_metric='AUC',
+        random_seed=settings["seed"],
+        class_weights=class_weights,
+        thread_count=settings["threads_per_trial"],
+        allow_writing_files=False,
+        verbose=False,
+        **params
+    )
+    model.fit(
+        train_pool,
+        eval_set=valid_pool,
+        early_stopping_rounds=settings["early_stopping_rounds"],
+        use_best_model=True
+    )
+
+    model_path = Path(settings["trial_dir"]) / f"trial_{trial_id:03d}.cbm"
+    model.save_model(str(model_path))
+
+    return {
+        "trial_id": trial_id,
+        "params": params,
+        "auc": float(model.get_best_score()["validation"]["AUC"]),
+        "best_iteration": int(model.get_best_iteration()),
+        "tree_count": int(model.tree_count_),
+        "model_path": str(model_path),
+        "train_seconds": round(time.time() - start, 2),
+    }
+
+
+def run_trials(trials: list, pool_paths: dict, class_weights: list, settings: dict,
+               parallel: int) -> list:
+    """Run all trials in a process pool and return results sorted by validation AUC."""
+    results = []
+    with ProcessPoolExecutor(max_workers=parallel) as executor:
+        futures = {
+            executor.submit(run_trial, i, params, pool_paths, class_weights, settings): i
+            for i, params in enumerate(trials)
+        }
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            print(
+                f"   trial {result['trial_id']:>3}: AUC={result['auc']:.4f} "
+                f"iters={result['best_iteration']:>4} "
+                f"({result['train_seconds']}s) {result['params']}"
+            )
+    return sorted(results, key=lambda r: r["auc"], reverse=True)
+
+
+# ------------------ EVALUATION & EXPORT ------------------
+def evaluate(model: CatBoostClassifier, X: pd.DataFrame, y: pd.Series, threshold: float) -> dict:
+    """Compute the metrics reported by /api/metrics at the given threshold."""
+    proba = model.predict_proba(X)[:, 1]
+    y_true = y.to_numpy()
+    y_pred = (proba >= threshold).astype(int)
+
+    tp = int(((y_pred == 1) & (y_true == 1)).sum())
+    fp = int(((y_pred == 1) & (y_true == 0)).sum())
+    tn = int(((y_pred == 0) & (y_true == 0)).sum())
+    fn = int(((y_pred == 0) & (y_true == 1)).sum())
+
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+
+    return {
+        "threshold": threshold,
+        "accuracy": round((tp + tn) / len(y_true), 4),
+        "precision": round(precision, 4),
+        "recall": round(recall, 4),
+        "f1_score": round(f1, 4),
+        "auc_roc": round(_roc_auc(y_true, proba), 4),
+        "confusion_matrix": {
+            "true_positive": tp,
+            "false_positive": fp,
+            "true_negative": tn,
+            "false_negative": fn
+        }
+    }
+
+
+def _roc_auc(y_true: np.ndarray, scores: np.ndarray) -> float:
+    """Rank-based ROC-AUC (Mann-Whitney U), avoids a scikit-learn dependency."""
+    ranks = pd.Series(scores).rank(method="average").to_numpy()
+    n_pos = int(y_true.sum())
+    n_neg = len(y_true) - n_pos
+    if n_pos == 0 or n_neg == 0:
+        return 0.0
+    return float((ranks[y_true == 1].sum() - n_pos * (n_pos + 1) / 2) / (n_pos * n_neg))
+
+
+def export_model(best: dict, metrics: dict, pool_paths: dict, class_weights: list,
+                 output_dir: Path, version: str, n_train: int) -> Path:
+    """
+    Write model/catboost_fraud_model_<version>.cbm and a .json metadata file
+    next to it. The .cbm is the same format app.py loads with load_model().
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    model_path = output_dir / f"catboost_fraud_model_{version}.cbm"
+    shutil.copyfile(best["model_path"], model_path)
+
+    metadata = {
+        "model_name": "CatBoost Fraud Detection Model (Recall-Optimized)",
+        "version": version,
+        "model_file": model_path.name,
+        "training_date": datetime.utcnow().strftime("%Y-%m-%d"),
+        "feature_names": FEATURE_COLS,
+        "params": best["params"],
+        "class_weights": class_weights,
+        "best_iteration": best["best_iteration"],
+        "tree_count": best["tree_count"],
+        "validation_auc": round(best["auc"], 4),
+        "metrics": metrics,
+        "training_rows": n_train,
+        "data_fingerprint": pool_paths["fingerprint"],
+    }
+    with open(model_path.with_suffix(".json"), "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=2)
+
+    return model_path
+
+
+def promote_model(model_path: Path, target_dir: Path = API_MODEL_DIR) -> Path:
+    """Copy a versioned model (and metadata) over the file app.py loads."""
+    target = target_dir / f"{API_MODEL_NAME}.cbm"
+    shutil.copyfile(model_path, target)
+    shutil.copyfile(model_path.with_suffix(".json"), target.with_suffix(".json"))
+    return target
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the RiskShield CatBoost fraud model")
+    parser.add_argument("--data-dir", type=Path, default=DEFAULT_DATA_DIR)
+    parser.add_argument("--output-dir", type=Path, default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument("--cache-dir", type=Path, default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--version", default=datetime.utcnow().strftime("%Y%m%d-%H%M%S"))
+    parser.add_argument("--trials", type=int, default=8, help="Number of hyperparameter trials")
+    parser.add_argument("--parallel", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="Trials running at the same time")
+    parser.add_argument("--threads-per-trial", type=int, default=2,
+                        help="CatBoost thread_count for each trial")
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--early-stopping-rounds", type=int, default=50)
+    parser.add_argument("--border-count", type=int, default=254)
+    parser.add_argument("--valid-fraction", type=float, default=0.2,
+                        help="Share of the train data held out for early stopping and trial selection")
+    parser.add_argument("--threshold", type=float, default=0.5,
+                        help="Probability threshold used for the reported metrics")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--promote", action="store_true",
+                        help=f"Copy the best model to {API_MODEL_DIR}/{API_MODEL_NAME}.cbm")
+    args = parser.parse_args()
+
+    start = time.time()
+    print("=" * 60)
+    print(f"🐱 RiskShield model training (version {args.version})")
+    print("=" * 60)
+
+    pool_paths = build_quantized_pools(args.data_dir, args.cache_dir, args.border_count,
+                                       args.valid_fraction, args.seed)
+    X_train, y_train, X_valid, _ = load_training_data(args.data_dir, args.valid_fraction, args.seed)
+    X_test, y_test = load_split(args.data_dir, "test")
+    print(f"📂 {len(X_train)} train / {len(X_valid)} validation / {len(X_test)} test rows")
+    class_weights = balanced_class_weights(y_train)
+
+    trial_dir = args.cache_dir / "trials" / args.version
+    trial_dir.mkdir(parents=True, exist_ok=True)
+    settings = {
+        "iterations": args.iterations,
+        "early_stopping_rounds": args.early_stopping_rounds,
+        "threads_per_trial": args.threads_per_trial,
+        "seed": args.seed,
+        "trial_dir": str(trial_dir),
+    }
+
+    trials = sample_trials(args.trials, args.seed)
+    print(f"🔬 Running {len(trials)} trials, {args.parallel} in parallel "
+          f"x {args.threads_per_trial} threads")
+    results = run_trials(trials, pool_paths, class_weights, settings, args.parallel)
+    best = results[0]
+
+    model = CatBoostClassifier()
+    model.load_model(best["model_path"])
+    metrics = evaluate(model, X_test, y_test, args.threshold)
+
+    model_path = export_model(best, metrics, pool_paths, class_weights,
+                              args.output_dir, args.version, len(X_train))
+    shutil.rmtree(trial_dir, ignore_errors=True)
+
+    print(f"\n🏆 Best trial {best['trial_id']}: validation AUC={best['auc']:.4f} {best['params']}")
+    print(f"📊 Test metrics @ {args.threshold}: {json.dumps(metrics['confusion_matrix'])}")
+    print(f"💾 Model saved as '{model_path}'")
+
+    if args.promote:
+        target = promote_model(model_path)
+        print(f"🚀 Promoted to '{target}'")
+
+    print(f"⏱️  Finished in {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()